@@ -0,0 +1,30 @@
+"""Tests for camera module."""
+from types import SimpleNamespace
+
+import pytest
+
+from viseron.camera import FFMPEGCamera
+from viseron.camera.frame_decoder import FrameToScan
+
+
+@pytest.mark.parametrize(
+    "capture_time, expected",
+    [
+        (10.0, (0.1, 0.2, 0.3, 0.4)),
+        (10.5, (0.1, 0.2, 0.3, 0.4)),
+        (11.5, None),
+    ],
+)
+def test_current_motion_region(capture_time, expected):
+    """Test that only a motion region captured close to the frame is used."""
+    camera = FFMPEGCamera.__new__(FFMPEGCamera)
+    # pylint: disable=protected-access
+    camera._config = SimpleNamespace(
+        motion_detection=SimpleNamespace(interval=1.0, adaptive_interval=False)
+    )
+    camera._motion_region = None
+    frame_to_scan = FrameToScan("test", None, 4, 4, None, capture_time)
+    assert camera.current_motion_region(frame_to_scan) is None
+
+    camera._motion_region = (10.0, (0.1, 0.2, 0.3, 0.4))
+    assert camera.current_motion_region(frame_to_scan) == expected
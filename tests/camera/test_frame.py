@@ -0,0 +1,174 @@
+"""Tests for frame module."""
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from viseron.camera.frame import Frame
+
+WIDTH = 4
+HEIGHT = 2
+
+
+def nv12_frame(raw_frame=None):
+    """Return a NV12 Frame."""
+    if raw_frame is None:
+        raw_frame = bytearray(range(int(WIDTH * HEIGHT * 1.5)))
+    return Frame(
+        cv2.COLOR_YUV2RGB_NV12,
+        WIDTH,
+        int(HEIGHT * 1.5),
+        raw_frame,
+        WIDTH,
+        HEIGHT,
+    )
+
+
+def test_decoded_frame():
+    """Test that decoded_frame returns the decoded array."""
+    frame = nv12_frame()
+    assert frame.decoded_frame.shape == (int(HEIGHT * 1.5), WIDTH)
+    np.testing.assert_array_equal(
+        frame.decoded_frame_luma, np.arange(WIDTH * HEIGHT).reshape(HEIGHT, WIDTH)
+    )
+    assert frame.decode_frame()
+
+
+def test_decode_frame_failed():
+    """Test that a frame with the wrong size fails to decode."""
+    frame = nv12_frame(bytearray(1))
+    assert not frame.decode_frame()
+    assert frame.decoded_frame is None
+
+
+def test_conversions_run_once():
+    """Test that each representation is converted once with concurrent consumers."""
+    frame = nv12_frame()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def consume():
+        barrier.wait()
+        frame.decode_frame()
+        results.append(frame.decoded_frame_mat_rgb)
+
+    threads = [threading.Thread(target=consume) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result is results[0] for result in results)
+    assert results[0].shape == (HEIGHT, WIDTH, 3)
+    assert frame.conversion_counts == {
+        "decoded_frame": 1,
+        "umat": 1,
+        "umat_rgb": 1,
+        "mat_rgb": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "cvt_color, yuv_layout",
+    [
+        (cv2.COLOR_YUV2BGR_I420, "planar"),
+        (cv2.COLOR_YUV2BGR_NV12, "semi_planar"),
+    ],
+)
+@pytest.mark.parametrize("width, height", [(32, 16), (31, 15)])
+def test_resize_yuv(cvt_color, yuv_layout, width, height):
+    """Test that YUV frames are resized without converting the full frame."""
+    frame_width, frame_height = 64, 48
+    bgr = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+    bgr[:, : frame_width // 2] = (200, 30, 60)
+    bgr[:, frame_width // 2 :] = (20, 180, 90)
+    yuv = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420).reshape(-1)
+    if yuv_layout == "semi_planar":
+        luma_size = frame_width * frame_height
+        chroma_size = luma_size // 4
+        yuv = np.concatenate(
+            [
+                yuv[:luma_size],
+                np.stack(
+                    [
+                        yuv[luma_size : luma_size + chroma_size],
+                        yuv[luma_size + chroma_size :],
+                    ],
+                    axis=1,
+                ).reshape(-1),
+            ]
+        )
+
+    frame = Frame(
+        cvt_color,
+        frame_width,
+        int(frame_height * 1.5),
+        bytearray(yuv.tobytes()),
+        frame_width,
+        frame_height,
+    )
+    frame.resize("test", width, height)
+    resized_frame = frame.get_preprocessed_frame("test").get()
+    assert resized_frame.shape == (height, width, 3)
+    assert "umat_rgb" not in frame.conversion_counts
+    expected = cv2.resize(frame.decoded_frame_mat_rgb, (width, height))
+    assert np.abs(resized_frame.astype(int) - expected).mean() < 2
+
+
+def test_resize_luma():
+    """Test that the luma plane is resized once per size without color conversion."""
+    frame = nv12_frame()
+    resized_luma = frame.resize_luma(WIDTH // 2, HEIGHT // 2)
+    assert resized_luma.shape == (HEIGHT // 2, WIDTH // 2)
+    assert frame.resize_luma(WIDTH // 2, HEIGHT // 2) is resized_luma
+    assert np.shares_memory(frame.decoded_frame_luma, frame.raw_frame)
+    assert "umat_rgb" not in frame.conversion_counts
+
+
+def test_scaled_frames():
+    """Test that frames scaled by FFmpeg are used instead of the full frame."""
+    scaled_raw_frame = bytearray(range(int(2 * 2 * 1.5)))
+    frame = Frame(
+        cv2.COLOR_YUV2RGB_NV12,
+        WIDTH,
+        int(HEIGHT * 1.5),
+        bytearray(range(int(WIDTH * HEIGHT * 1.5))),
+        WIDTH,
+        HEIGHT,
+        scaled_frames={(2, 2): scaled_raw_frame},
+    )
+    np.testing.assert_array_equal(frame.resize_luma(2, 2), [[0, 1], [2, 3]])
+
+    frame.resize("decoder", 2, 2)
+    np.testing.assert_array_equal(
+        frame.get_resized_frame("decoder").get(),
+        cv2.cvtColor(
+            np.frombuffer(scaled_raw_frame, np.uint8).reshape(3, 2),
+            cv2.COLOR_YUV2RGB_NV12,
+        ),
+    )
+    assert "decoded_frame" not in frame.conversion_counts
+
+
+def test_resize_crop_region():
+    """Test that only the crop region of the full frame is resized."""
+    frame_width, frame_height = 64, 48
+    bgr = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+    bgr[:, frame_width // 2 :] = (20, 180, 90)
+    frame = Frame(
+        cv2.COLOR_YUV2BGR_I420,
+        frame_width,
+        int(frame_height * 1.5),
+        bytearray(cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420).tobytes()),
+        frame_width,
+        frame_height,
+    )
+    frame.set_crop_region("test", (0.51, 0.25, 1.0, 0.75))
+    frame.resize("test", 16, 12)
+
+    assert frame.crop_region("test") == (0.5, 0.25, 1.0, 0.75)
+    resized_frame = frame.get_resized_frame("test").get()
+    assert resized_frame.shape == (12, 16, 3)
+    assert np.abs(resized_frame.astype(int) - (20, 180, 90)).max() < 3
+    assert "umat_rgb" not in frame.conversion_counts
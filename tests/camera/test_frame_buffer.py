@@ -0,0 +1,39 @@
+"""Tests for frame buffer module."""
+import logging
+
+import numpy as np
+
+from viseron.camera.frame_buffer import FrameBuffer
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TestFrameBuffer:
+    """Tests for FrameBuffer class."""
+
+    def test_acquire_reuses_released_slots(self):
+        """Test that a slot is reused once nothing references it."""
+        frame_buffer = FrameBuffer(LOGGER, 10, 2)
+        first = frame_buffer.acquire()
+        first_id = id(first)
+        del first
+        second = frame_buffer.acquire()
+        third = frame_buffer.acquire()
+        assert first_id in (id(second), id(third))
+        assert frame_buffer.slots_in_use == 2
+        assert frame_buffer.overflow == 0
+
+    def test_slot_busy_while_referenced_by_array(self):
+        """Test that numpy views of a slot keep it from being reused."""
+        frame_buffer = FrameBuffer(LOGGER, 10, 1)
+        slot = frame_buffer.acquire()
+        view = np.frombuffer(slot, np.uint8).reshape(2, 5)[:1]
+        del slot
+        assert frame_buffer.slots_in_use == 1
+
+        temporary = frame_buffer.acquire()
+        assert len(temporary) == 10
+        assert frame_buffer.overflow == 1
+
+        del view
+        assert frame_buffer.slots_in_use == 0
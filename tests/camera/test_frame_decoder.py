@@ -0,0 +1,58 @@
+"""Tests for frame_decoder module."""
+import time
+from threading import Lock
+from unittest.mock import MagicMock
+
+import pytest
+
+from viseron.camera.frame_decoder import FrameDecoder
+
+
+@pytest.fixture
+def decoder():
+    """Return a FrameDecoder with adaptive interval between 0.2 and 2 seconds."""
+    # pylint: disable=protected-access
+    frame_decoder = FrameDecoder.__new__(FrameDecoder)
+    frame_decoder._logger = MagicMock()
+    frame_decoder.name = "camera.object_detection"
+    frame_decoder.interval = 1.0
+    frame_decoder._stream = MagicMock(output_fps=10, idle=False)
+    frame_decoder._adaptive_interval = (0.2, 2.0)
+    frame_decoder._adaptive_lock = Lock()
+    frame_decoder._in_flight = 0
+    frame_decoder.calculate_interval()
+    return frame_decoder
+
+
+def processed_frame(decoder_name, age):
+    """Return a mocked FrameToScan captured age seconds ago."""
+    return MagicMock(decoder_name=decoder_name, capture_time=time.time() - age)
+
+
+def test_interval_decreases_when_processed_in_time(decoder):
+    """Test that interval is shortened one frame at a time down to min_interval."""
+    for _ in range(5):
+        decoder.frame_sent()
+        decoder.frame_processed(processed_frame(decoder.name, 0.05))
+    assert decoder.interval == pytest.approx(0.5)
+
+    for _ in range(10):
+        decoder.frame_sent()
+        decoder.frame_processed(processed_frame(decoder.name, 0.05))
+    assert decoder.interval == pytest.approx(0.2)
+    assert decoder._interval_fps == 2  # pylint: disable=protected-access
+
+
+def test_interval_backs_off(decoder):
+    """Test that interval is multiplied when frames are slow or piling up."""
+    decoder.frame_processed(processed_frame(decoder.name, 1.5))
+    assert decoder.interval == pytest.approx(1.5)
+
+    decoder.frame_sent()
+    decoder.frame_sent()
+    decoder.frame_sent()
+    assert decoder.interval == pytest.approx(2.0)
+
+    # Frames from other decoders are ignored
+    decoder.frame_processed(processed_frame("camera.motion_detection", 0.05))
+    assert decoder.interval == pytest.approx(2.0)
@@ -0,0 +1,127 @@
+"""Tests for pyav_stream module."""
+import io
+import socket
+import threading
+import time
+from unittest.mock import PropertyMock
+
+import numpy as np
+import pytest
+
+av = pytest.importorskip("av")
+
+# pylint: disable=wrong-import-position
+from viseron.camera import pyav_stream  # noqa: E402
+from viseron.camera.pyav_stream import PyAVStream, copy_planes  # noqa: E402
+from viseron.camera.stream_information_cache import StreamInformationCache  # noqa: E402
+
+WIDTH = 6
+HEIGHT = 4
+VIDEO_FRAMES = 20
+
+
+@pytest.fixture(autouse=True)
+def stream_information_cache(mocker, tmp_path):
+    """Store the stream information cache in a temporary folder."""
+    mocker.patch.object(
+        StreamInformationCache, "_path", str(tmp_path / "stream_information.json")
+    )
+    mocker.patch.object(StreamInformationCache, "_entries", None)
+
+
+def encode_video(file, container_format=None):
+    """Encode a short video to file."""
+    with av.open(file, "w", format=container_format) as container:
+        stream = container.add_stream("mpeg4", rate=10)
+        stream.width = 64
+        stream.height = 48
+        stream.pix_fmt = "yuv420p"
+        for index in range(VIDEO_FRAMES):
+            image = np.full((48, 64, 3), index * 10, dtype=np.uint8)
+            video_frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            for packet in stream.encode(video_frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+def create_stream(mocker, nvr_config, stream_url) -> PyAVStream:
+    """Return a PyAVStream reading from stream_url."""
+    mocker.patch.object(
+        type(nvr_config.camera),
+        "stream_url",
+        new_callable=PropertyMock,
+        return_value=stream_url,
+    )
+    return PyAVStream(nvr_config, nvr_config.camera, write_segments=False)
+
+
+@pytest.mark.parametrize("pix_fmt", ["nv12", "yuv420p"])
+def test_copy_planes(pix_fmt):
+    """Test that line padding is dropped when planes are copied."""
+    expected = np.arange(int(WIDTH * HEIGHT * 1.5), dtype=np.uint8).reshape(
+        int(HEIGHT * 1.5), WIDTH
+    )
+    video_frame = av.VideoFrame.from_ndarray(expected, format=pix_fmt)
+    frame_bytes = bytearray(expected.nbytes)
+
+    copy_planes(video_frame, frame_bytes, pix_fmt)
+    np.testing.assert_array_equal(
+        np.frombuffer(frame_bytes, np.uint8).reshape(expected.shape), expected
+    )
+
+
+def test_read(mocker, nvr_config, tmp_path):
+    """Test that frames are read until the stream ends."""
+    encode_video(str(tmp_path / "video.mp4"))
+    stream = create_stream(mocker, nvr_config, str(tmp_path / "video.mp4"))
+    stream.start_pipe()
+    frames = 0
+    while stream.read():
+        frames += 1
+    assert frames == VIDEO_FRAMES
+    assert stream.poll() == 1
+    stream.close_pipe()
+
+
+@pytest.mark.timeout(30)
+def test_read_timeout(mocker, nvr_config):
+    """Test that reading fails if the camera stops sending without disconnecting."""
+    video = io.BytesIO()
+    encode_video(video, "mpegts")
+    stalled = threading.Event()
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def serve():
+        # Stream information is read using a connection of its own
+        connections = []
+        while not stalled.is_set():
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                break
+            connection.sendall(video.getvalue())
+            connections.append(connection)
+        for connection in connections:
+            connection.close()
+
+    server_thread = threading.Thread(target=serve, daemon=True)
+    server_thread.start()
+    mocker.patch.object(pyav_stream, "READ_TIMEOUT", 0.5)
+    stream = create_stream(
+        mocker, nvr_config, f"tcp://127.0.0.1:{server.getsockname()[1]}"
+    )
+    try:
+        stream.start_pipe()
+        start = time.monotonic()
+        while stream.read():
+            pass
+        assert stream.poll() == 1
+        assert time.monotonic() - start < 5
+    finally:
+        stalled.set()
+        stream.close_pipe()
+        server.close()
@@ -0,0 +1,166 @@
+"""Tests for stream module."""
+import logging
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from viseron.camera import stream as stream_module
+from viseron.camera.stream import ScaledOutput, Stream
+from viseron.camera.stream_information_cache import StreamInformationCache
+
+STREAM_INFORMATION = (240, 160, 24, "h264", None)
+
+
+@pytest.fixture(autouse=True)
+def stream_information_cache(mocker, tmp_path):
+    """Store the stream information cache in a temporary folder."""
+    mocker.patch.object(
+        StreamInformationCache, "_path", str(tmp_path / "stream_information.json")
+    )
+    mocker.patch.object(StreamInformationCache, "_entries", None)
+
+
+def create_stream(mocker, nvr_config, write_segments) -> Stream:
+    """Return a Stream with idle_keyframes_only enabled."""
+    mocker.patch.object(Stream, "create_symlink")
+    mocker.patch.object(
+        Stream, "get_stream_information", return_value=STREAM_INFORMATION
+    )
+    mocker.patch.object(nvr_config.camera, "_idle_keyframes_only", True)
+    return Stream(nvr_config, nvr_config.camera, write_segments=write_segments)
+
+
+@pytest.fixture
+def stream(mocker, nvr_config):
+    """Return a Stream that pipes frames but does not write segments."""
+    return create_stream(mocker, nvr_config, write_segments=False)
+
+
+def test_idle_build_command(stream):
+    """Test that only keyframes are decoded in idle mode."""
+    stream.output_fps = 5
+    assert "-skip_frame" not in stream.build_command()
+    assert "fps=5" in stream.build_command()
+
+    stream.set_idle(True)
+    assert stream.switch_pending
+    stream._idle = True  # pylint: disable=protected-access
+    assert not stream.switch_pending
+    command = stream.build_command()
+    assert command[command.index("-skip_frame") + 1] == "nokey"
+    assert command.index("-skip_frame") < command.index("-i")
+    assert "fps=5" not in command
+
+
+def test_idle_requires_substream(mocker, nvr_config):
+    """Test that idle mode is disabled when the pipe also writes segments."""
+    stream = create_stream(mocker, nvr_config, write_segments=True)
+    stream.set_idle(True)
+    assert not stream.switch_pending
+
+
+def test_leave_idle_terminates_pipe(stream):
+    """Test that FFmpeg is terminated right away when leaving idle mode."""
+    # pylint: disable=protected-access
+    stream._pipe = MagicMock()
+    stream.set_idle(True)
+    stream.set_idle(False)
+    # The pipe was never switched to idle mode
+    stream._pipe.terminate.assert_not_called()
+
+    stream.set_idle(True)
+    stream._idle = True
+    stream.set_idle(False)
+    stream._pipe.terminate.assert_called_once()
+
+
+def test_stream_information_cache(mocker, nvr_config):
+    """Test that cached stream information is used and revalidated."""
+    stream = create_stream(mocker, nvr_config, write_segments=False)
+    url = nvr_config.camera.stream_url
+    assert StreamInformationCache.get(url) == STREAM_INFORMATION
+    # pylint: disable=protected-access
+    with open(StreamInformationCache._path, encoding="utf-8") as cache_file:
+        assert url not in cache_file.read()
+
+    # Entries are read from disk on startup
+    mocker.patch.object(StreamInformationCache, "_entries", None)
+    revalidate = mocker.patch.object(Stream, "revalidate_stream_information")
+    stream = create_stream(mocker, nvr_config, write_segments=False)
+    stream.get_stream_information.assert_not_called()
+    revalidate.assert_called_once_with(url, STREAM_INFORMATION)
+
+
+def test_stream_information_cache_invalid(mocker, nvr_config):
+    """Test that stream information with zero values is never used from the cache."""
+    url = nvr_config.camera.stream_url
+    StreamInformationCache.set(url, (240, 160, 0, "h264", None))
+    assert StreamInformationCache.get(url) is None
+
+    # pylint: disable=protected-access
+    entries = StreamInformationCache._load()
+    entries[StreamInformationCache.key(url)] = [240, 160, 0, "h264", None]
+    stream = create_stream(mocker, nvr_config, write_segments=False)
+    stream.get_stream_information.assert_called_once_with(url)
+    assert StreamInformationCache.get(url) == STREAM_INFORMATION
+
+    stream.get_stream_information.return_value = (0, 0, 0, None, None)
+    stream.revalidate_stream_information(url, STREAM_INFORMATION)
+    assert StreamInformationCache.get(url) == STREAM_INFORMATION
+    assert not stream.switch_pending
+
+
+def test_revalidate_stream_information(mocker, nvr_config):
+    """Test that the pipe is restarted if the stream information has changed."""
+    mocker.patch.object(nvr_config.camera, "_width", None)
+    mocker.patch.object(nvr_config.camera, "_height", None)
+    mocker.patch.object(nvr_config.camera, "_fps", None)
+    stream = create_stream(mocker, nvr_config, write_segments=False)
+    url = nvr_config.camera.stream_url
+    changed = (240, 160, 12, "hevc", None)
+    stream.get_stream_information.return_value = changed
+    stream.revalidate_stream_information(url, STREAM_INFORMATION)
+    assert StreamInformationCache.get(url) == changed
+    assert stream.switch_pending
+
+    mocker.patch.object(stream, "start_pipe")
+    mocker.patch.object(stream, "close_pipe")
+    stream.switch_mode()
+    assert not stream.switch_pending
+    assert (stream.fps, stream.stream_codec) == (12, "hevc")
+    assert stream.frame_buffer.frame_bytes == 240 * 160 * 1.5
+
+
+def test_revalidate_stream_information_resolution(mocker, nvr_config):
+    """Test that a changed resolution is not applied while running."""
+    mocker.patch.object(nvr_config.camera, "_width", None)
+    mocker.patch.object(nvr_config.camera, "_height", None)
+    stream = create_stream(mocker, nvr_config, write_segments=False)
+    url = nvr_config.camera.stream_url
+    changed = (320, 240, 24, "h264", None)
+    stream.get_stream_information.return_value = changed
+    # pylint: disable=protected-access
+    error = mocker.patch.object(stream._logger, "error")
+    stream.revalidate_stream_information(url, STREAM_INFORMATION)
+    assert StreamInformationCache.get(url) == changed
+    assert not stream.switch_pending
+    assert (stream.width, stream.height) == (240, 160)
+    error.assert_called_once()
+
+
+def test_scaled_output(mocker):
+    """Test that scaled frames are drained and matched with the main frame."""
+    mocker.patch.object(stream_module, "SCALED_OUTPUT_TIMEOUT", 0.1)
+    scaled_output = ScaledOutput(logging.getLogger(__name__), 2, 2, 2)
+    scaled_output.open()
+    # More frames than the pipe holds are written without anyone calling read
+    frame_count = 100000
+    with os.fdopen(scaled_output.write_fd, "wb") as write_pipe:
+        scaled_output.write_fd = None
+        for index in range(frame_count):
+            write_pipe.write(bytes([index % 256]) * scaled_output.frame_bytes)
+    assert scaled_output.read(0) is None
+    assert scaled_output.read(frame_count - 1)[0] == (frame_count - 1) % 256
+    assert scaled_output.read(frame_count) is None
+    scaled_output.close()
@@ -205,6 +205,9 @@ GLOBAL_MOTION_DETECTION = {
     "trigger_recorder": True,
     "width": 30,
     "interval": 2,
+    "adaptive_interval": True,
+    "min_interval": 1.0,
+    "max_interval": 8.0,
     "frames": 2,
     "alpha": 1,
     "max_timeout": 3,
@@ -221,6 +224,9 @@ LOCAL_MOTION_DETECTION = {
     "trigger_recorder": False,
     "width": 300,
     "interval": 1.0,
+    "adaptive_interval": False,
+    "min_interval": 0.5,
+    "max_interval": 4.0,
     "frames": 3,
     "alpha": 0.1,
     "max_timeout": 30,
@@ -12,6 +12,9 @@ OBJECT_DETECTION_CONFIG = {
     "type": "darknet",
     "enable": True,
     "interval": 1,
+    "adaptive_interval": True,
+    "min_interval": 0.5,
+    "max_interval": 5,
     "labels": [
         {
             "label": "dog",
@@ -27,6 +30,20 @@ OBJECT_DETECTION_CONFIG = {
     ],
     "max_frame_age": 1,
     "log_all_objects": True,
+    "scheduler_weight": 1,
+    "crop_to_motion": True,
+    "crop_padding": 0.1,
+    "tile_columns": 2,
+    "tile_rows": 2,
+    "tile_overlap": 0.2,
+    "tile_full_frame": True,
+    "tracker": True,
+    "tracker_iou_threshold": 0.3,
+    "tracker_max_misses": 2,
+    "batch_size": 4,
+    "batch_timeout": 0.05,
+    "workers": 2,
+    "worker_type": "process",
     "logging": {
         "level": "debug",
         "color_log": True,
@@ -36,6 +53,9 @@ CAMERA_OBJECT_DETECTION_CONFIG = {
     "type": "edgetpu",
     "enable": False,
     "interval": 2,
+    "adaptive_interval": False,
+    "min_interval": 1,
+    "max_interval": 10,
     "labels": [
         {
             "label": "cat",
@@ -51,6 +71,16 @@ CAMERA_OBJECT_DETECTION_CONFIG = {
     ],
     "max_frame_age": 2,
     "log_all_objects": False,
+    "scheduler_weight": 3,
+    "crop_to_motion": False,
+    "crop_padding": 0.2,
+    "tile_columns": 3,
+    "tile_rows": 1,
+    "tile_overlap": 0.1,
+    "tile_full_frame": False,
+    "tracker": False,
+    "tracker_iou_threshold": 0.5,
+    "tracker_max_misses": 4,
     "logging": {
         "level": "fatal",
         "color_log": False,
@@ -110,6 +140,27 @@ def test_ensure_min_max(label, raises):
         assert config_object_detection.ensure_min_max(label) == label
 
 
+@pytest.mark.parametrize(
+    "object_detection, raises",
+    [
+        (
+            {"min_interval": 2, "max_interval": 1},
+            pytest.raises(voluptuous.error.Invalid),
+        ),
+        ({"min_interval": 1, "max_interval": 1}, nullcontext()),
+        ({"min_interval": 2, "max_interval": None}, nullcontext()),
+        ({}, nullcontext()),
+    ],
+)
+def test_ensure_min_max_interval(object_detection, raises):
+    """Test that min_interval is not larger than max_interval."""
+    with raises:
+        assert (
+            config_object_detection.ensure_min_max_interval(object_detection)
+            == object_detection
+        )
+
+
 @pytest.mark.parametrize(
     "env_var, env_var_value, expected",
     [
@@ -156,3 +207,28 @@ class TestObjectDetectionConfig:
         )
         assert config.type == object_detection["type"]
         assert config.min_confidence == CAMERA_ZONES_CONFIG[0]["labels"][0].confidence
+
+    @pytest.mark.parametrize(
+        "camera_object_detection, raises",
+        [
+            (
+                {"interval": 1, "min_interval": 5, "max_interval": None},
+                pytest.raises(voluptuous.error.Invalid),
+            ),
+            (
+                {"interval": 1, "min_interval": None, "max_interval": 0.5},
+                pytest.raises(voluptuous.error.Invalid),
+            ),
+            ({"interval": 1, "min_interval": 4, "max_interval": None}, nullcontext()),
+            (
+                {"interval": 1, "min_interval": None, "max_interval": None},
+                nullcontext(),
+            ),
+        ],
+    )
+    def test_resolved_min_max_interval(self, camera_object_detection, raises):
+        """Test that the resolved min_interval is not larger than max_interval."""
+        with raises:
+            config_object_detection.ObjectDetectionConfig(
+                OBJECT_DETECTION_CONFIG, camera_object_detection, CAMERA_ZONES_CONFIG
+            )
@@ -194,7 +194,7 @@ def black_frame(black_raw_frame):
         cv2.COLOR_RGB2BGR, WIDTH, int(HEIGHT * 3), black_raw_frame, WIDTH, HEIGHT
     )
     # Manually set the decoded frame to avoid errors
-    frame._decoded_frame = black_raw_frame
+    frame._conversions["decoded_frame"] = black_raw_frame
     return frame
 
 
@@ -202,6 +202,7 @@ def black_frame(black_raw_frame):
 def mocked_camera(resolution):
     """Return mocked camera."""
     mock = MagicMock(resolution=resolution, spec=["stream"])
+    mock.return_value.resolution = resolution
     return mock
 
 
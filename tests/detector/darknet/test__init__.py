@@ -0,0 +1,85 @@
+"""Test Darknet detector."""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from viseron.detector.darknet import ObjectDetection
+
+MODEL_WIDTH = 32
+MODEL_HEIGHT = 32
+OUTPUT_ROWS = 20
+
+
+class FakeNet:
+    """Network with two YOLO output layers computed from each image of the input.
+
+    Outputs are shaped the same way as cv2.dnn region layers, (rows, columns) for a
+    single image and (images, rows, columns) for a batch.
+    """
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self._weights = [
+            rng.normal(0, 0.05, (MODEL_WIDTH * MODEL_HEIGHT * 3, OUTPUT_ROWS * 7))
+            for _ in range(2)
+        ]
+        self._blob = None
+
+    def setInput(self, blob):  # pylint: disable=invalid-name
+        """Store input blob."""
+        self._blob = blob
+
+    def forward(self, _output_names):
+        """Return output of each layer."""
+        images = self._blob.reshape(len(self._blob), -1)
+        outputs = []
+        for weights in self._weights:
+            output = 1 / (1 + np.exp(-images @ weights))
+            output = output.reshape(len(images), OUTPUT_ROWS, 7).astype(np.float32)
+            outputs.append(output[0] if len(images) == 1 else output)
+        return outputs
+
+
+@pytest.fixture
+def object_detection():
+    """Return Darknet detector with a fake network."""
+    detector = ObjectDetection.__new__(ObjectDetection)
+    detector.nms = 0.4
+    detector.labels = ["person", "car"]
+    detector.net = FakeNet()
+    detector._model_width = MODEL_WIDTH  # pylint: disable=protected-access
+    detector._model_height = MODEL_HEIGHT  # pylint: disable=protected-access
+    detector._output_names = ["yolo_0", "yolo_1"]  # pylint: disable=protected-access
+    return detector
+
+
+def frame_to_scan(image):
+    """Return frame to scan with a preprocessed image."""
+    mock = MagicMock()
+    mock.frame.get_preprocessed_frame.return_value = image
+    mock.camera_config.object_detection.min_confidence = 0.6
+    return mock
+
+
+def test_return_objects_batch(object_detection):
+    """Test that a batch gives the same objects as scanning each frame on its own."""
+    rng = np.random.default_rng(1)
+    frames = [
+        frame_to_scan(
+            rng.integers(0, 256, (MODEL_HEIGHT, MODEL_WIDTH, 3), dtype=np.uint8)
+        )
+        for _ in range(3)
+    ]
+
+    batch_results = object_detection.return_objects_batch(frames)
+    assert len(batch_results) == len(frames)
+    assert all(len(objects) for objects in batch_results)
+    for frame, objects in zip(frames, batch_results):
+        single_objects = object_detection.return_objects_batch([frame])[0]
+        assert [obj.formatted for obj in objects] == [
+            obj.formatted for obj in single_objects
+        ]
+    assert [obj.formatted for obj in batch_results[0]] != [
+        obj.formatted for obj in batch_results[1]
+    ]
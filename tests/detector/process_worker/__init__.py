@@ -0,0 +1,36 @@
+"""Dummy detector which is run in process workers."""
+import logging
+import time
+
+from viseron.detector import AbstractDetectorConfig, AbstractObjectDetection
+from viseron.detector.detected_object import DetectedObject
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = "Testing"
+
+
+class ObjectDetection(AbstractObjectDetection):
+    """Dummy detector which finds one object per frame.
+
+    The confidence of the object is the mean of the preprocessed frame. Frames that
+    are all zeros never return, to simulate a stuck worker.
+    """
+
+    def __init__(self, config):
+        self._config = config
+
+    def return_objects(self, frame_to_scan):
+        """Return object with the mean of the frame as confidence."""
+        frame = frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name)
+        LOGGER.info(f"Detecting objects in frame with mean {frame.mean()}")
+        while not frame.any():
+            time.sleep(1)
+        return [DetectedObject("person", frame.mean() / 255, 0.1, 0.2, 0.3, 0.4)]
+
+
+class Config(AbstractDetectorConfig):
+    """Dummy detector config."""
+
+    def __init__(self, detector_config):  # pylint: disable=super-init-not-called
+        self._detector_config = detector_config
@@ -1,10 +1,18 @@
 """Tests for Detector."""
 import sys
+import threading
+import time
+from collections import Counter, defaultdict
 from contextlib import nullcontext
+from queue import Queue
+from unittest.mock import MagicMock
 
 import pytest
 
-from viseron.detector import import_object_detection
+from viseron.camera.frame_decoder import FrameToScan
+from viseron.const import TOPIC_FRAME_PROCESSED_OBJECT
+from viseron.detector import Detector, import_object_detection, map_to_frame
+from viseron.detector.detected_object import DetectedObject
 from viseron.exceptions import (
     DetectorConfigError,
     DetectorConfigSchemaError,
@@ -67,3 +75,130 @@ def test_import_motion_detection(config, detector_module, raises):
 
     with raises:
         import_object_detection(config)
+
+
+@pytest.mark.parametrize("worker_type", ["thread", "process"])
+def test_init_worker_type(mocker, worker_type):
+    """Test that the model is not loaded in Viseron's process for process workers."""
+    config = MagicMock(worker_type=worker_type, workers=2, batch_size=1, logging=None)
+    config_module = MagicMock()
+    config_module.Config.return_value = config
+    detector_module = MagicMock()
+    mocker.patch(
+        "viseron.detector.import_object_detection",
+        return_value=(config_module, detector_module),
+    )
+    thread_worker = mocker.patch("viseron.detector.ThreadDetectorWorker")
+    process_worker = mocker.patch("viseron.detector.ProcessDetectorWorker")
+    mocker.patch("viseron.detector.RestartableThread")
+    mocker.patch("viseron.detector.DataStream")
+
+    detector = Detector({"enable": True})
+    if worker_type == "process":
+        detector_module.ObjectDetection.assert_not_called()
+        detector_module.ObjectDetection.preprocessor.assert_called_once_with(config)
+        assert (
+            detector.preprocessor
+            == detector_module.ObjectDetection.preprocessor.return_value
+        )
+        assert process_worker.call_count == 2
+        thread_worker.assert_not_called()
+    else:
+        assert detector_module.ObjectDetection.call_count == 2
+        assert detector.preprocessor == detector_module.ObjectDetection.return_value
+        assert thread_worker.call_count == 2
+        process_worker.assert_not_called()
+
+
+def test_get_batch():
+    """Test that frames are batched and that old frames are discarded."""
+    detector = Detector.__new__(Detector)
+    detector._batch_size = 2  # pylint: disable=protected-access
+    detector._batch_timeout = 0.01  # pylint: disable=protected-access
+    detector._object_detection_queue = Queue()  # pylint: disable=protected-access
+
+    frames = []
+    for capture_time in [time.time() - 10, time.time(), time.time(), time.time()]:
+        frame_to_scan = MagicMock(capture_time=capture_time)
+        frame_to_scan.camera_config.object_detection.max_frame_age = 2
+        frames.append(frame_to_scan)
+        detector._object_detection_queue.put(  # pylint: disable=protected-access
+            frame_to_scan
+        )
+
+    assert detector.get_batch() == frames[1:3]
+    assert detector.get_batch() == frames[3:]
+
+
+def test_object_detection_least_loaded_worker(mocker):
+    """Test that batches are routed to the worker with the least pending batches."""
+    detector = Detector.__new__(Detector)
+    workers = [MagicMock(pending=2), MagicMock(pending=0), MagicMock(pending=1)]
+    detector._workers = workers  # pylint: disable=protected-access
+    batch = [MagicMock(tiles=[])]
+    mocker.patch.object(detector, "get_batch", side_effect=[batch, StopIteration])
+
+    with pytest.raises(StopIteration):
+        detector.object_detection()
+    workers[1].submit.assert_called_once_with(batch)
+    workers[0].submit.assert_not_called()
+    workers[2].submit.assert_not_called()
+
+
+def test_map_to_frame():
+    """Test that objects detected in a cropped frame are mapped to the whole frame."""
+    objects = map_to_frame(
+        [DetectedObject("person", 0.9, 0.0, 0.5, 0.5, 1.0)], (0.5, 0.2, 0.9, 0.6)
+    )
+    assert len(objects) == 1
+    assert objects[0].label == "person"
+    assert objects[0].confidence == 0.9
+    assert (
+        objects[0].rel_x1,
+        objects[0].rel_y1,
+        objects[0].rel_x2,
+        objects[0].rel_y2,
+    ) == (0.5, 0.4, 0.7, 0.6)
+
+
+def test_publish_results_tiles(mocker):
+    """Test that objects found in tiles are mapped to the frame and merged."""
+    publish_data = mocker.patch("viseron.detector.DataStream.publish_data")
+    detector = Detector.__new__(Detector)
+    detector._statistics = defaultdict(Counter)  # pylint: disable=protected-access
+    detector._statistics_lock = threading.Lock()  # pylint: disable=protected-access
+    frame = MagicMock()
+    frame.crop_region.side_effect = {
+        "decoder.tile_0": (0.0, 0.0, 0.6, 1.0),
+        "decoder.tile_1": (0.4, 0.0, 1.0, 1.0),
+    }.get
+    frame_to_scan = FrameToScan(
+        "decoder",
+        frame,
+        1920,
+        1080,
+        MagicMock(),
+        time.time(),
+        tiles=["decoder.tile_0", "decoder.tile_1"],
+    )
+    frame_to_scan.camera_config.camera.name_slug = "camera"
+
+    batch = Detector.expand_tiles([frame_to_scan])
+    assert [tile.decoder_name for tile in batch] == frame_to_scan.tiles
+    assert all(tile.tile_of is frame_to_scan for tile in batch)
+
+    detector.publish_results(
+        batch,
+        [
+            # The same person, cut by the border of the first tile
+            [DetectedObject("person", 0.6, 0.75, 0.2, 1.0, 0.8)],
+            [DetectedObject("person", 0.9, 0.0, 0.2, 0.5, 0.8)],
+        ],
+    )
+    publish_data.assert_called_once_with(
+        f"camera/{TOPIC_FRAME_PROCESSED_OBJECT}", frame_to_scan
+    )
+    assert len(frame.objects) == 1
+    assert frame.objects[0].confidence == 0.9
+    assert frame.objects[0].rel_x1 == 0.4
+    assert detector.statistics["camera"]["tiles"] == 2
@@ -0,0 +1,102 @@
+"""Tests for detected_object module."""
+import pickle
+
+import numpy as np
+
+from viseron.detector import map_to_frame
+from viseron.detector.detected_object import DetectedObject, DetectionBatch
+from viseron.helpers.filter import ObjectBatch
+
+LABELS = ["person", "car", "dog"]
+
+
+def detection_batch(image_res=None):
+    """Return batch of random detections."""
+    rng = np.random.default_rng(0)
+    label_ids = rng.integers(0, len(LABELS), 20)
+    confidences = rng.uniform(0, 1, 20)
+    boxes = np.sort(rng.uniform(0, 1, (20, 2, 2)), axis=1).transpose(0, 2, 1)
+    boxes = boxes.reshape(-1, 4)[:, [0, 2, 1, 3]]
+    if image_res:
+        boxes = boxes * np.tile(image_res, 2)
+    return (
+        DetectionBatch.from_arrays(
+            LABELS, label_ids, confidences, boxes, image_res=image_res
+        ),
+        [
+            DetectedObject(
+                LABELS[label_id],
+                confidence,
+                *box,
+                relative=image_res is None,
+                image_res=image_res,
+            )
+            for label_id, confidence, box in zip(label_ids, confidences, boxes)
+        ],
+    )
+
+
+def test_from_arrays():
+    """Test that objects of a batch match objects created one by one."""
+    for image_res in (None, (1920, 1080)):
+        batch, objects = detection_batch(image_res)
+        assert len(batch) == len(objects)
+        assert [obj.formatted for obj in batch] == [obj.formatted for obj in objects]
+
+
+def test_objects_are_kept():
+    """Test that the same objects are returned on every access."""
+    batch, _ = detection_batch()
+    batch[0].relevant = True
+    assert batch[0] is batch.objects[0]
+    assert list(batch)[0].relevant
+
+
+def test_pickle():
+    """Test that a pickled batch holds the same detections."""
+    batch, _ = detection_batch()
+    unpickled = pickle.loads(pickle.dumps(batch))
+    np.testing.assert_array_equal(unpickled.detections, batch.detections)
+    assert [obj.formatted for obj in unpickled] == [obj.formatted for obj in batch]
+
+
+def test_map_to_frame():
+    """Test that a batch is mapped the same way as a list of objects."""
+    batch, objects = detection_batch()
+    crop_region = (0.25, 0.1, 0.75, 0.6)
+    mapped = map_to_frame(batch, crop_region)
+    assert isinstance(mapped, DetectionBatch)
+    assert [obj.formatted for obj in mapped] == [
+        obj.formatted for obj in map_to_frame(objects, crop_region)
+    ]
+
+
+def test_object_batch():
+    """Test that ObjectBatch uses the arrays of a batch."""
+    batch, objects = detection_batch()
+    mask = np.array([[0, 0], [1000, 0], [1000, 500], [0, 500]])
+    from_batch = ObjectBatch(batch, (1920, 1080), [mask])
+    from_objects = ObjectBatch(objects, (1920, 1080), [mask])
+    for attribute in ("labels", "confidence", "rel_width", "rel_height", "in_mask"):
+        np.testing.assert_array_equal(
+            getattr(from_batch, attribute), getattr(from_objects, attribute)
+        )
+
+
+def test_objects_created_on_demand():
+    """Test that objects are only created for selected detections."""
+    batch, objects = detection_batch()
+    object_batch = ObjectBatch(batch, (1920, 1080), [])
+    filter_hit = np.full(len(batch), None, dtype=object)
+    filter_hit[1:] = "confidence"
+    object_batch.set_filter_hits(filter_hit)
+    selected = object_batch.select(np.arange(len(batch)) == 0)
+    assert [obj.formatted for obj in selected] == [objects[0].formatted]
+    # pylint: disable=protected-access
+    assert sum(obj is not None for obj in batch._objects) == 1
+    assert selected[0] is batch[0]
+    assert batch[0].filter_hit is None
+    assert batch[-1].filter_hit == "confidence"
+    assert [obj.formatted for obj in batch[1:3]] == [
+        obj.formatted for obj in objects[1:3]
+    ]
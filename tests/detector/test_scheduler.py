@@ -0,0 +1,60 @@
+"""Tests for FairScheduler."""
+import time
+from queue import Empty
+from unittest.mock import MagicMock
+
+import pytest
+
+from viseron.detector.scheduler import FairScheduler
+
+
+def frame_to_scan(camera, weight=1, age=0.0, max_frame_age=2):
+    """Return a mocked FrameToScan."""
+    frame = MagicMock(capture_time=time.time() - age)
+    frame.camera_config.camera.name_slug = camera
+    frame.camera_config.object_detection.scheduler_weight = weight
+    frame.camera_config.object_detection.max_frame_age = max_frame_age
+    return frame
+
+
+def test_latest_frame_wins():
+    """Test that a newer frame replaces the waiting frame of the same camera."""
+    scheduler = FairScheduler()
+    first = frame_to_scan("camera_1")
+    second = frame_to_scan("camera_1")
+    scheduler.put(first)
+    scheduler.put(second)
+    assert scheduler.qsize() == 1
+    assert scheduler.get_nowait() is second
+    assert scheduler.statistics() == {"camera_1": {"served": 1, "dropped": 1}}
+
+
+def test_expired_frames_evicted_on_put():
+    """Test that frames older than max_frame_age are evicted when a frame is put."""
+    scheduler = FairScheduler()
+    scheduler.put(frame_to_scan("camera_1", age=10))
+    assert scheduler.qsize() == 0
+
+    waiting = frame_to_scan("camera_1", max_frame_age=0.05)
+    scheduler.put(waiting)
+    time.sleep(0.1)
+    scheduler.put(frame_to_scan("camera_2"))
+    assert scheduler.qsize() == 1
+    assert scheduler.get_nowait() is not waiting
+    with pytest.raises(Empty):
+        scheduler.get_nowait()
+    assert scheduler.statistics()["camera_1"] == {"served": 0, "dropped": 2}
+
+
+def test_weighted_round_robin():
+    """Test that cameras are served in proportion to their weight."""
+    scheduler = FairScheduler()
+    served = []
+    for _ in range(30):
+        scheduler.put(frame_to_scan("busy", weight=1))
+        scheduler.put(frame_to_scan("important", weight=2))
+        served.append(scheduler.get_nowait().camera_config.camera.name_slug)
+    assert served.count("important") == 20
+    assert served.count("busy") == 10
+    # A single busy camera can not starve the others
+    assert "busy" in served[:3]
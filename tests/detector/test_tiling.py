@@ -0,0 +1,42 @@
+"""Tests for tiling module."""
+import numpy as np
+import pytest
+
+from viseron.detector.detected_object import DetectedObject
+from viseron.detector.tiling import calculate_tiles, non_max_suppression
+
+
+@pytest.mark.parametrize(
+    "columns, rows, overlap, expected",
+    [
+        (1, 1, 0.2, [(0.0, 0.0, 1.0, 1.0)]),
+        (2, 1, 0.0, [(0.0, 0.0, 0.5, 1.0), (0.5, 0.0, 1.0, 1.0)]),
+        (
+            2,
+            2,
+            0.5,
+            [
+                (0.0, 0.0, 2 / 3, 2 / 3),
+                (1 / 3, 0.0, 1.0, 2 / 3),
+                (0.0, 1 / 3, 2 / 3, 1.0),
+                (1 / 3, 1 / 3, 1.0, 1.0),
+            ],
+        ),
+    ],
+)
+def test_calculate_tiles(columns, rows, overlap, expected):
+    """Test that tiles overlap and cover the whole frame."""
+    np.testing.assert_allclose(calculate_tiles(columns, rows, overlap), expected)
+
+
+def test_non_max_suppression():
+    """Test that duplicates are removed, keeping the most confident object."""
+    whole = DetectedObject("person", 0.9, 0.4, 0.2, 0.6, 0.8)
+    partial = DetectedObject("person", 0.7, 0.4, 0.2, 0.5, 0.8)
+    other_label = DetectedObject("dog", 0.5, 0.4, 0.2, 0.5, 0.8)
+    other_person = DetectedObject("person", 0.8, 0.7, 0.2, 0.9, 0.8)
+    assert non_max_suppression([partial, other_label, whole, other_person]) == [
+        whole,
+        other_person,
+        other_label,
+    ]
@@ -0,0 +1,55 @@
+"""Tests for tracker module."""
+import pytest
+
+from viseron.detector.detected_object import DetectedObject
+from viseron.detector.tracker import ObjectTracker
+
+
+def person(x1, x2, confidence=0.9):
+    """Return a detected person."""
+    return DetectedObject("person", confidence, x1, 0.2, x2, 0.8)
+
+
+def test_track_ids_persist():
+    """Test that an object moving between detections keeps its track id."""
+    tracker = ObjectTracker(iou_threshold=0.3, max_misses=2)
+    first = tracker.update([person(0.1, 0.3), person(0.6, 0.8)], 0.0)
+    second = tracker.update([person(0.65, 0.85), person(0.15, 0.35)], 1.0)
+    assert [obj.track_id for obj in first] == [1, 2]
+    assert [obj.track_id for obj in second] == [2, 1]
+
+    dog = DetectedObject("dog", 0.9, 0.15, 0.2, 0.35, 0.8)
+    assert tracker.update([dog], 2.0)[0].track_id == 3
+
+
+def test_missed_track_is_predicted():
+    """Test that missed tracks are reported at their predicted position."""
+    tracker = ObjectTracker(iou_threshold=0.3, max_misses=1)
+    tracker.update([person(0.1, 0.3)], 0.0)
+    tracker.update([person(0.2, 0.4)], 1.0)
+
+    objects = tracker.update([], 2.0)
+    assert len(objects) == 1
+    assert objects[0].track_id == 1
+    # The track keeps moving to the right while it is missed
+    assert objects[0].rel_x1 > round(tracker.tracks[0].box[0], 3)
+
+    assert not tracker.update([], 3.0)
+    assert not tracker.tracks
+
+
+@pytest.mark.parametrize("max_misses, tracks", [(0, 0), (3, 1)])
+def test_max_misses(max_misses, tracks):
+    """Test that tracks are removed when missed more than max_misses times."""
+    tracker = ObjectTracker(iou_threshold=0.3, max_misses=max_misses)
+    tracker.update([person(0.1, 0.3)], 0.0)
+    tracker.update([], 1.0)
+    assert len(tracker.tracks) == tracks
+
+
+def test_same_timestamp():
+    """Test that a track is missed even if the next run has the same timestamp."""
+    tracker = ObjectTracker(iou_threshold=0.3, max_misses=0)
+    tracker.update([person(0.1, 0.3)], 1.0)
+    assert not tracker.update([person(0.6, 0.8)], 1.0)[1:]
+    assert [track.track_id for track in tracker.tracks] == [2]
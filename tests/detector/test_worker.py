@@ -0,0 +1,104 @@
+"""Tests for object detector workers."""
+import logging
+import multiprocessing as mp
+import sys
+import time
+from queue import Queue
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from viseron.camera.frame_decoder import FrameToScan
+from viseron.detector.worker import (
+    ProcessDetectorWorker,
+    SharedTensorSlots,
+    read_tensors,
+)
+
+from tests.detector import process_worker
+
+
+def test_shared_tensor_slots():
+    """Test that tensors are copied to shared memory and read back unchanged."""
+    slots = SharedTensorSlots(1)
+    tensors = [np.arange(12, dtype=np.uint8).reshape(2, 2, 3), b"jpeg"]
+    try:
+        index, block_name, layouts = slots.write(tensors)
+        # pylint: disable=protected-access
+        block = slots._blocks[index]
+        assert block.name == block_name
+        read = read_tensors(block, layouts)
+        np.testing.assert_array_equal(read[0], tensors[0])
+        assert read[1] == b"jpeg"
+        del read
+
+        slots.release(index)
+        larger = [np.ones((10, 10, 3), dtype=np.float32)]
+        index, larger_block_name, layouts = slots.write(larger)
+        assert larger_block_name != block_name
+        np.testing.assert_array_equal(
+            read_tensors(slots._blocks[index], layouts)[0], larger[0]
+        )
+    finally:
+        slots.close()
+
+
+def test_process_detector_worker(mocker, caplog):
+    """Test that batches are detected in the worker process and published."""
+    caplog.set_level(logging.INFO)
+    sys.modules["viseron.detector.process_worker"] = process_worker
+    # Forked so the dummy detector module is importable in the worker process
+    mocker.patch(
+        "viseron.detector.worker.mp.get_context",
+        return_value=mp.get_context("fork"),
+    )
+    published: Queue = Queue()
+    worker = ProcessDetectorWorker(
+        "test",
+        lambda batch, results: published.put((batch, results)),
+        {"type": "process_worker"},
+    )
+
+    def frame_to_scan(value):
+        frame = MagicMock()
+        frame.get_preprocessed_frame.return_value = np.full(
+            (4, 4, 3), value, dtype=np.uint8
+        )
+        camera_config = SimpleNamespace(
+            object_detection=SimpleNamespace(min_confidence=0.5)
+        )
+        return FrameToScan("test", frame, 4, 4, camera_config, time.time())
+
+    try:
+        batch = [frame_to_scan(51), frame_to_scan(102)]
+        worker.submit(batch)
+        published_batch, results = published.get(timeout=10)
+        assert published_batch is batch
+        assert [objects[0].confidence for objects in results] == [0.2, 0.4]
+        assert worker.pending == 0
+
+        # Log records of the worker process are handled in this process
+        deadline = time.time() + 10
+        while "frame with mean 51.0" not in caplog.text and time.time() < deadline:
+            time.sleep(0.1)
+        assert "frame with mean 51.0" in caplog.text
+
+        # A dead worker process is restarted and its batches are released
+        worker.submit([frame_to_scan(0)])
+        assert worker.pending == 1
+        worker._process.kill()  # pylint: disable=protected-access
+        deadline = time.time() + 10
+        while worker.pending and time.time() < deadline:
+            time.sleep(0.1)
+        assert worker.pending == 0
+        assert published.empty()
+
+        batch = [frame_to_scan(255)]
+        worker.submit(batch)
+        published_batch, results = published.get(timeout=10)
+        assert published_batch is batch
+        assert results[0][0].confidence == 1.0
+        assert worker.pending == 0
+    finally:
+        worker.stop()
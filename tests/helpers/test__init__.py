@@ -1,7 +1,9 @@
 """Tests for helper module."""
+import cv2
 import numpy as np
+import pytest
 
-from viseron.helpers import generate_mask
+from viseron.helpers import calculate_crop_region, generate_mask, points_in_polygon
 
 from tests.const import MASK_ARRAY, MASK_COORDINATES
 
@@ -12,3 +14,35 @@ def test_generate_mask():
         generate_mask(MASK_COORDINATES),
         MASK_ARRAY,
     )
+
+
+@pytest.mark.parametrize(
+    "bounding_box, padding, expected",
+    [
+        ((0.4, 0.4, 0.6, 0.6), 0.0, (0.4, 0.3, 0.6, 0.7)),
+        ((0.4, 0.4, 0.6, 0.6), 0.1, (0.3, 0.1, 0.7, 0.9)),
+        ((0.0, 0.0, 0.1, 0.1), 0.0, (0.0, 0.0, 0.1, 0.2)),
+        ((0.0, 0.0, 1.0, 0.5), 0.1, (0.0, 0.0, 1.0, 1.0)),
+    ],
+)
+def test_calculate_crop_region(bounding_box, padding, expected):
+    """Test that crop regions are padded, fit to the aspect ratio and the frame."""
+    np.testing.assert_allclose(
+        calculate_crop_region(bounding_box, padding, (200, 100), 1.0), expected
+    )
+
+
+def test_points_in_polygon():
+    """Test that points_in_polygon gives the same result as cv2.pointPolygonTest."""
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        polygon = rng.integers(0, 40, (rng.integers(3, 9), 2))
+        # Points on the integer and half integer grid hit vertices and edges
+        points = rng.integers(0, 80, (200, 2)) / 2
+        np.testing.assert_array_equal(
+            points_in_polygon(points, polygon),
+            [
+                cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0
+                for x, y in points
+            ],
+        )
@@ -1,9 +1,10 @@
 """Tests for filter module."""
+import numpy as np
 import pytest
 
 from viseron.config.config_object_detection import LabelConfig
 from viseron.detector.detected_object import DetectedObject
-from viseron.helpers.filter import Filter
+from viseron.helpers.filter import Filter, ObjectBatch, filter_objects
 
 LABEL_CONFIG = {
     "label": "person",
@@ -99,3 +100,26 @@ class TestFilter:
         assert object_filter.trigger_recorder == LABEL_CONFIG["trigger_recorder"]
         assert object_filter.require_motion == LABEL_CONFIG["require_motion"]
         assert object_filter.post_processor == LABEL_CONFIG["post_processor"]
+
+
+def test_filter_batch(nvr_config_full, resolution):
+    """Test that batch filtering gives the same result as filtering each object."""
+    object_filter = Filter(nvr_config_full, resolution, LabelConfig(LABEL_CONFIG))
+    rng = np.random.default_rng(0)
+    objects = []
+    for _ in range(200):
+        x1, x2 = sorted(rng.random(2))
+        y1, y2 = sorted(rng.random(2))
+        objects.append(
+            DetectedObject(rng.choice(["person", "car"]), rng.random(), x1, y1, x2, y2)
+        )
+
+    batch = ObjectBatch(objects, resolution, nvr_config_full.object_detection.mask)
+    passed, filter_hit = filter_objects({"person": object_filter}, batch)
+    for obj, obj_passed, obj_filter_hit in zip(objects, passed, filter_hit):
+        if obj.label != "person":
+            assert not obj_passed
+            assert obj_filter_hit is None
+            continue
+        assert object_filter.filter_object(obj) == obj_passed
+        assert obj.filter_hit == obj_filter_hit
@@ -0,0 +1,45 @@
+"""Tests for raster module."""
+import cv2
+import numpy as np
+
+from viseron.helpers import points_in_polygon
+from viseron.helpers.raster import PolygonRaster
+
+
+def test_lookup():
+    """Test that lookup gives the same result as cv2.pointPolygonTest."""
+    rng = np.random.default_rng(0)
+    polygons = [rng.integers(0, 40, (rng.integers(3, 9), 2)) for _ in range(10)]
+    raster = PolygonRaster((40, 30), polygons)
+    # Points on and off the grid, and outside of the frame
+    points = np.concatenate(
+        [rng.integers(-4, 90, (300, 2)) / 2, rng.uniform(0, 40, (50, 2))]
+    )
+    for polygon in polygons:
+        assert polygon in raster
+        np.testing.assert_array_equal(
+            raster.lookup(points, polygon),
+            [
+                cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0
+                for x, y in points
+            ],
+        )
+    assert np.array([[0, 0], [1, 0], [1, 1]]) not in raster
+
+
+def test_overlay():
+    """Test that overlay covers the pixels within any of the polygons."""
+    polygons = [
+        np.array([[0, 0], [10, 0], [10, 10], [0, 10]]),
+        np.array([[20, 5], [30, 15], [20, 25]]),
+    ]
+    raster = PolygonRaster((40, 30), polygons)
+    overlay = raster.overlay(polygons)
+    assert overlay.shape == (30, 40)
+    rows, columns = np.mgrid[0:30, 0:40]
+    pixels = np.stack([columns.ravel(), rows.ravel()], axis=1).astype(np.float64)
+    expected = points_in_polygon(pixels, polygons[0]) | points_in_polygon(
+        pixels, polygons[1]
+    )
+    np.testing.assert_array_equal(overlay.ravel(), expected)
+    assert raster.overlay(polygons) is overlay
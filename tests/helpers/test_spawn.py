@@ -0,0 +1,61 @@
+"""Tests for spawn module."""
+import os
+import shutil
+import subprocess as sp
+import sys
+
+import pytest
+
+from viseron.helpers import spawn
+
+
+def test_resolve_command():
+    """Test that the executable is resolved to a full path."""
+    assert spawn.resolve_command(["echo", "-n"]) == [shutil.which("echo"), "-n"]
+    assert spawn.resolve_command(["/bin/echo"]) == ["/bin/echo"]
+    assert spawn.resolve_command(["does_not_exist"]) == ["does_not_exist"]
+
+
+def test_which_not_found_not_cached(mocker):
+    """Test that an executable that is not found is looked up again."""
+    shutil_which = mocker.patch(
+        "viseron.helpers.spawn.shutil.which", side_effect=[None, "/usr/bin/installed"]
+    )
+    assert spawn.which("installed") == "installed"
+    assert spawn.which("installed") == "/usr/bin/installed"
+    assert spawn.which("installed") == "/usr/bin/installed"
+    assert shutil_which.call_count == 2
+
+
+def test_popen(mocker):
+    """Test that subprocesses are started with arguments that allow posix_spawn."""
+    popen = mocker.patch("viseron.helpers.spawn.sp.Popen")
+    spawn.popen(["echo", "test"], stdout=sp.PIPE)
+    popen.assert_called_once_with(
+        [shutil.which("echo"), "test"], stdout=sp.PIPE, close_fds=False
+    )
+
+
+def test_run():
+    """Test that a subprocess can be run."""
+    assert spawn.run(["echo", "test"], stdout=sp.PIPE, check=True).stdout == b"test\n"
+
+
+def test_popen_inherit_fds():
+    """Test that inherit_fds are passed to the subprocess."""
+    read_fd, write_fd = os.pipe()
+    with spawn.popen(
+        [sys.executable, "-c", f"import os; os.write({write_fd}, b'test')"],
+        inherit_fds=[write_fd],
+    ) as process:
+        process.wait()
+    assert not os.get_inheritable(write_fd)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as read_pipe:
+        assert read_pipe.read() == b"test"
+
+
+def test_run_check():
+    """Test that run raises if check is set and the command fails."""
+    with pytest.raises(sp.CalledProcessError):
+        spawn.run(["false"], check=True)
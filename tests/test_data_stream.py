@@ -0,0 +1,129 @@
+"""Tests for data stream module."""
+import logging
+import threading
+import uuid
+from queue import Queue
+
+import pytest
+
+from viseron.const import (
+    DATA_STREAM_DROP_POLICY_BLOCK,
+    DATA_STREAM_DROP_POLICY_NEWEST,
+    DATA_STREAM_DROP_POLICY_OLDEST,
+)
+from viseron.data_stream import CallbackExecutor, DataStream, DataStreamShard
+
+
+@pytest.mark.parametrize(
+    "drop_policy, expected_items, expected_dropped",
+    [
+        (DATA_STREAM_DROP_POLICY_OLDEST, [2, 3], 1),
+        (DATA_STREAM_DROP_POLICY_NEWEST, [1, 2], 1),
+    ],
+)
+def test_data_stream_shard_drop_policy(drop_policy, expected_items, expected_dropped):
+    """Test that a full shard drops items according to its drop policy."""
+    shard = DataStreamShard("test", drop_policy=drop_policy, maxsize=2)
+    for item in [1, 2, 3]:
+        shard.put(item)
+    assert [shard.queue.get_nowait() for _ in range(shard.queue.qsize())] == (
+        expected_items
+    )
+    assert shard.dropped == expected_dropped
+
+
+def test_callback_executor_serializes_subscriber():
+    """Test that callbacks for one subscriber run in order, one at a time."""
+    executor = CallbackExecutor(max_workers=4)
+    unique_id = uuid.uuid4()
+    release = threading.Event()
+    done = threading.Event()
+    results = []
+
+    def callback(data):
+        release.wait(1)
+        results.append(data)
+        if len(results) == 10:
+            done.set()
+
+    for item in range(10):
+        executor.submit(unique_id, callback, item)
+    assert executor.pending == 10
+    assert executor.max_pending == 10
+    release.set()
+
+    assert done.wait(1)
+    assert results == list(range(10))
+
+
+def test_callback_executor_log_stats(caplog):
+    """Test that the saturation of the pool is logged."""
+    executor = CallbackExecutor(max_workers=1, stats_interval=0)
+    release = threading.Event()
+    with caplog.at_level(logging.DEBUG, logger="viseron.data_stream"):
+        executor.submit(uuid.uuid4(), lambda _: release.wait(1), None)
+        executor.submit(uuid.uuid4(), lambda _: None, None)
+    release.set()
+    assert "max pending 2" in caplog.text
+
+
+class TestDataStream:
+    """Tests for DataStream class."""
+
+    def test_get_wildcard_subscribers(self):
+        """Test that wildcard subscribers are resolved and cached per topic."""
+        queue: Queue = Queue()
+        unique_id = DataStream.subscribe_data("router_test/*/object", queue)
+        subscribers = DataStream.get_wildcard_subscribers("router_test/camera/object")
+        assert [list(callbacks.values()) for callbacks in subscribers] == [[queue]]
+        assert DataStream.get_wildcard_subscribers("router_test/camera/motion") == []
+        assert (
+            DataStream.get_wildcard_subscribers("router_test/camera/object")
+            is subscribers
+        )
+
+        DataStream.unsubscribe_data("router_test/*/object", unique_id)
+        assert DataStream.get_wildcard_subscribers("router_test/camera/object") == []
+
+    def test_get_wildcard_subscribers_new_pattern(self):
+        """Test that a new wildcard subscription invalidates cached topics."""
+        first_queue: Queue = Queue()
+        second_queue: Queue = Queue()
+        first_id = DataStream.subscribe_data("router_test/camera/*", first_queue)
+        assert len(DataStream.get_wildcard_subscribers("router_test/camera/a")) == 1
+
+        second_id = DataStream.subscribe_data("router_test/*/a", second_queue)
+        assert len(DataStream.get_wildcard_subscribers("router_test/camera/a")) == 2
+
+        DataStream.unsubscribe_data("router_test/camera/*", first_id)
+        DataStream.unsubscribe_data("router_test/*/a", second_id)
+
+    def test_get_wildcard_subscribers_cache_size(self, monkeypatch):
+        """Test that the least recently used topic is evicted from the cache."""
+        monkeypatch.setattr("viseron.data_stream.DATA_STREAM_WILDCARD_CACHE_SIZE", 2)
+        queue: Queue = Queue()
+        unique_id = DataStream.subscribe_data("router_test/*", queue)
+        DataStream.get_wildcard_subscribers("router_test/a")
+        DataStream.get_wildcard_subscribers("router_test/b")
+        DataStream.get_wildcard_subscribers("router_test/a")
+        DataStream.get_wildcard_subscribers("router_test/c")
+        # pylint: disable=protected-access
+        assert list(DataStream._wildcard_cache) == ["router_test/a", "router_test/c"]
+        DataStream.unsubscribe_data("router_test/*", unique_id)
+
+    def test_publish_data_routes_to_shard(self, mocker):
+        """Test that topics are routed to the shard registered for their prefix."""
+        mocker.patch("viseron.data_stream.RestartableThread")
+        shard = DataStream.register_shard("shard_test", DATA_STREAM_DROP_POLICY_BLOCK)
+        assert (
+            DataStream.register_shard("shard_test", DATA_STREAM_DROP_POLICY_NEWEST)
+            is shard
+        )
+        assert shard.drop_policy == DATA_STREAM_DROP_POLICY_NEWEST
+
+        DataStream.publish_data("shard_test/frame_to_scan/object", "data")
+        assert shard.queue.get_nowait() == {
+            "data_topic": "shard_test/frame_to_scan/object",
+            "data": "data",
+        }
+        del DataStream._shards["shard_test"]  # pylint: disable=protected-access
@@ -0,0 +1,80 @@
+"""Tests for segments module."""
+import logging
+import os
+
+import pytest
+
+from viseron.segments import SegmentIndex
+
+
+def test_segment_index(tmp_path):
+    """Test that the segment list is read incrementally."""
+    segments_folder = tmp_path / "camera"
+    segments_folder.mkdir()
+    for segment in ["20210101120000.mp4", "20210101120005.mp4"]:
+        (segments_folder / segment).write_bytes(b"segment")
+    segment_list = tmp_path / ".camera_segments.csv"
+
+    index = SegmentIndex(
+        logging.getLogger(__name__), str(segments_folder), str(segment_list)
+    )
+    index.refresh()
+    assert index.get("20210101120000.mp4") is None
+
+    segment_list.write_text(
+        "20210101120000.mp4,0.000000,5.000000\n20210101120005.mp4,5.000000,"
+    )
+    index.refresh()
+    first = index.get("20210101120000.mp4")
+    assert first["duration"] == 5.0
+    assert first["end_time"] == first["start_time"] + 5.0
+    assert first["size"] == len(b"segment")
+    assert index.get("20210101120005.mp4") is None
+
+    with open(segment_list, "a", encoding="utf-8") as segment_list_file:
+        segment_list_file.write("10.040000\n")
+    index.refresh()
+    assert index.get("20210101120005.mp4")["duration"] == pytest.approx(5.04)
+
+    # FFmpeg truncates the list when restarted
+    segment_list.write_text("20210101120000.mp4,0.000000,4.000000\n")
+    index.refresh()
+    assert index.get("20210101120000.mp4")["duration"] == 4.0
+
+    # A replaced list that has grown past the old size
+    rotated_list = tmp_path / "rotated.csv"
+    rotated_list.write_text(
+        "20210101120000.mp4,0.000000,3.000000\n"
+        "20210101120005.mp4,3.000000,6.000000\n"
+    )
+    os.replace(rotated_list, segment_list)
+    index.refresh()
+    assert index.get("20210101120000.mp4")["duration"] == 3.0
+
+    os.remove(segments_folder / "20210101120005.mp4")
+    index.sync(os.listdir(segments_folder))
+    assert index.get("20210101120005.mp4") is None
+
+
+def test_segment_index_range_queries(tmp_path):
+    """Test that segments are looked up by start time."""
+    segments = ["20210101120000.mp4", "20210101120005.mp4", "20210101120010.mp4"]
+    index = SegmentIndex(logging.getLogger(__name__), str(tmp_path), "")
+    index.sync(segments[::-1] + ["invalid.mp4"])
+    assert index.segments == segments
+    for segment in segments[:2]:
+        index.set_duration(segment, 5.0)
+    start = index.get(segments[0])["start_time"]
+
+    assert index.find_segment(start + 7) == segments[1]
+    assert index.find_segment(start - 1) is None
+    # Duration of the last segment is unknown
+    assert index.find_segment(start + 12) is None
+
+    assert index.segments_between(start + 3, start + 7) == segments[:2]
+    assert index.segments_between(start - 10, start - 5) == []
+    assert index.segments_between(start + 11, start + 30) == segments[2:]
+    assert index.segments_before(start + 5) == segments[:1]
+
+    index.remove(segments[1])
+    assert index.segments == [segments[0], segments[2]]
@@ -100,6 +100,7 @@ class Viseron:
                 thread.stop()
             for thread in nvr_threads:
                 thread.join()
+            detector.stop()
             webserver.stop()
             webserver.join()
             LOGGER.info("Exiting")
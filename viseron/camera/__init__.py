@@ -3,19 +3,48 @@ from __future__ import annotations
 
 import datetime
 import logging
+from dataclasses import replace
 from threading import Event
 from time import sleep
 
 import cv2
 
-from viseron.const import TOPIC_FRAME_DECODE_OBJECT, TOPIC_FRAME_SCAN_OBJECT
+from viseron.const import (
+    CAMERA_INGEST_PYAV,
+    TOPIC_FRAME_DECODE_OBJECT,
+    TOPIC_FRAME_PROCESSED_MOTION,
+    TOPIC_FRAME_PROCESSED_OBJECT,
+    TOPIC_FRAME_SCAN_OBJECT,
+)
 from viseron.data_stream import DataStream
+from viseron.detector.tiling import calculate_tiles
+from viseron.helpers import calculate_crop_region
 from viseron.helpers.logs import SensitiveInformationFilter
 
 from .frame_decoder import FrameDecoder
 from .stream import Stream
 
 
+def create_stream(config, stream_config, write_segments, pipe_frames) -> Stream:
+    """Return Stream using the ingest backend set for the stream.
+
+    Streams that only write segments are always handled by an FFmpeg subprocess.
+    """
+    if stream_config.ingest == CAMERA_INGEST_PYAV and pipe_frames:
+        # PyAV is an optional dependency
+        from .pyav_stream import PyAVStream  # pylint: disable=import-outside-toplevel
+
+        return PyAVStream(
+            config,
+            stream_config,
+            write_segments=write_segments,
+            pipe_frames=pipe_frames,
+        )
+    return Stream(
+        config, stream_config, write_segments=write_segments, pipe_frames=pipe_frames
+    )
+
+
 class FFMPEGCamera:
     """Represents a camera which is consumed via FFmpeg."""
 
@@ -26,8 +55,14 @@ class FFMPEGCamera:
         self._connected = False
         self.resolution = None
         self._segments = None
+        self._motion_region = None
+        self._object_preprocess = None
+        self._tiles = []
         self.frame_ready = Event()
         self.decode_error = Event()
+        DataStream.register_shard(
+            config.camera.name_slug, config.camera.data_stream_drop_policy
+        )
 
         if cv2.ocl.haveOpenCL():
             cv2.ocl.setUseOpenCL(True)
@@ -44,20 +79,20 @@ class FFMPEGCamera:
         self._logger.debug("Initializing camera {}".format(self._config.camera.name))
 
         if self._config.camera.substream:
-            self.stream = Stream(
+            self.stream = create_stream(
                 self._config,
                 self._config.camera.substream,
                 write_segments=False,
                 pipe_frames=True,
             )
-            self._segments = Stream(
+            self._segments = create_stream(
                 self._config,
                 self._config.camera,
                 write_segments=True,
                 pipe_frames=False,
             )
         else:
-            self.stream = Stream(
+            self.stream = create_stream(
                 self._config,
                 self._config.camera,
                 write_segments=True,
@@ -71,6 +106,36 @@ class FFMPEGCamera:
         )
 
         if self._config.object_detection.enable:
+            # Detectors without a fixed model resolution use the normal decoder path
+            model_res = detector.preprocessor.model_res
+            if self._config.camera.scaled_outputs and model_res:
+                self.stream.add_scaled_output(*model_res)
+            self._object_preprocess = detector.preprocessor.preprocess
+            if self._config.object_detection.tiled:
+                self._tiles = calculate_tiles(
+                    self._config.object_detection.tile_columns,
+                    self._config.object_detection.tile_rows,
+                    self._config.object_detection.tile_overlap,
+                )
+                self._logger.debug(
+                    f"Splitting frames into {len(self._tiles)} tiles for "
+                    "object detection"
+                )
+            if (
+                self._config.object_detection.crop_to_motion
+                and not self._config.motion_detection.trigger_detector
+            ):
+                self._logger.warning(
+                    "crop_to_motion requires trigger_detector to be enabled for "
+                    "motion detection, scanning the whole frame instead"
+                )
+            elif self._config.object_detection.crop_to_motion:
+                width, height = model_res if model_res else self.resolution
+                self._model_aspect_ratio = width / height
+                DataStream.subscribe_data(
+                    f"{self._config.camera.name_slug}/{TOPIC_FRAME_PROCESSED_MOTION}",
+                    self.motion_processed,
+                )
             FrameDecoder(
                 self._logger,
                 self._config,
@@ -80,11 +145,78 @@ class FFMPEGCamera:
                 self.decode_error,
                 TOPIC_FRAME_DECODE_OBJECT,
                 TOPIC_FRAME_SCAN_OBJECT,
-                preprocess_callback=detector.object_detector.preprocess,
+                preprocess_callback=self.preprocess_object,
+                topic_processed=TOPIC_FRAME_PROCESSED_OBJECT,
+                adaptive_interval=(
+                    (
+                        self._config.object_detection.min_interval,
+                        self._config.object_detection.max_interval,
+                    )
+                    if self._config.object_detection.adaptive_interval
+                    else None
+                ),
             )
 
         self._logger.debug(f"Camera {self._config.camera.name} initialized")
 
+    def motion_processed(self, frame_to_scan):
+        """Store the area of the latest detected motion and when it was captured."""
+        motion_contours = frame_to_scan.frame.motion_contours
+        self._motion_region = (
+            frame_to_scan.capture_time,
+            motion_contours.rel_bounding_box(self._config.motion_detection.area)
+            if motion_contours
+            else None,
+        )
+
+    def current_motion_region(self, frame_to_scan):
+        """Return the area with motion in frame_to_scan, if it is known.
+
+        The motion detector scans other frames than the object detector, so the
+        latest motion result is only used if it was captured within one motion
+        detection interval of frame_to_scan.
+        """
+        if self._motion_region is None:
+            return None
+        capture_time, motion_region = self._motion_region
+        motion_interval = (
+            self._config.motion_detection.max_interval
+            if self._config.motion_detection.adaptive_interval
+            else self._config.motion_detection.interval
+        )
+        if abs(frame_to_scan.capture_time - capture_time) > motion_interval:
+            return None
+        return motion_region
+
+    def preprocess_object(self, frame_to_scan):
+        """Crop frame to the area with motion or split it into tiles.
+
+        The detectors preprocessor is then run on the frame, or on each tile.
+        """
+        motion_region = self.current_motion_region(frame_to_scan)
+        if motion_region is not None:
+            frame_to_scan.frame.set_crop_region(
+                frame_to_scan.decoder_name,
+                calculate_crop_region(
+                    motion_region,
+                    self._config.object_detection.crop_padding,
+                    (frame_to_scan.stream_width, frame_to_scan.stream_height),
+                    self._model_aspect_ratio,
+                ),
+            )
+        elif self._tiles:
+            frame_to_scan.tiles = []
+            if self._config.object_detection.tile_full_frame:
+                frame_to_scan.tiles.append(frame_to_scan.decoder_name)
+                self._object_preprocess(frame_to_scan)
+            for index, tile in enumerate(self._tiles):
+                tile_name = f"{frame_to_scan.decoder_name}.tile_{index}"
+                frame_to_scan.frame.set_crop_region(tile_name, tile)
+                self._object_preprocess(replace(frame_to_scan, decoder_name=tile_name))
+                frame_to_scan.tiles.append(tile_name)
+            return
+        self._object_preprocess(frame_to_scan)
+
     def capture_pipe(self):
         """Start capturing frames from camera."""
         self._logger.debug("Starting capture thread")
@@ -98,6 +230,11 @@ class FFMPEGCamera:
             self._segments.start_pipe()
 
         while self._connected:
+            if self.stream.switch_pending:
+                self.stream.switch_mode()
+                empty_frames = 0
+                continue
+
             if self.decode_error.is_set():
                 DataStream.publish_data(
                     f"{self._config.camera.name_slug}/status", "disconnected"
@@ -120,6 +257,9 @@ class FFMPEGCamera:
                 self.frame_ready.clear()
                 continue
 
+            if self.stream.switch_pending:
+                continue
+
             if self.stream.poll is not None:
                 self._logger.error("FFmpeg process has exited")
                 self.decode_error.set()
@@ -1,6 +1,8 @@
 """Frame read from FFmpeg."""
 import logging
-from typing import List
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -9,9 +11,31 @@ from viseron.detector.detected_object import DetectedObject
 
 LOGGER = logging.getLogger(__name__)
 
+# Color conversions of YUV 4:2:0 frames with interleaved or separate chroma planes
+SEMI_PLANAR_CONVERSIONS = {
+    cv2.COLOR_YUV2RGB_NV12,
+    cv2.COLOR_YUV2BGR_NV12,
+    cv2.COLOR_YUV2RGB_NV21,
+    cv2.COLOR_YUV2BGR_NV21,
+}
+PLANAR_CONVERSIONS = {
+    cv2.COLOR_YUV2RGB_I420,
+    cv2.COLOR_YUV2BGR_I420,
+    cv2.COLOR_YUV2RGB_YV12,
+    cv2.COLOR_YUV2BGR_YV12,
+}
+
 
 class Frame:
-    """Represents a frame read from FFMpeg."""
+    """Represents a frame read from FFMpeg.
+
+    The same frame is shared between all decoders, detectors and stream handlers.
+    Each representation of the frame is converted once, under a lock, and then cached
+    on the frame. conversion_counts shows how many times each conversion has run.
+
+    scaled_frames holds raw frames that FFmpeg has already scaled, keyed by
+    (width, height). They are used by resize and resize_luma when the size matches.
+    """
 
     def __init__(
         self,
@@ -21,6 +45,7 @@ class Frame:
         raw_frame,
         frame_width,
         frame_height,
+        scaled_frames: Optional[Dict[Tuple[int, int], bytearray]] = None,
     ):
         self._cvt_color = cvt_color
         self._color_plane_width = color_plane_width
@@ -28,37 +53,231 @@ class Frame:
         self._raw_frame = raw_frame
         self._frame_width = frame_width
         self._frame_height = frame_height
-        self._decoded_frame = None
-        self._decoded_frame_umat = None
-        self._decoded_frame_umat_rgb = None
-        self._decoded_frame_mat_rgb = None
+        self._scaled_frames = scaled_frames or {}
+        self._lock = threading.RLock()
+        self._decode_failed = False
+        self._conversions: Dict[str, Any] = {}
+        self._conversion_counts: Counter = Counter()
         self._resized_frames = {}
+        self._crop_regions: Dict[str, Tuple[float, float, float, float]] = {}
+        self._cropped_regions: Dict[str, Tuple[float, float, float, float]] = {}
         self._preprocessed_frames = {}
         self._objects: List[DetectedObject] = []
         self._motion_contours = None
 
+    def _convert(self, name: str, convert: Callable[[], Any]):
+        """Return cached conversion, or run the conversion if not already done."""
+        conversion = self._conversions.get(name)
+        if conversion is not None:
+            return conversion
+
+        with self._lock:
+            # Another thread might have finished the conversion while we waited
+            conversion = self._conversions.get(name)
+            if conversion is None:
+                conversion = convert()
+                self._conversion_counts[name] += 1
+                self._conversions[name] = conversion
+            return conversion
+
     def decode_frame(self):
-        """Decode raw frame to numpy array."""
-        try:
-            self._decoded_frame = np.frombuffer(self.raw_frame, np.uint8).reshape(
-                self._color_plane_height, self._color_plane_width
-            )
-        except ValueError:
-            LOGGER.warning("Failed to decode frame")
-            return False
-        return True
+        """Decode raw frame to numpy array.
+
+        Returns True if the frame was decoded successfully.
+        """
+        with self._lock:
+            if "decoded_frame" in self._conversions:
+                return True
+            if self._decode_failed:
+                return False
+            try:
+                self._convert(
+                    "decoded_frame",
+                    lambda: np.frombuffer(self.raw_frame, np.uint8).reshape(
+                        self._color_plane_height, self._color_plane_width
+                    ),
+                )
+            except ValueError:
+                LOGGER.warning("Failed to decode frame")
+                self._decode_failed = True
+                return False
+            return True
+
+    def set_crop_region(
+        self, decoder_name: str, region: Tuple[float, float, float, float]
+    ) -> None:
+        """Crop frame to relative region before it is resized for decoder_name."""
+        self._crop_regions[decoder_name] = region
+
+    def crop_region(
+        self, decoder_name: str
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """Return relative region the resized frame was cropped to, if any."""
+        return self._cropped_regions.get(decoder_name)
+
+    def _pixel_region(
+        self, region: Tuple[float, float, float, float]
+    ) -> Tuple[int, int, int, int]:
+        """Convert relative region to even pixel coordinates within the frame."""
+        x1 = int(region[0] * self._frame_width) // 2 * 2
+        y1 = int(region[1] * self._frame_height) // 2 * 2
+        x2 = min(-(-int(region[2] * self._frame_width) // 2) * 2, self._frame_width)
+        y2 = min(-(-int(region[3] * self._frame_height) // 2) * 2, self._frame_height)
+        return x1, y1, max(x2, x1 + 2), max(y2, y1 + 2)
 
     def resize(self, decoder_name, width, height):
-        """Resize and store frame."""
+        """Resize and store frame.
+
+        YUV 4:2:0 frames are scaled before they are converted to RGB, so the cost of
+        the color conversion depends on the requested size instead of the size of the
+        frame.
+
+        If a crop region is set for decoder_name, only that region of the full
+        resolution frame is resized.
+        """
+        region = self._crop_regions.get(decoder_name)
+        if region is not None:
+            self._resize_region(decoder_name, region, width, height)
+            return
+
+        scaled_frame = self._scaled_frame(width, height)
+        if scaled_frame is not None:
+            self._resized_frames[decoder_name] = self._convert(
+                f"scaled_{width}x{height}",
+                lambda: cv2.UMat(cv2.cvtColor(scaled_frame, self._cvt_color)),
+            )
+            return
+
+        if self._yuv_resizable:
+            self._resized_frames[decoder_name] = self._resize_yuv(width, height)
+            return
+
         self._resized_frames[decoder_name] = cv2.resize(
             self.decoded_frame_umat_rgb,
             (width, height),
             interpolation=cv2.INTER_LINEAR,
         )
 
+    def _resize_region(self, decoder_name, region, width, height):
+        """Crop frame to region and resize it."""
+        pixel_region = self._pixel_region(region)
+        x1, y1, x2, y2 = pixel_region
+        self._cropped_regions[decoder_name] = (
+            x1 / self._frame_width,
+            y1 / self._frame_height,
+            x2 / self._frame_width,
+            y2 / self._frame_height,
+        )
+        if self._yuv_resizable:
+            self._resized_frames[decoder_name] = self._resize_yuv(
+                width, height, pixel_region
+            )
+            return
+
+        self._resized_frames[decoder_name] = cv2.resize(
+            cv2.UMat(self.decoded_frame_umat_rgb, (y1, y2), (x1, x2)),
+            (width, height),
+            interpolation=cv2.INTER_LINEAR,
+        )
+
+    @property
+    def _yuv_resizable(self) -> bool:
+        """Return True if the YUV planes can be resized before color conversion."""
+        return (
+            self._cvt_color in SEMI_PLANAR_CONVERSIONS | PLANAR_CONVERSIONS
+            and self._frame_width % 2 == 0
+            and self._frame_height % 2 == 0
+        )
+
+    def _scaled_frame(self, width, height):
+        """Return frame scaled by FFmpeg to width and height, if there is one."""
+        raw_frame = self._scaled_frames.get((width, height))
+        if raw_frame is None:
+            return None
+        return np.frombuffer(raw_frame, np.uint8).reshape(height * 3 // 2, width)
+
+    def _resize_yuv(self, width, height, pixel_region=None):
+        """Scale the luma and chroma planes separately, then convert color.
+
+        pixel_region is an optional (x1, y1, x2, y2) region with even coordinates to
+        crop the planes to before scaling.
+        """
+        # Chroma is subsampled by 2 in both directions so the size has to be even
+        even_width = width + width % 2
+        even_height = height + height % 2
+        x1, y1, x2, y2 = pixel_region or (0, 0, self._frame_width, self._frame_height)
+        decoded_frame = self.decoded_frame
+        chroma_size = (self._frame_height // 2, self._frame_width // 2)
+        chroma_crop = (slice(y1 // 2, y2 // 2), slice(x1 // 2, x2 // 2))
+        scaled_chroma_size = (even_width // 2, even_height // 2)
+
+        planes = [
+            cv2.resize(
+                decoded_frame[y1:y2, x1:x2],
+                (even_width, even_height),
+                interpolation=cv2.INTER_LINEAR,
+            )
+        ]
+        chroma = decoded_frame[self._frame_height :].reshape(-1)
+        if self._cvt_color in SEMI_PLANAR_CONVERSIONS:
+            planes.append(
+                cv2.resize(
+                    chroma.reshape(*chroma_size, 2)[chroma_crop],
+                    scaled_chroma_size,
+                    interpolation=cv2.INTER_LINEAR,
+                )
+            )
+        else:
+            plane_size = chroma_size[0] * chroma_size[1]
+            for plane in range(2):
+                planes.append(
+                    cv2.resize(
+                        chroma[plane * plane_size : (plane + 1) * plane_size].reshape(
+                            chroma_size
+                        )[chroma_crop],
+                        scaled_chroma_size,
+                        interpolation=cv2.INTER_LINEAR,
+                    )
+                )
+
+        scaled_frame = cv2.cvtColor(
+            np.concatenate([plane.reshape(-1) for plane in planes]).reshape(
+                even_height * 3 // 2, even_width
+            ),
+            self._cvt_color,
+        )
+        if (even_width, even_height) != (width, height):
+            scaled_frame = cv2.resize(
+                scaled_frame, (width, height), interpolation=cv2.INTER_LINEAR
+            )
+        return cv2.UMat(scaled_frame)
+
+    def resize_luma(self, width, height):
+        """Return the luma plane resized to width and height.
+
+        The resized luma plane is cached per size, so it is only scaled once even if
+        several motion detectors ask for it.
+        """
+        scaled_frame = self._scaled_frame(width, height)
+        if scaled_frame is not None:
+            return scaled_frame[:height]
+
+        return self._convert(
+            f"luma_{width}x{height}",
+            lambda: cv2.resize(
+                self.decoded_frame_luma,
+                (width, height),
+                interpolation=cv2.INTER_LINEAR,
+            ),
+        )
+
     def get_resized_frame(self, decoder_name: str):
         """Fetch a stored frame."""
-        return self._resized_frames.get(decoder_name, self.decoded_frame_umat_rgb)
+        # Avoid converting the full frame to RGB if a resized frame exists
+        resized_frame = self._resized_frames.get(decoder_name)
+        if resized_frame is None:
+            return self.decoded_frame_umat_rgb
+        return resized_frame
 
     def save_preprocessed_frame(self, decoder_name: str, frame):
         """Store a frame returned from a preprocessor."""
@@ -66,15 +285,21 @@ class Frame:
 
     def get_preprocessed_frame(self, decoder_name: str):
         """Return stored from from a preprocessor."""
-        return self._preprocessed_frames.get(
-            decoder_name, self.get_resized_frame(decoder_name)
-        )
+        preprocessed_frame = self._preprocessed_frames.get(decoder_name)
+        if preprocessed_frame is None:
+            return self.get_resized_frame(decoder_name)
+        return preprocessed_frame
 
     @property
     def raw_frame(self):
         """Return raw frame."""
         return self._raw_frame
 
+    @property
+    def scaled_frames(self) -> Dict[Tuple[int, int], bytearray]:
+        """Return raw frames scaled by FFmpeg."""
+        return self._scaled_frames
+
     @property
     def frame_width(self):
         """Return frame width."""
@@ -88,16 +313,25 @@ class Frame:
     @property
     def decoded_frame(self):
         """Return decoded frame. Decodes frame if not already done."""
-        if self._decoded_frame is None:
-            self._decoded_frame = self.decode_frame()
-        return self._decoded_frame
+        if self.decode_frame():
+            return self._conversions["decoded_frame"]
+        return None
+
+    @property
+    def decoded_frame_luma(self):
+        """Return the luma plane of the decoded frame.
+
+        This is a view of the decoded frame, so no data is copied.
+        """
+        return self._convert(
+            "luma",
+            lambda: self.decoded_frame[: self._frame_height, : self._frame_width],
+        )
 
     @property
     def decoded_frame_umat(self):
         """Return decoded frame in UMat format. Decodes frame if not already done."""
-        if self._decoded_frame_umat is None:
-            self._decoded_frame_umat = cv2.UMat(self.decoded_frame)
-        return self._decoded_frame_umat
+        return self._convert("umat", lambda: cv2.UMat(self.decoded_frame))
 
     @property
     def decoded_frame_umat_rgb(self):
@@ -105,11 +339,9 @@ class Frame:
 
         Decodes frame if not already done.
         """
-        if self._decoded_frame_umat_rgb is None:
-            self._decoded_frame_umat_rgb = cv2.cvtColor(
-                self.decoded_frame_umat, self._cvt_color
-            )
-        return self._decoded_frame_umat_rgb
+        return self._convert(
+            "umat_rgb", lambda: cv2.cvtColor(self.decoded_frame_umat, self._cvt_color)
+        )
 
     @property
     def decoded_frame_mat_rgb(self):
@@ -117,9 +349,12 @@ class Frame:
 
         Decodes frame if not already done.
         """
-        if self._decoded_frame_mat_rgb is None:
-            self._decoded_frame_mat_rgb = self.decoded_frame_umat_rgb.get()
-        return self._decoded_frame_mat_rgb
+        return self._convert("mat_rgb", self.decoded_frame_umat_rgb.get)
+
+    @property
+    def conversion_counts(self) -> Counter:
+        """Return number of times each representation of the frame was converted."""
+        return self._conversion_counts
 
     @property
     def objects(self) -> List[DetectedObject]:
@@ -0,0 +1,71 @@
+"""Preallocated ring of raw frame slots."""
+from __future__ import annotations
+
+import logging
+import sys
+from typing import List
+
+
+class FrameBuffer:
+    """A ring of preallocated slots that raw frames are read into.
+
+    Each slot is a bytearray which is handed to a Frame. Any numpy array created from
+    the slot keeps a reference to it, so a slot is considered free again only when
+    the ring itself holds the last reference to it. This means a slot is recycled
+    first when every decoder, detector and stream handler is done with the frame.
+
+    If all slots are busy a temporary slot is allocated instead, which is tracked in
+    the overflow counter.
+    """
+
+    def __init__(self, logger: logging.Logger, frame_bytes: int, slots: int):
+        self._logger = logger
+        self._frame_bytes = frame_bytes
+        self._slots: List[bytearray] = [bytearray(frame_bytes) for _ in range(slots)]
+        self._next_slot = 0
+        self._overflow = 0
+        self._free_refcount = self._refcount(0) if self._slots else 0
+
+    def _refcount(self, index: int) -> int:
+        """Return the reference count of a slot."""
+        return sys.getrefcount(self._slots[index])
+
+    def acquire(self) -> bytearray:
+        """Return a free slot, or a temporary one if the ring is exhausted."""
+        for _ in range(len(self._slots)):
+            index = self._next_slot
+            self._next_slot = (self._next_slot + 1) % len(self._slots)
+            if self._refcount(index) <= self._free_refcount:
+                return self._slots[index]
+
+        if self._overflow == 0:
+            self._logger.warning(
+                "All frame buffer slots are in use, allocating a temporary frame. "
+                "Consider increasing frame_buffer_slots"
+            )
+        self._overflow += 1
+        return bytearray(self._frame_bytes)
+
+    @property
+    def frame_bytes(self) -> int:
+        """Return size of each slot."""
+        return self._frame_bytes
+
+    @property
+    def slots(self) -> int:
+        """Return number of preallocated slots."""
+        return len(self._slots)
+
+    @property
+    def slots_in_use(self) -> int:
+        """Return number of slots currently referenced by a frame."""
+        return sum(
+            1
+            for index in range(len(self._slots))
+            if self._refcount(index) > self._free_refcount
+        )
+
+    @property
+    def overflow(self) -> int:
+        """Return number of temporary frames allocated because the ring was full."""
+        return self._overflow
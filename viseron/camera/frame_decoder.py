@@ -3,10 +3,10 @@ from __future__ import annotations
 
 import logging
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from queue import Queue
-from threading import Event
-from typing import TYPE_CHECKING, Callable
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
 from viseron.camera.frame import Frame
 from viseron.data_stream import DataStream
@@ -20,7 +20,11 @@ if TYPE_CHECKING:
 
 @dataclass
 class FrameToScan:
-    """Class for a frame that is marked for scanning."""
+    """Class for a frame that is marked for scanning.
+
+    tiles holds the decoder names the frame was preprocessed under when it is
+    scanned in tiles, and tile_of points to the frame a tile was split from.
+    """
 
     decoder_name: str
     frame: Frame
@@ -28,6 +32,8 @@ class FrameToScan:
     stream_height: int
     camera_config: NVRConfig
     capture_time: float
+    tiles: List[str] = field(default_factory=list)
+    tile_of: Optional[FrameToScan] = None
 
 
 class FrameDecoder:
@@ -35,8 +41,17 @@ class FrameDecoder:
 
     Frames are then published to subsribers, object/motion detector.
     This makes it possible to decode frames in parallel with detection.
+
+    If adaptive_interval is given as (min_interval, max_interval), the interval is
+    adjusted using additive increase/multiplicative decrease of the scan rate, based
+    on the frames published to topic_processed. The interval is shortened by one
+    frame for each frame processed in time. It is multiplied by INTERVAL_BACKOFF if
+    a frame takes longer than the interval to process, or if frames are still
+    waiting when the next frame is due.
     """
 
+    INTERVAL_BACKOFF = 1.5
+
     def __init__(
         self,
         logger: logging.Logger,
@@ -48,6 +63,8 @@ class FrameDecoder:
         topic_decode: str,
         topic_scan: str,
         preprocess_callback: Callable = None,
+        topic_processed: str = None,
+        adaptive_interval: Optional[Tuple[float, float]] = None,
     ):
         self._logger = logger
         self._config = config
@@ -67,6 +84,14 @@ class FrameDecoder:
         self._topic_decode = f"{config.camera.name_slug}/{topic_decode}"
         DataStream.subscribe_data(self._topic_decode, self._decoder_queue)
 
+        self._adaptive_interval = adaptive_interval
+        self._adaptive_lock = Lock()
+        self._in_flight = 0
+        if adaptive_interval and topic_processed:
+            DataStream.subscribe_data(
+                f"{config.camera.name_slug}/{topic_processed}", self.frame_processed
+            )
+
         decode_thread = RestartableThread(
             name=__name__ + "." + config.camera.name_slug,
             target=self.decode_frame,
@@ -89,13 +114,58 @@ class FrameDecoder:
 
     def calculate_interval(self):
         """Convert interval from seconds to FPS."""
-        self._interval_fps = round(self.interval * self._stream.output_fps)
+        # Keyframes are sparse enough that every one of them is scanned
+        if self._stream.idle:
+            self._interval_fps = 1
+            return
+        self._interval_fps = max(round(self.interval * self._stream.output_fps), 1)
+
+    @property
+    def shortest_interval(self) -> float:
+        """Return the shortest interval this decoder can run at."""
+        if self._adaptive_interval:
+            return self._adaptive_interval[0]
+        return self.interval
+
+    def set_interval(self, interval: float) -> None:
+        """Set interval within the adaptive bounds."""
+        min_interval, max_interval = self._adaptive_interval  # type: ignore
+        interval = min(max(interval, min_interval), max_interval)
+        if interval != self.interval:
+            self.interval = interval
+            self.calculate_interval()
+
+    def frame_sent(self) -> None:
+        """Back off if frames are still waiting to be processed."""
+        with self._adaptive_lock:
+            if self._in_flight >= 2:
+                self.set_interval(self.interval * self.INTERVAL_BACKOFF)
+                self._logger.debug(
+                    f"{self.name} is falling behind, interval is now {self.interval}s"
+                )
+                # Frames that were dropped will never be processed
+                self._in_flight = 0
+            self._in_flight += 1
+
+    def frame_processed(self, frame_to_scan: FrameToScan) -> None:
+        """Adjust interval based on how long it took to process the frame."""
+        if frame_to_scan.decoder_name != self.name:
+            return
+        frame_age = time.time() - frame_to_scan.capture_time
+        with self._adaptive_lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+            if frame_age > self.interval:
+                self.set_interval(self.interval * self.INTERVAL_BACKOFF)
+            else:
+                self.set_interval(self.interval - 1 / self._stream.output_fps)
 
     def scan_frame(self, current_frame):
         """Publish frame if marked for scanning."""
         if self.scan.is_set():
             if self._frame_number % self._interval_fps == 0:
                 self._frame_number = 0
+                if self._adaptive_interval:
+                    self.frame_sent()
                 DataStream.publish_data(
                     self._topic_decode,
                     FrameToScan(
@@ -0,0 +1,275 @@
+"""Read frames from a camera using PyAV inside Viseron's process.
+
+Instead of running FFmpeg as a subprocess and reading raw frames through a pipe, the
+stream is demuxed and decoded by libav in the capture thread. Decoded planes are
+copied directly into the frame buffer, and the packets of the stream can at the same
+time be written to the recorded segments without re-encoding.
+
+PyAV is an optional dependency, which is only imported if a camera has ingest set to
+pyav.
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Optional, Union
+
+import av
+import numpy as np
+
+from viseron.const import (
+    CAMERA_SEGMENT_DURATION,
+    CAMERA_SEGMENT_LIST_SIZE,
+    FFPROBE_TIMEOUT,
+)
+from viseron.exceptions import StreamInformationError
+from viseron.segments import segment_list_path
+
+from .frame import Frame
+from .stream import Stream
+
+if TYPE_CHECKING:
+    from viseron.config.config_camera import CameraConfig, Substream
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds to wait for the stream to open, and for data once it is open. A camera
+# that stops sending data without closing the connection raises an error instead of
+# blocking the capture thread, which restarts the stream
+OPEN_TIMEOUT = FFPROBE_TIMEOUT
+READ_TIMEOUT = 10
+
+
+def copy_planes(video_frame, frame_bytes: bytearray, pix_fmt: str) -> None:
+    """Copy the planes of a decoded frame into a contiguous YUV 4:2:0 buffer.
+
+    Decoded planes are padded at the end of each line, which is dropped.
+    """
+    width = video_frame.width
+    height = video_frame.height
+    if pix_fmt == "nv12":
+        plane_sizes = [(height, width), (height // 2, width)]
+    else:
+        plane_sizes = [
+            (height, width),
+            (height // 2, width // 2),
+            (height // 2, width // 2),
+        ]
+
+    destination = np.frombuffer(frame_bytes, np.uint8)
+    offset = 0
+    for plane, (rows, row_bytes) in zip(video_frame.planes, plane_sizes):
+        source = np.frombuffer(plane, np.uint8).reshape(-1, plane.line_size)
+        destination[offset : offset + rows * row_bytes].reshape(rows, row_bytes)[
+            ...
+        ] = source[:rows, :row_bytes]
+        offset += rows * row_bytes
+
+
+class PyAVStream(Stream):
+    """Represents a stream of frames from a camera, read using PyAV.
+
+    FFmpeg specific options like input_args, hwaccel_args, codec and filter_args are
+    not used.
+    """
+
+    # Keyframe only decoding is toggled on the decoder, no restart needed
+    switch_restarts_pipe = False
+
+    def __init__(
+        self,
+        config,
+        stream_config: Union[CameraConfig, Substream],
+        write_segments=True,
+        pipe_frames=True,
+    ):
+        self._input = None
+        self._output = None
+        self._video_stream = None
+        self._stream_map: dict = {}
+        self._packets = None
+        self._decoded_frames: list = []
+        self._next_frame_time = 0.0
+        self._exited = False
+        super().__init__(
+            config,
+            stream_config,
+            write_segments=write_segments,
+            pipe_frames=pipe_frames,
+        )
+        if stream_config.hwaccel_args or stream_config.filter_args:
+            self._logger.warning(
+                "hwaccel_args and filter_args are not used with ingest pyav"
+            )
+
+    def create_symlink(self):
+        """No FFmpeg process is started, so there is nothing to symlink."""
+
+    def add_scaled_output(self, width: int, height: int) -> None:
+        """Scaled outputs are not supported, frames are scaled by Frame instead."""
+
+    def open_input(self):
+        """Open the camera stream."""
+        options = {}
+        if self.stream_config.stream_format == "rtsp":
+            options["rtsp_transport"] = self.stream_config.rtsp_transport
+        return av.open(
+            self.stream_config.stream_url,
+            options=options,
+            timeout=(OPEN_TIMEOUT, READ_TIMEOUT),
+        )
+
+    def get_stream_information(self, stream_url):
+        """Return stream information read from the opened stream."""
+        self._logger.debug("Getting stream information using PyAV")
+        try:
+            with self.open_input() as container:
+                video_stream = container.streams.video[0]
+                audio_codec = (
+                    container.streams.audio[0].codec_context.name
+                    if container.streams.audio
+                    else None
+                )
+                return (
+                    video_stream.codec_context.width,
+                    video_stream.codec_context.height,
+                    round(float(video_stream.average_rate or 0)),
+                    video_stream.codec_context.name,
+                    audio_codec,
+                )
+        except (av.error.FFmpegError, IndexError) as error:
+            self._logger.error(f"Could not read stream information: {error}")
+            raise StreamInformationError(None, None, None) from error
+
+    def open_output(self):
+        """Open segment muxer which stream copies the video and audio packets."""
+        self._output = av.open(
+            self.segment_path,
+            mode="w",
+            format="segment",
+            options={
+                "segment_time": str(CAMERA_SEGMENT_DURATION),
+                "reset_timestamps": "1",
+                "strftime": "1",
+                "segment_list": segment_list_path(self._config),
+                "segment_list_type": "csv",
+                "segment_list_size": str(CAMERA_SEGMENT_LIST_SIZE),
+            },
+        )
+        self._stream_map[self._video_stream] = self._output.add_stream(
+            template=self._video_stream
+        )
+        if self._input.streams.audio:
+            if self.stream_config.audio_codec not in ("unset", "copy", None):
+                self._logger.warning(
+                    "Audio can only be copied with ingest pyav, "
+                    f"ignoring audio_codec {self.stream_config.audio_codec}"
+                )
+            audio_stream = self._input.streams.audio[0]
+            self._stream_map[audio_stream] = self._output.add_stream(
+                template=audio_stream
+            )
+
+    def start_pipe(self):
+        """Open the camera stream and, if enabled, the segment muxer."""
+        self._logger.debug(f"Opening {self.stream_config.stream_url} using PyAV")
+        self._exited = False
+        self._input = self.open_input()
+        self._video_stream = self._input.streams.video[0]
+        self._video_stream.thread_type = "AUTO"
+        self._stream_map = {self._video_stream: None}
+        if self._write_segments:
+            self.open_output()
+        self.apply_idle()
+        self._packets = self._input.demux(list(self._stream_map))
+        self._decoded_frames = []
+        self._next_frame_time = 0.0
+
+    def close_pipe(self):
+        """Close the segment muxer and the camera stream."""
+        if self._output:
+            try:
+                self._output.close()
+            except av.error.FFmpegError as error:
+                self._logger.error(f"Error closing segment muxer: {error}")
+            self._output = None
+        if self._input:
+            self._input.close()
+            self._input = None
+        self._exited = True
+
+    def poll(self):
+        """Return 1 if the stream has ended, None if it is still open."""
+        return 1 if self._exited else None
+
+    def apply_idle(self):
+        """Let the decoder skip all but keyframes while idle."""
+        self._video_stream.codec_context.skip_frame = (
+            "NONKEY" if self._idle else "DEFAULT"
+        )
+
+    def switch_mode(self):
+        """Switch decoding mode without reopening the stream."""
+        if self._pending_stream_information is not None:
+            super().switch_mode()
+            return
+        self._idle = self._requested_idle
+        self.apply_idle()
+        for decoder in self.decoders.values():
+            decoder.calculate_interval()
+
+    def decode_next(self):
+        """Demux until a frame is decoded, muxing packets to the segments."""
+        while not self._decoded_frames:
+            packet = next(self._packets)
+            output_stream = self._stream_map.get(packet.stream)
+            if output_stream is not None and packet.dts is not None:
+                if packet.stream is self._video_stream:
+                    # Decode before the packet is handed over to the muxer
+                    self._decoded_frames = packet.decode()
+                packet.stream = output_stream
+                self._output.mux(packet)
+                continue
+            if packet.stream is self._video_stream:
+                self._decoded_frames = packet.decode()
+        return self._decoded_frames.pop(0)
+
+    def read(self) -> Optional[Frame]:
+        """Return a single frame from the stream."""
+        if not self._input:
+            return None
+
+        try:
+            while True:
+                video_frame = self.decode_next()
+                # Drop frames to match output FPS, like the fps filter does
+                if self._idle or video_frame.time is None:
+                    break
+                if video_frame.time >= self._next_frame_time:
+                    self._next_frame_time += 1 / self.output_fps
+                    if self._next_frame_time < video_frame.time:
+                        self._next_frame_time = video_frame.time + 1 / self.output_fps
+                    break
+        except (av.error.FFmpegError, StopIteration) as error:
+            self._logger.error(f"Error reading from stream: {error!r}")
+            self._exited = True
+            return None
+
+        if (
+            video_frame.format.name != self.stream_config.pix_fmt
+            or video_frame.width != self.width
+            or video_frame.height != self.height
+        ):
+            video_frame = video_frame.reformat(
+                width=self.width, height=self.height, format=self.stream_config.pix_fmt
+            )
+        frame_bytes = self._frame_buffer.acquire()
+        copy_planes(video_frame, frame_bytes, self.stream_config.pix_fmt)
+        self.report_switch_latency()
+        return Frame(
+            self._color_converter,
+            self._color_plane_width,
+            self._color_plane_height,
+            frame_bytes,
+            self.width,
+            self.height,
+        )
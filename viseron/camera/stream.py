@@ -1,11 +1,15 @@
 """Class to interact with an FFmpeog stream."""
 from __future__ import annotations
 
+import fcntl
 import json
 import logging
 import os
 import subprocess as sp
-from typing import TYPE_CHECKING, Dict, Optional, Union
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import IO, TYPE_CHECKING, Deque, Dict, List, Optional, Tuple, Union
 
 import cv2
 from tenacity import (
@@ -19,24 +23,145 @@ from tenacity import (
 from viseron.camera.frame_decoder import FrameDecoder
 from viseron.const import (
     CAMERA_SEGMENT_ARGS,
+    CAMERA_SEGMENT_LIST_SIZE,
     ENV_FFMPEG_PATH,
     FFMPEG_LOG_LEVELS,
     FFPROBE_TIMEOUT,
 )
-from viseron.detector import Detector
 from viseron.exceptions import FFprobeError, FFprobeTimeout, StreamInformationError
+from viseron.helpers import spawn
 from viseron.helpers.logs import FFmpegFilter, LogPipe, SensitiveInformationFilter
+from viseron.segments import segment_list_path
 from viseron.watchdog.subprocess_watchdog import RestartablePopen
 
 from .frame import Frame
+from .frame_buffer import FrameBuffer
+from .stream_information_cache import StreamInformation, StreamInformationCache
 
 if TYPE_CHECKING:
     from viseron.config.config_camera import CameraConfig, Substream
 
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+# Number of scaled frames that are kept while waiting for the main frame
+SCALED_OUTPUT_QUEUE_SIZE = 2
+# Seconds to wait for a scaled frame after its full resolution frame has been read
+SCALED_OUTPUT_TIMEOUT = 1
+
+
+def set_pipe_size(fd: int, size: int) -> None:
+    """Try to make the pipe large enough to hold size bytes."""
+    try:
+        with open("/proc/sys/fs/pipe-max-size", encoding="utf-8") as max_size:
+            size = min(size, int(max_size.read()))
+        fcntl.fcntl(fd, F_SETPIPE_SZ, size)
+    except OSError:
+        pass
+
+
+class ScaledOutput:
+    """An extra rawvideo output from FFmpeg, scaled to the size a detector needs.
+
+    The pipe is drained by its own thread, so FFmpeg never blocks on a scaled output
+    while the main pipe is being read. Frames are numbered in the order they are
+    read, and each output receives the same frames as the main output, which is how
+    a scaled frame is matched with its full resolution frame.
+    """
+
+    def __init__(self, logger: logging.Logger, width: int, height: int, slots: int):
+        self._logger = logger
+        self.width = width
+        self.height = height
+        self.frame_bytes = int(width * height * 1.5)
+        self.frame_buffer = FrameBuffer(logger, self.frame_bytes, slots)
+        self.read_pipe: Optional[IO[bytes]] = None
+        self.write_fd: Optional[int] = None
+        self._frames: Deque[Tuple[int, bytearray]] = deque(
+            maxlen=SCALED_OUTPUT_QUEUE_SIZE
+        )
+        self._frames_condition = Condition()
+        self._reader: Optional[Thread] = None
+
+    def open(self) -> None:
+        """Create the pipe that FFmpeg writes to and start reading from it."""
+        read_fd, self.write_fd = os.pipe()
+        set_pipe_size(read_fd, self.frame_bytes)
+        self.read_pipe = os.fdopen(read_fd, "rb")
+        self._frames.clear()
+        self._reader = Thread(
+            name=f"{self._logger.name}.scaled_{self.width}x{self.height}",
+            target=self._read_frames,
+            args=(self.read_pipe,),
+            daemon=True,
+        )
+        self._reader.start()
+
+    def _read_frames(self, read_pipe: IO[bytes]) -> None:
+        """Read frames from the pipe until FFmpeg closes it."""
+        index = 0
+        while True:
+            frame_bytes = self.frame_buffer.acquire()
+            if read_pipe.readinto(frame_bytes) != self.frame_bytes:  # type: ignore
+                break
+            with self._frames_condition:
+                self._frames.append((index, frame_bytes))
+                self._frames_condition.notify_all()
+            index += 1
+        with self._frames_condition:
+            self._frames_condition.notify_all()
+
+    def close_write_fd(self) -> None:
+        """Close the write end of the pipe, which is only used by FFmpeg."""
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+            self.write_fd = None
+
+    def close(self) -> None:
+        """Close the pipe.
+
+        FFmpeg has exited at this point, so the reader thread sees EOF and exits.
+        """
+        self.close_write_fd()
+        if self._reader:
+            self._reader.join(timeout=SCALED_OUTPUT_TIMEOUT)
+            self._reader = None
+        if self.read_pipe:
+            self.read_pipe.close()
+            self.read_pipe = None
+
+    def read(self, index: int) -> Optional[bytearray]:
+        """Return the scaled frame with the same index as the main frame.
+
+        None is returned if the frame does not arrive within SCALED_OUTPUT_TIMEOUT
+        or has already been dropped, in which case Viseron scales the frame instead.
+        """
+
+        def frame_available():
+            while self._frames and self._frames[0][0] < index:
+                self._frames.popleft()
+            return (
+                bool(self._frames)
+                or self._reader is None
+                or not self._reader.is_alive()
+            )
+
+        with self._frames_condition:
+            if (
+                not self._frames_condition.wait_for(
+                    frame_available, timeout=SCALED_OUTPUT_TIMEOUT
+                )
+                or not self._frames
+                or self._frames[0][0] != index
+            ):
+                return None
+            return self._frames.popleft()[1]
+
 
 class Stream:
     """Represents a stream of frames from a camera."""
 
+    # Switching to and from idle mode requires a restart of FFmpeg
+    switch_restarts_pipe = True
+
     def __init__(
         self,
         config,
@@ -67,8 +192,9 @@ class Stream:
         )
         self._ffprobe_timeout = FFPROBE_TIMEOUT
 
-        stream_codec = None
-        stream_audio_codec = None
+        self._cached_stream_information: Optional[StreamInformation] = None
+        self._pending_stream_information: Optional[StreamInformation] = None
+        stream_information: StreamInformation = (0, 0, 0, None, None)
         # If any of the parameters are unset we need to fetch them using FFprobe
         if (
             not self.stream_config.width
@@ -77,20 +203,10 @@ class Stream:
             or not self.stream_config.codec
             or self.stream_config.audio_codec == "unset"
         ):
-            (
-                width,
-                height,
-                fps,
-                stream_codec,
-                stream_audio_codec,
-            ) = self.get_stream_information(self.stream_config.stream_url)
-
-        self.width = self.stream_config.width if self.stream_config.width else width
-        self.height = self.stream_config.height if self.stream_config.height else height
-        self.fps = self.stream_config.fps if self.stream_config.fps else fps
-        self._output_fps = self.fps
-        self.stream_codec = stream_codec
-        self.stream_audio_codec = stream_audio_codec
+            stream_information = self.cached_stream_information(
+                self.stream_config.stream_url
+            )
+        self.set_stream_information(stream_information)
 
         if self.width and self.height and self.fps:
             pass
@@ -102,14 +218,128 @@ class Stream:
 
         if stream_config.pix_fmt == "nv12":
             self._color_converter = cv2.COLOR_YUV2RGB_NV21
-            self._color_plane_width = self.width
-            self._color_plane_height = int(self.height * 1.5)
-            self._frame_bytes = int(self.width * self.height * 1.5)
         elif stream_config.pix_fmt == "yuv420p":
             self._color_converter = cv2.COLOR_YUV2BGR_I420
-            self._color_plane_width = self.width
-            self._color_plane_height = int(self.height * 1.5)
-            self._frame_bytes = int(self.width * self.height * 1.5)
+
+        self._frame_buffer = None
+        if self._pipe_frames:
+            self._frame_buffer = FrameBuffer(
+                self._logger, self._frame_bytes, config.camera.frame_buffer_slots
+            )
+        self._scaled_outputs: Dict[Tuple[int, int], ScaledOutput] = {}
+        self._frame_index = 0
+
+        self._idle_enabled = config.camera.idle_keyframes_only and self._pipe_frames
+        if self._idle_enabled and self._write_segments and self.switch_restarts_pipe:
+            self._logger.warning(
+                "idle_keyframes_only requires a substream, since restarting FFmpeg "
+                "would leave gaps in the recorded segments. Disabling idle mode"
+            )
+            self._idle_enabled = False
+        self._idle = False
+        self._requested_idle = False
+        self._switch_requested_at: Optional[float] = None
+        self._switch_latency: Optional[float] = None
+
+        if self._cached_stream_information:
+            Thread(
+                name=f"{__name__}.{self.alias}.revalidate",
+                target=self.revalidate_stream_information,
+                args=(self.stream_config.stream_url, self._cached_stream_information),
+                daemon=True,
+            ).start()
+
+    def set_stream_information(self, stream_information: StreamInformation):
+        """Set width, height, FPS and codecs, preferring values set in the config."""
+        width, height, fps, stream_codec, stream_audio_codec = stream_information
+        self.width = self.stream_config.width if self.stream_config.width else width
+        self.height = self.stream_config.height if self.stream_config.height else height
+        self.fps = self.stream_config.fps if self.stream_config.fps else fps
+        self._output_fps = self.fps
+        self.stream_codec = stream_codec
+        self.stream_audio_codec = stream_audio_codec
+
+        self._color_plane_width = self.width
+        self._color_plane_height = int(self.height * 1.5)
+        self._frame_bytes = int(self.width * self.height * 1.5)
+
+    def cached_stream_information(self, stream_url) -> StreamInformation:
+        """Return stream information from the cache, or probe the stream.
+
+        Cached stream information is revalidated in the background once the stream
+        is initialized.
+        """
+        stream_information = StreamInformationCache.get(stream_url)
+        if stream_information is None:
+            stream_information = self.get_stream_information(stream_url)
+            StreamInformationCache.set(stream_url, stream_information)
+            return stream_information
+
+        self._logger.debug(
+            "Using cached stream information, revalidating in the background"
+        )
+        self._cached_stream_information = stream_information
+        return stream_information
+
+    def revalidate_stream_information(
+        self, stream_url, cached_stream_information: StreamInformation
+    ):
+        """Probe the stream and restart the pipe if the cached information is wrong.
+
+        A changed resolution is only stored in the cache and used on next startup.
+        """
+        try:
+            stream_information = self.get_stream_information(stream_url)
+        except (FFprobeError, FFprobeTimeout, StreamInformationError) as error:
+            self._logger.warning(
+                f"Could not revalidate cached stream information: {error}"
+            )
+            return
+
+        if not StreamInformationCache.valid(stream_information):
+            self._logger.warning(
+                "Could not revalidate cached stream information, FFprobe returned "
+                f"{stream_information}"
+            )
+            return
+        if stream_information == cached_stream_information:
+            return
+        StreamInformationCache.set(stream_url, stream_information)
+        if not self._pipe_frames:
+            self._logger.warning(
+                "Stream information has changed since it was cached. "
+                "The new information is used the next time Viseron starts"
+            )
+            return
+        # The resolution of the camera is used by masks, zones and filters which are
+        # only set up on startup, so it can not be changed while running
+        width, height = stream_information[:2]
+        if (
+            self.stream_config.width or width,
+            self.stream_config.height or height,
+        ) != (self.width, self.height):
+            self._logger.error(
+                f"Resolution has changed from {self.width}x{self.height} to "
+                f"{width}x{height} since it was cached. "
+                "Restart Viseron to use the new resolution"
+            )
+            return
+        self._logger.warning(
+            "Stream information has changed since it was cached, restarting pipe"
+        )
+        self._pending_stream_information = stream_information
+
+    def apply_pending_stream_information(self):
+        """Use stream information found by revalidation."""
+        if self._pending_stream_information is None:
+            return
+        self.set_stream_information(self._pending_stream_information)
+        self._pending_stream_information = None
+        self._frame_buffer = FrameBuffer(
+            self._logger, self._frame_bytes, self._config.camera.frame_buffer_slots
+        )
+        if self.decoders:
+            self.calculate_output_fps()
 
     @property
     def alias(self):
@@ -129,6 +359,118 @@ class Stream:
         except FileExistsError:
             pass
 
+    def add_scaled_output(self, width: int, height: int) -> None:
+        """Let FFmpeg output frames scaled to width and height on a separate pipe.
+
+        Only used if scaled_outputs is enabled for the camera. Frames read from the
+        stream then carry the scaled frame, which Frame.resize and Frame.resize_luma
+        use instead of scaling the full resolution frame.
+        """
+        if (
+            not self._config.camera.scaled_outputs
+            or not self._pipe_frames
+            or (width, height) in self._scaled_outputs
+        ):
+            return
+        if self._config.camera.filter_args:
+            self._logger.warning(
+                "Scaled outputs can not be combined with filter_args, "
+                "frames will be scaled by Viseron instead"
+            )
+            return
+        if width % 2 or height % 2:
+            self._logger.debug(
+                f"Not adding scaled output {width}x{height}, "
+                "width and height have to be even"
+            )
+            return
+        self._logger.debug(f"Adding scaled output {width}x{height}")
+        self._scaled_outputs[(width, height)] = ScaledOutput(
+            self._logger, width, height, self._config.camera.frame_buffer_slots
+        )
+
+    @property
+    def idle(self) -> bool:
+        """Return True if the frame pipe only decodes keyframes."""
+        return self._idle
+
+    @property
+    def switch_pending(self) -> bool:
+        """Return True if the frame pipe has to be restarted."""
+        return (
+            self._requested_idle != self._idle
+            or self._pending_stream_information is not None
+        )
+
+    @property
+    def switch_latency(self) -> Optional[float]:
+        """Return seconds from the last mode switch request until the first frame."""
+        return self._switch_latency
+
+    def set_idle(self, idle: bool) -> None:
+        """Request the frame pipe to only decode keyframes, or to decode all frames.
+
+        The pipe is restarted by the capture thread. When leaving idle mode FFmpeg is
+        terminated right away, so that the capture thread does not have to wait for
+        the next keyframe before it notices the request.
+        """
+        if not self._idle_enabled or idle == self._requested_idle:
+            return
+        self._requested_idle = idle
+        self._switch_requested_at = time.monotonic()
+        if idle:
+            self._logger.debug("Switching to keyframe only decoding")
+        else:
+            self._logger.debug("Switching to full decoding")
+        if not idle and self._idle and self._pipe:
+            self._pipe.terminate()
+
+    def switch_mode(self) -> None:
+        """Restart the frame pipe in the requested mode."""
+        self.close_pipe()
+        self.apply_pending_stream_information()
+        self._idle = self._requested_idle
+        for decoder in self.decoders.values():
+            decoder.calculate_interval()
+        self.start_pipe()
+
+    def report_switch_latency(self) -> None:
+        """Log time from the last switch request, once the first frame is read."""
+        if self._switch_requested_at is None or self.switch_pending:
+            return
+        self._switch_latency = time.monotonic() - self._switch_requested_at
+        self._switch_requested_at = None
+        self._logger.info(
+            f"Switched to {'keyframe only' if self._idle else 'full'} "
+            f"decoding in {self._switch_latency:.2f}s"
+        )
+
+    @property
+    def _fps_filter(self) -> List[str]:
+        """Return FFmpeg filter that reduces the FPS, if needed."""
+        # Keyframes arrive less often than any FPS filter would output frames
+        if self.output_fps < self.fps and not self._idle:
+            return [f"fps={self.output_fps}"]
+        return []
+
+    def scaled_output_args(self) -> List[str]:
+        """Return FFmpeg output args for each scaled output."""
+        output_args: List[str] = []
+        for scaled_output in self._scaled_outputs.values():
+            output_args += [
+                "-filter:v",
+                ",".join(
+                    self._fps_filter
+                    + [f"scale={scaled_output.width}:{scaled_output.height}"]
+                ),
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                self.stream_config.pix_fmt,
+                f"pipe:{scaled_output.write_fd}",
+            ]
+        return output_args
+
     @property
     def output_fps(self):
         """Return stream output FPS."""
@@ -141,7 +483,7 @@ class Stream:
     def calculate_output_fps(self):
         """Calculate FFmpeg output FPS."""
         max_interval_fps = 1 / min(
-            [decoder.interval for decoder in self.decoders.values()]
+            [decoder.shortest_interval for decoder in self.decoders.values()]
         )
         self.output_fps = round(min([max_interval_fps, self.fps]))
 
@@ -174,12 +516,11 @@ class Stream:
             reraise=True,
         ):
             with attempt:
-                with Detector.lock:
-                    pipe = sp.Popen(  # type: ignore
-                        ffprobe_command,
-                        stdout=sp.PIPE,
-                        stderr=self._log_pipe,
-                    )
+                pipe = spawn.popen(
+                    ffprobe_command,
+                    stdout=sp.PIPE,
+                    stderr=self._log_pipe,
+                )
                 try:
                     stdout, _ = pipe.communicate(timeout=self._ffprobe_timeout)
                     pipe.wait(timeout=FFPROBE_TIMEOUT)
@@ -286,6 +627,7 @@ class Stream:
                 if stream_config.stream_format == "rtsp"
                 else []
             )
+            + (["-skip_frame", "nokey"] if self._idle else [])
             + ["-i", stream_config.stream_url]
         )
 
@@ -302,19 +644,31 @@ class Stream:
 
         return []
 
+    @property
+    def segment_path(self) -> str:
+        """Return path of recorded segments, as a strftime pattern."""
+        return os.path.join(
+            self._config.recorder.segments_folder,
+            self._config.camera.name,
+            f"%Y%m%d%H%M%S.{self._config.recorder.extension}",
+        )
+
     def build_command(self, ffmpeg_loglevel=None, single_frame=False):
         """Return full FFmpeg command."""
         camera_segment_args = []
         if not single_frame and self._write_segments:
-            segment_path = os.path.join(
-                self._config.recorder.segments_folder,
-                self._config.camera.name,
-                f"%Y%m%d%H%M%S.{self._config.recorder.extension}",
-            )
             camera_segment_args = (
                 CAMERA_SEGMENT_ARGS
+                + [
+                    "-segment_list",
+                    segment_list_path(self._config),
+                    "-segment_list_type",
+                    "csv",
+                    "-segment_list_size",
+                    str(CAMERA_SEGMENT_LIST_SIZE),
+                ]
                 + self.get_audio_codec(self.stream_config, self.stream_audio_codec)
-                + [segment_path]
+                + [self.segment_path]
             )
 
         return (
@@ -330,25 +684,19 @@ class Stream:
             + (["-frames:v", "1"] if single_frame else [])
             + camera_segment_args
             + (self._config.camera.filter_args if self._pipe_frames else [])
-            + (
-                ["-filter:v", f"fps={self.output_fps}"]
-                if self.output_fps < self.fps
-                else []
-            )
+            + (["-filter:v"] + self._fps_filter if self._fps_filter else [])
             + (self._config.camera.output_args if self._pipe_frames else [])
+            + (self.scaled_output_args() if not single_frame else [])
         )
 
     def pipe(self, single_frame=False):
         """Return subprocess pipe for FFmpeg."""
         if single_frame:
-            with Detector.lock:
-                return sp.Popen(
-                    self.build_command(
-                        ffmpeg_loglevel="fatal", single_frame=single_frame
-                    ),
-                    stdout=sp.PIPE,
-                    stderr=sp.PIPE,
-                )
+            return spawn.popen(
+                self.build_command(ffmpeg_loglevel="fatal", single_frame=single_frame),
+                stdout=sp.PIPE,
+                stderr=sp.PIPE,
+            )
 
         if self._write_segments and not self._pipe_frames:
             return RestartablePopen(
@@ -358,17 +706,28 @@ class Stream:
                 name=self.alias,
             )
 
-        with Detector.lock:
-            return sp.Popen(
-                self.build_command(),
-                stdout=sp.PIPE,
-                stderr=self._log_pipe,
-            )
+        return spawn.popen(
+            self.build_command(),
+            inherit_fds=[
+                scaled_output.write_fd  # type: ignore
+                for scaled_output in self._scaled_outputs.values()
+            ],
+            stdout=sp.PIPE,
+            stderr=self._log_pipe,
+        )
 
     def start_pipe(self):
         """Start piping frames from FFmpeg."""
+        for scaled_output in self._scaled_outputs.values():
+            scaled_output.open()
+        self._frame_index = 0
         self._logger.debug(f"FFMPEG decoder command: {' '.join(self.build_command())}")
         self._pipe = self.pipe()
+        if self._pipe_frames:
+            set_pipe_size(self._pipe.stdout.fileno(), self._frame_bytes)
+        # Only FFmpeg should hold the write ends, so that EOF is seen if it exits
+        for scaled_output in self._scaled_outputs.values():
+            scaled_output.close_write_fd()
 
     def close_pipe(self):
         """Close FFmpeg pipe."""
@@ -379,6 +738,8 @@ class Stream:
             self._logger.debug("FFmpeg did not terminate, killing instead.")
             self._pipe.kill()
             self._pipe.communicate()
+        for scaled_output in self._scaled_outputs.values():
+            scaled_output.close()
 
     def poll(self):
         """Poll pipe."""
@@ -387,15 +748,33 @@ class Stream:
     def read(self) -> Optional[Frame]:
         """Return a single frame from FFmpeg pipe."""
         if self._pipe:
-            frame_bytes = self._pipe.stdout.read(self._frame_bytes)
-
-            if len(frame_bytes) == self._frame_bytes:
-                return Frame(
-                    self._color_converter,
-                    self._color_plane_width,
-                    self._color_plane_height,
-                    frame_bytes,
-                    self.width,
-                    self.height,
-                )
+            frame_bytes = self._frame_buffer.acquire()
+
+            if self._pipe.stdout.readinto(frame_bytes) != self._frame_bytes:
+                return None
+
+            self.report_switch_latency()
+
+            frame_index = self._frame_index
+            self._frame_index += 1
+            scaled_frames = {}
+            for size, scaled_output in self._scaled_outputs.items():
+                scaled_frame = scaled_output.read(frame_index)
+                if scaled_frame is not None:
+                    scaled_frames[size] = scaled_frame
+
+            return Frame(
+                self._color_converter,
+                self._color_plane_width,
+                self._color_plane_height,
+                frame_bytes,
+                self.width,
+                self.height,
+                scaled_frames=scaled_frames,
+            )
         return None
+
+    @property
+    def frame_buffer(self) -> Optional[FrameBuffer]:
+        """Return the ring of raw frame slots."""
+        return self._frame_buffer
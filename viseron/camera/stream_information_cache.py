@@ -0,0 +1,86 @@
+"""Cache of stream information on disk, to skip FFprobe at startup."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from viseron.const import STREAM_INFORMATION_CACHE_PATH
+
+LOGGER = logging.getLogger(__name__)
+
+StreamInformation = Tuple[int, int, int, Optional[str], Optional[str]]
+
+
+class StreamInformationCache:
+    """Stores width, height, FPS, codec and audio codec of each stream.
+
+    Entries are keyed by a hash of the stream URL, so that credentials in the URL
+    are not written to disk.
+    """
+
+    _lock = threading.Lock()
+    _path = STREAM_INFORMATION_CACHE_PATH
+    _entries: Optional[Dict[str, List]] = None
+
+    @staticmethod
+    def key(stream_url: str) -> str:
+        """Return cache key of stream_url."""
+        return hashlib.sha256(stream_url.encode()).hexdigest()
+
+    @staticmethod
+    def valid(stream_information: StreamInformation) -> bool:
+        """Return if width, height and FPS of stream_information are all known."""
+        width, height, fps = stream_information[:3]
+        return bool(width and height and fps)
+
+    @classmethod
+    def _load(cls) -> Dict[str, List]:
+        """Return cached entries, reading them from disk on first use."""
+        if cls._entries is not None:
+            return cls._entries
+        entries: Dict[str, List] = {}
+        try:
+            with open(cls._path, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as error:
+            LOGGER.warning(f"Could not read stream information cache: {error}")
+        cls._entries = entries
+        return entries
+
+    @classmethod
+    def get(cls, stream_url: str) -> Optional[StreamInformation]:
+        """Return cached stream information of stream_url.
+
+        Entries with a zero width, height or FPS are treated as missing, so that the
+        stream is probed again.
+        """
+        with cls._lock:
+            entry = cls._load().get(cls.key(stream_url))
+        if entry is None or not cls.valid(entry):  # type: ignore
+            return None
+        return tuple(entry)  # type: ignore
+
+    @classmethod
+    def set(cls, stream_url: str, stream_information: StreamInformation) -> None:
+        """Store stream information of stream_url and write the cache to disk.
+
+        Stream information with a zero width, height or FPS is not stored.
+        """
+        if not cls.valid(stream_information):
+            return
+        with cls._lock:
+            entries = cls._load()
+            entries[cls.key(stream_url)] = list(stream_information)
+            temp_path = f"{cls._path}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as cache_file:
+                    json.dump(entries, cache_file)
+                os.replace(temp_path, cls._path)
+            except OSError as error:
+                LOGGER.warning(f"Could not write stream information cache: {error}")
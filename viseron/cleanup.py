@@ -8,6 +8,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from path import Path
 
 from viseron.const import CAMERA_SEGMENT_DURATION
+from viseron.segments import SegmentIndex
 
 LOGGER = logging.getLogger(__name__)
 
@@ -58,9 +59,13 @@ class Cleanup:
 
 
 class SegmentCleanup:
-    """Clean up segments created by FFmpeg."""
+    """Clean up segments created by FFmpeg.
 
-    def __init__(self, config):
+    Segments are looked up in the segment index shared with the recorder.
+    """
+
+    def __init__(self, config, segment_index: SegmentIndex):
+        self._segment_index = segment_index
         self._directory = os.path.join(
             config.recorder.segments_folder, config.camera.name
         )
@@ -78,19 +83,10 @@ class SegmentCleanup:
     def cleanup(self):
         """Delete all segments that are no longer needed."""
         now = datetime.datetime.now().timestamp()
-        for segment in os.listdir(self._directory):
-            try:
-                start_time = datetime.datetime.strptime(
-                    segment.split(".")[0], "%Y%m%d%H%M%S"
-                ).timestamp()
-            except ValueError as error:
-                LOGGER.error(
-                    f"Could not extract timestamp from segment {segment}: {error}"
-                )
-                continue
-
-            if now - start_time > self._max_age:
-                os.remove(os.path.join(self._directory, segment))
+        self._segment_index.sync(os.listdir(self._directory))
+        for segment in self._segment_index.segments_before(now - self._max_age):
+            os.remove(os.path.join(self._directory, segment))
+            self._segment_index.remove(segment)
 
     def start(self):
         """Start the scheduler."""
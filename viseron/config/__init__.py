@@ -18,7 +18,7 @@ from viseron.motion import AbstractMotionDetection, AbstractMotionDetectionConfi
 from .config_logging import LoggingConfig
 from .config_motion_detection import MotionDetectionConfig
 from .config_mqtt import MQTTConfig
-from .config_object_detection import ObjectDetectionConfig
+from .config_object_detection import ObjectDetectionConfig, ensure_min_max_interval
 from .config_post_processors import PostProcessorsConfig
 from .config_recorder import RecorderConfig
 
@@ -111,7 +111,9 @@ VISERON_CONFIG_SCHEMA = Schema(
     All(
         {
             Required("cameras"): [{Extra: object}],
-            Optional("object_detection", default={}): ObjectDetectionConfig.schema,
+            Optional("object_detection", default={}): All(
+                ObjectDetectionConfig.schema, ensure_min_max_interval
+            ),
             Optional("motion_detection", default={}): All(
                 get_motion_type, validate_motion_detection_schema
             ),
@@ -19,9 +19,15 @@ from voluptuous import (
 
 import viseron.config
 from viseron.const import (
+    CAMERA_FRAME_BUFFER_SLOTS,
     CAMERA_GLOBAL_ARGS,
     CAMERA_HWACCEL_ARGS,
+    CAMERA_INGEST_FFMPEG,
+    CAMERA_INGEST_PYAV,
     CAMERA_INPUT_ARGS,
+    DATA_STREAM_DROP_POLICY_BLOCK,
+    DATA_STREAM_DROP_POLICY_NEWEST,
+    DATA_STREAM_DROP_POLICY_OLDEST,
     ENV_CUDA_SUPPORTED,
     ENV_JETSON_NANO,
     ENV_RASPBERRYPI3,
@@ -37,7 +43,12 @@ from viseron.const import (
 from viseron.helpers import generate_numpy_from_coordinates, slugify
 
 from .config_logging import SCHEMA as LOGGING_SCHEMA, LoggingConfig
-from .config_object_detection import LABELS_SCHEMA, LabelConfig
+from .config_object_detection import (
+    INTERVAL_SCHEMA,
+    LABELS_SCHEMA,
+    LabelConfig,
+    ensure_min_max_interval,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -93,6 +104,9 @@ def check_for_hwaccels(hwaccel_args: List[str]) -> List[str]:
 STREAM_SCEHMA = Schema(
     {
         Required("stream_format", default="rtsp"): Any("rtsp", "rtmp", "mjpeg"),
+        Optional("ingest", default=CAMERA_INGEST_FFMPEG): Any(
+            CAMERA_INGEST_FFMPEG, CAMERA_INGEST_PYAV
+        ),
         Required("path"): All(str, Length(min=1)),
         Required("port"): All(int, Range(min=1)),
         Optional("width", default=None): Maybe(int),
@@ -133,29 +147,61 @@ CAMERA_SCHEMA = STREAM_SCEHMA.extend(
         Optional("username", default=None): Maybe(All(str, Length(min=1))),
         Optional("password", default=None): Maybe(All(str, Length(min=1))),
         Optional("global_args", default=CAMERA_GLOBAL_ARGS): list,
+        Optional("frame_buffer_slots", default=CAMERA_FRAME_BUFFER_SLOTS): All(
+            int, Range(min=1)
+        ),
+        Optional("data_stream_drop_policy", default=DATA_STREAM_DROP_POLICY_BLOCK): Any(
+            DATA_STREAM_DROP_POLICY_BLOCK,
+            DATA_STREAM_DROP_POLICY_OLDEST,
+            DATA_STREAM_DROP_POLICY_NEWEST,
+        ),
+        Optional("scaled_outputs", default=False): bool,
+        Optional("idle_keyframes_only", default=False): bool,
         Optional("substream"): STREAM_SCEHMA,
         # Optional("motion_detection"):
         Optional("object_detection"): Maybe(
-            {
-                Optional("enable"): bool,
-                Optional("interval"): Any(int, float),
-                Optional("labels"): LABELS_SCHEMA,
-                Optional("mask", default=[]): [
-                    {
-                        Required("points"): [
-                            {
-                                Required("x"): int,
-                                Required("y"): int,
-                            }
-                        ],
-                    }
-                ],
-                Optional("max_frame_age"): All(
-                    Any(float, int), Coerce(float), Range(min=0.0)
-                ),
-                Optional("logging"): LOGGING_SCHEMA,
-                Optional("log_all_objects"): bool,
-            },
+            All(
+                {
+                    Optional("enable"): bool,
+                    Optional("interval"): INTERVAL_SCHEMA,
+                    Optional("adaptive_interval"): bool,
+                    Optional("min_interval"): Maybe(INTERVAL_SCHEMA),
+                    Optional("max_interval"): Maybe(INTERVAL_SCHEMA),
+                    Optional("labels"): LABELS_SCHEMA,
+                    Optional("mask", default=[]): [
+                        {
+                            Required("points"): [
+                                {
+                                    Required("x"): int,
+                                    Required("y"): int,
+                                }
+                            ],
+                        }
+                    ],
+                    Optional("max_frame_age"): All(
+                        Any(float, int), Coerce(float), Range(min=0.0)
+                    ),
+                    Optional("logging"): LOGGING_SCHEMA,
+                    Optional("log_all_objects"): bool,
+                    Optional("scheduler_weight"): All(int, Range(min=1)),
+                    Optional("crop_to_motion"): bool,
+                    Optional("crop_padding"): All(
+                        Any(0, 1, All(float, Range(min=0.0, max=1.0))), Coerce(float)
+                    ),
+                    Optional("tile_columns"): All(int, Range(min=1)),
+                    Optional("tile_rows"): All(int, Range(min=1)),
+                    Optional("tile_overlap"): All(
+                        Any(0, All(float, Range(min=0.0, max=0.9))), Coerce(float)
+                    ),
+                    Optional("tile_full_frame"): bool,
+                    Optional("tracker"): bool,
+                    Optional("tracker_iou_threshold"): All(
+                        Any(0, 1, All(float, Range(min=0.0, max=1.0))), Coerce(float)
+                    ),
+                    Optional("tracker_max_misses"): All(int, Range(min=0)),
+                },
+                ensure_min_max_interval,
+            ),
         ),
         Optional("zones", default=[]): [
             {
@@ -206,6 +252,7 @@ class Stream:
 
     def __init__(self, camera):
         self._stream_format = camera["stream_format"]
+        self._ingest = camera["ingest"]
         self._host = camera["host"]
         self._port = camera["port"]
         self._username = camera["username"]
@@ -241,6 +288,11 @@ class Stream:
         """Return stream format."""
         return self._stream_format
 
+    @property
+    def ingest(self):
+        """Return ingest backend used to read frames."""
+        return self._ingest
+
     @property
     def host(self):
         """Return host."""
@@ -355,6 +407,7 @@ class Substream(Stream):
     def __init__(self, camera):
         super().__init__(camera)
         self._stream_format = camera["substream"]["stream_format"]
+        self._ingest = camera["substream"]["ingest"]
         self._port = camera["substream"]["port"]
         self._path = camera["substream"]["path"]
         self._width = camera["substream"]["width"]
@@ -389,6 +442,12 @@ class CameraConfig(Stream):
         self._name_slug = slugify(self.name)
         self._mqtt_name = self._validated_config["mqtt_name"]
         self._global_args = self._validated_config["global_args"]
+        self._frame_buffer_slots = self._validated_config["frame_buffer_slots"]
+        self._data_stream_drop_policy = self._validated_config[
+            "data_stream_drop_policy"
+        ]
+        self._scaled_outputs = self._validated_config["scaled_outputs"]
+        self._idle_keyframes_only = self._validated_config["idle_keyframes_only"]
         self._substream = None
         if self._validated_config.get("substream", None):
             self._substream = Substream(self._validated_config)
@@ -472,6 +531,26 @@ class CameraConfig(Stream):
         """Return FFmpeg global args."""
         return self._global_args
 
+    @property
+    def frame_buffer_slots(self):
+        """Return number of preallocated raw frame slots."""
+        return self._frame_buffer_slots
+
+    @property
+    def data_stream_drop_policy(self):
+        """Return drop policy of the cameras data stream queue."""
+        return self._data_stream_drop_policy
+
+    @property
+    def scaled_outputs(self):
+        """Return if FFmpeg should output frames scaled for each detector."""
+        return self._scaled_outputs
+
+    @property
+    def idle_keyframes_only(self):
+        """Return if only keyframes should be decoded while the camera is idle."""
+        return self._idle_keyframes_only
+
     @property
     def output_args(self):
         """Return FFmpeg output args."""
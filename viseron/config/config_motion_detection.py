@@ -1,5 +1,5 @@
 """Motion detection config."""
-from voluptuous import All, Any, Coerce, Optional, Range, Required, Schema
+from voluptuous import All, Any, Coerce, Maybe, Optional, Range, Required, Schema
 
 from viseron.helpers import generate_mask
 
@@ -7,6 +7,9 @@ from .config_logging import SCHEMA as LOGGING_SCHEMA, LoggingConfig
 
 DEFAULTS = {
     "interval": 1,
+    "adaptive_interval": False,
+    "min_interval": None,
+    "max_interval": None,
     "trigger_detector": True,
     "trigger_recorder": True,
     "timeout": True,
@@ -22,6 +25,13 @@ SCHEMA = Schema(
         Optional("interval", default=DEFAULTS["interval"]): All(
             Any(float, int), Coerce(float), Range(min=0.0)
         ),
+        Optional("adaptive_interval", default=DEFAULTS["adaptive_interval"]): bool,
+        Optional("min_interval", default=DEFAULTS["min_interval"]): Maybe(
+            All(Any(float, int), Coerce(float), Range(min=0.0))
+        ),
+        Optional("max_interval", default=DEFAULTS["max_interval"]): Maybe(
+            All(Any(float, int), Coerce(float), Range(min=0.0))
+        ),
         Optional("trigger_detector", default=DEFAULTS["trigger_detector"]): bool,
         Optional("trigger_recorder", default=DEFAULTS["trigger_recorder"]): bool,
         Optional("timeout", default=DEFAULTS["timeout"]): bool,
@@ -55,6 +65,9 @@ class MotionDetectionConfig:
     def __init__(self, motion_config):
         self._type = motion_config["type"]
         self._interval = motion_config["interval"]
+        self._adaptive_interval = motion_config["adaptive_interval"]
+        self._min_interval = motion_config["min_interval"]
+        self._max_interval = motion_config["max_interval"]
         self._trigger_detector = motion_config["trigger_detector"]
         self._trigger_recorder = motion_config["trigger_recorder"]
         self._timeout = motion_config["timeout"]
@@ -76,6 +89,25 @@ class MotionDetectionConfig:
         """Return interval."""
         return self._interval
 
+    @property
+    def adaptive_interval(self):
+        """Return if interval adapts to how fast motion detection runs."""
+        return self._adaptive_interval
+
+    @property
+    def min_interval(self):
+        """Return shortest interval when adaptive_interval is enabled."""
+        if self._min_interval is None:
+            return self.interval
+        return self._min_interval
+
+    @property
+    def max_interval(self):
+        """Return longest interval when adaptive_interval is enabled."""
+        if self._max_interval is None:
+            return self.interval * 4
+        return self._max_interval
+
     @property
     def trigger_detector(self):
         """Return if motion triggers detector."""
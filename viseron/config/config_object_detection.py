@@ -8,6 +8,7 @@ from voluptuous import (
     Any,
     Coerce,
     Invalid,
+    Maybe,
     Optional,
     Range,
     Required,
@@ -15,6 +16,8 @@ from voluptuous import (
 )
 
 from viseron.const import (
+    DETECTOR_WORKER_TYPE_PROCESS,
+    DETECTOR_WORKER_TYPE_THREAD,
     ENV_CUDA_SUPPORTED,
     ENV_OPENCL_SUPPORTED,
     ENV_RASPBERRYPI3,
@@ -35,6 +38,22 @@ def ensure_min_max(label: dict) -> dict:
     return label
 
 
+def ensure_min_max_interval(object_detection: dict) -> dict:
+    """Ensure min_interval is not larger than max_interval."""
+    min_interval = object_detection.get("min_interval")
+    max_interval = object_detection.get("max_interval")
+    if (
+        min_interval is not None
+        and max_interval is not None
+        and min_interval > max_interval
+    ):
+        raise Invalid("min_interval may not be larger than max_interval")
+    return object_detection
+
+
+INTERVAL_SCHEMA = All(Any(float, int), Coerce(float), Range(min=0.0))
+
+
 def get_detector_type() -> str:
     """Return default detector."""
     if (
@@ -145,14 +164,39 @@ SCHEMA = Schema(
     {
         Optional("type", default=get_detector_type()): str,
         Optional("enable", default=True): bool,
-        Optional("interval", default=1): All(
-            Any(float, int), Coerce(float), Range(min=0.0)
-        ),
+        Optional("interval", default=1): INTERVAL_SCHEMA,
+        Optional("adaptive_interval", default=False): bool,
+        Optional("min_interval", default=None): Maybe(INTERVAL_SCHEMA),
+        Optional("max_interval", default=None): Maybe(INTERVAL_SCHEMA),
         Optional("labels", default=[{"label": "person"}]): LABELS_SCHEMA,
         Optional("max_frame_age", default=2): All(
             Any(float, int), Coerce(float), Range(min=0.0)
         ),
         Optional("log_all_objects", default=False): bool,
+        Optional("scheduler_weight", default=1): All(int, Range(min=1)),
+        Optional("crop_to_motion", default=False): bool,
+        Optional("crop_padding", default=0.1): All(
+            Any(0, 1, All(float, Range(min=0.0, max=1.0))), Coerce(float)
+        ),
+        Optional("tile_columns", default=1): All(int, Range(min=1)),
+        Optional("tile_rows", default=1): All(int, Range(min=1)),
+        Optional("tile_overlap", default=0.2): All(
+            Any(0, All(float, Range(min=0.0, max=0.9))), Coerce(float)
+        ),
+        Optional("tile_full_frame", default=True): bool,
+        Optional("tracker", default=False): bool,
+        Optional("tracker_iou_threshold", default=0.3): All(
+            Any(0, 1, All(float, Range(min=0.0, max=1.0))), Coerce(float)
+        ),
+        Optional("tracker_max_misses", default=2): All(int, Range(min=0)),
+        Optional("batch_size", default=1): All(int, Range(min=1)),
+        Optional("batch_timeout", default=0.01): All(
+            Any(float, int), Coerce(float), Range(min=0.0)
+        ),
+        Optional("workers", default=1): All(int, Range(min=1)),
+        Optional("worker_type", default=DETECTOR_WORKER_TYPE_THREAD): Any(
+            DETECTOR_WORKER_TYPE_THREAD, DETECTOR_WORKER_TYPE_PROCESS
+        ),
         Optional("logging"): LOGGING_SCHEMA,
     },
     extra=ALLOW_EXTRA,
@@ -180,6 +224,22 @@ class ObjectDetectionConfig:
         self._interval = camera_object_detection.get(
             "interval", object_detection["interval"]
         )
+        self._adaptive_interval = camera_object_detection.get(
+            "adaptive_interval", object_detection["adaptive_interval"]
+        )
+        self._min_interval = camera_object_detection.get(
+            "min_interval", object_detection["min_interval"]
+        )
+        self._max_interval = camera_object_detection.get(
+            "max_interval", object_detection["max_interval"]
+        )
+        # max_interval defaults to a multiple of interval, so the resolved
+        # values are validated as well
+        if self.min_interval > self.max_interval:
+            raise Invalid(
+                f"min_interval ({self.min_interval}) may not be larger than "
+                f"max_interval ({self.max_interval})"
+            )
         self._labels = []
         for label in camera_object_detection.get("labels", object_detection["labels"]):
             self._labels.append(LabelConfig(label))
@@ -193,6 +253,45 @@ class ObjectDetectionConfig:
             "log_all_objects", object_detection["log_all_objects"]
         )
 
+        self._scheduler_weight = camera_object_detection.get(
+            "scheduler_weight", object_detection["scheduler_weight"]
+        )
+
+        self._crop_to_motion = camera_object_detection.get(
+            "crop_to_motion", object_detection["crop_to_motion"]
+        )
+        self._crop_padding = camera_object_detection.get(
+            "crop_padding", object_detection["crop_padding"]
+        )
+
+        self._tile_columns = camera_object_detection.get(
+            "tile_columns", object_detection["tile_columns"]
+        )
+        self._tile_rows = camera_object_detection.get(
+            "tile_rows", object_detection["tile_rows"]
+        )
+        self._tile_overlap = camera_object_detection.get(
+            "tile_overlap", object_detection["tile_overlap"]
+        )
+        self._tile_full_frame = camera_object_detection.get(
+            "tile_full_frame", object_detection["tile_full_frame"]
+        )
+
+        self._tracker = camera_object_detection.get(
+            "tracker", object_detection["tracker"]
+        )
+        self._tracker_iou_threshold = camera_object_detection.get(
+            "tracker_iou_threshold", object_detection["tracker_iou_threshold"]
+        )
+        self._tracker_max_misses = camera_object_detection.get(
+            "tracker_max_misses", object_detection["tracker_max_misses"]
+        )
+
+        self._batch_size = object_detection["batch_size"]
+        self._batch_timeout = object_detection["batch_timeout"]
+        self._workers = object_detection["workers"]
+        self._worker_type = object_detection["worker_type"]
+
         logging = camera_object_detection.get(
             "logging",
             (object_detection.get("logging", None)),
@@ -227,6 +326,25 @@ class ObjectDetectionConfig:
         """Return interval."""
         return self._interval
 
+    @property
+    def adaptive_interval(self) -> bool:
+        """Return if interval adapts to the capacity of the object detector."""
+        return self._adaptive_interval
+
+    @property
+    def min_interval(self) -> float:
+        """Return shortest interval when adaptive_interval is enabled."""
+        if self._min_interval is None:
+            return self.interval
+        return self._min_interval
+
+    @property
+    def max_interval(self) -> float:
+        """Return longest interval when adaptive_interval is enabled."""
+        if self._max_interval is None:
+            return self.interval * 4
+        return self._max_interval
+
     @property
     def min_confidence(self) -> float:
         """Return lowest configured confidence between all labels."""
@@ -247,6 +365,81 @@ class ObjectDetectionConfig:
         """Return if all labels should be logged, not only configured labels."""
         return self._log_all_objects
 
+    @property
+    def scheduler_weight(self) -> int:
+        """Return how often the camera is served compared to other cameras."""
+        return self._scheduler_weight
+
+    @property
+    def crop_to_motion(self) -> bool:
+        """Return if detection runs on the area with motion instead of the frame."""
+        return self._crop_to_motion
+
+    @property
+    def crop_padding(self) -> float:
+        """Return padding around the area with motion, relative to the frame."""
+        return self._crop_padding
+
+    @property
+    def tile_columns(self) -> int:
+        """Return number of tile columns the frame is split into."""
+        return self._tile_columns
+
+    @property
+    def tile_rows(self) -> int:
+        """Return number of tile rows the frame is split into."""
+        return self._tile_rows
+
+    @property
+    def tile_overlap(self) -> float:
+        """Return how much neighbouring tiles overlap."""
+        return self._tile_overlap
+
+    @property
+    def tile_full_frame(self) -> bool:
+        """Return if the whole frame is scanned in addition to the tiles."""
+        return self._tile_full_frame
+
+    @property
+    def tiled(self) -> bool:
+        """Return if frames are split into tiles."""
+        return self._tile_columns * self._tile_rows > 1
+
+    @property
+    def tracker(self) -> bool:
+        """Return if detected objects are tracked between detection runs."""
+        return self._tracker
+
+    @property
+    def tracker_iou_threshold(self) -> float:
+        """Return minimum overlap between a track and a detection to match them."""
+        return self._tracker_iou_threshold
+
+    @property
+    def tracker_max_misses(self) -> int:
+        """Return number of detection runs a track can be missed before removal."""
+        return self._tracker_max_misses
+
+    @property
+    def batch_size(self) -> int:
+        """Return max number of frames to run detection on at the same time."""
+        return self._batch_size
+
+    @property
+    def batch_timeout(self) -> float:
+        """Return max time in seconds to wait for a batch to fill up."""
+        return self._batch_timeout
+
+    @property
+    def workers(self) -> int:
+        """Return number of object detector workers."""
+        return self._workers
+
+    @property
+    def worker_type(self) -> str:
+        """Return if object detector workers are threads or processes."""
+        return self._worker_type
+
     @property
     def mask(self):
         """Return mask."""
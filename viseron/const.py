@@ -6,6 +6,7 @@ from cv2 import FONT_HERSHEY_SIMPLEX
 CONFIG_PATH = "/config/config.yaml"
 SECRETS_PATH = "/config/secrets.yaml"
 RECORDER_PATH = "/recordings"
+STREAM_INFORMATION_CACHE_PATH = "/config/stream_information.json"
 DEFAULT_CONFIG = """
 # See the README for the full list of configuration options.
 cameras:
@@ -43,7 +44,12 @@ CAMERA_INPUT_ARGS = [
     "0",
 ]
 CAMERA_HWACCEL_ARGS: List["str"] = []
+CAMERA_FRAME_BUFFER_SLOTS = 10
+CAMERA_INGEST_FFMPEG = "ffmpeg"
+CAMERA_INGEST_PYAV = "pyav"
 CAMERA_SEGMENT_DURATION = 5
+# Number of entries kept in the segment list, one hour of segments
+CAMERA_SEGMENT_LIST_SIZE = 720
 CAMERA_SEGMENT_ARGS = [
     "-f",
     "segment",
@@ -122,6 +128,17 @@ FONT_SIZE = 0.6
 FONT_THICKNESS = 1
 
 
+DETECTOR_WORKER_TYPE_THREAD = "thread"
+DETECTOR_WORKER_TYPE_PROCESS = "process"
+
+DATA_STREAM_QUEUE_SIZE = 100
+DATA_STREAM_CALLBACK_WORKERS = 8
+DATA_STREAM_CALLBACK_STATS_INTERVAL = 60
+DATA_STREAM_WILDCARD_CACHE_SIZE = 1000
+DATA_STREAM_DROP_POLICY_BLOCK = "block"
+DATA_STREAM_DROP_POLICY_OLDEST = "drop_oldest"
+DATA_STREAM_DROP_POLICY_NEWEST = "drop_newest"
+
 TOPIC_STATIC_MJPEG_STREAMS = "static_mjepg_streams"
 
 TOPIC_DECODE = "decode"
@@ -1,20 +1,187 @@
 """Used to publish/subscribe to data between different parts of Viseron."""
 import fnmatch
 import logging
+import re
 import threading
+import time
 import uuid
-from queue import Queue
-from typing import Any, Callable, Dict, Union
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
+from typing import Any, Callable, Deque, Dict, List, Optional, Pattern, Tuple, Union
 
 from tornado.ioloop import IOLoop
 from tornado.queues import Queue as tornado_queue
 
 from viseron import helpers
+from viseron.const import (
+    DATA_STREAM_CALLBACK_STATS_INTERVAL,
+    DATA_STREAM_CALLBACK_WORKERS,
+    DATA_STREAM_DROP_POLICY_BLOCK,
+    DATA_STREAM_DROP_POLICY_NEWEST,
+    DATA_STREAM_DROP_POLICY_OLDEST,
+    DATA_STREAM_QUEUE_SIZE,
+    DATA_STREAM_WILDCARD_CACHE_SIZE,
+)
 from viseron.watchdog.thread_watchdog import RestartableThread
 
 LOGGER = logging.getLogger(__name__)
 
 
+class DataStreamShard:
+    """A bounded queue of published data which is consumed by its own thread.
+
+    The drop policy decides what happens when the queue is full:
+        block: The publisher waits until there is room in the queue.
+        drop_oldest: The oldest item in the queue is discarded.
+        drop_newest: The published item is discarded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        drop_policy: str = DATA_STREAM_DROP_POLICY_BLOCK,
+        maxsize: int = DATA_STREAM_QUEUE_SIZE,
+    ) -> None:
+        self.name = name
+        self.drop_policy = drop_policy
+        self.queue: Queue = Queue(maxsize=maxsize)
+        self._dropped = 0
+
+    def put(self, data_item: Dict[str, Any]) -> None:
+        """Put item in queue according to the drop policy."""
+        if self.drop_policy == DATA_STREAM_DROP_POLICY_OLDEST:
+            if self.queue.full():
+                self.dropped_item()
+            helpers.pop_if_full(self.queue, data_item)
+            return
+
+        if self.drop_policy == DATA_STREAM_DROP_POLICY_NEWEST:
+            try:
+                self.queue.put_nowait(data_item)
+            except Full:
+                self.dropped_item()
+            return
+
+        self.queue.put(data_item)
+
+    def dropped_item(self) -> None:
+        """Count a dropped item."""
+        if self._dropped == 0:
+            LOGGER.warning(
+                f"Data stream queue {self.name} is full, "
+                f"dropping items using policy {self.drop_policy}"
+            )
+        self._dropped += 1
+
+    @property
+    def dropped(self) -> int:
+        """Return number of items dropped because the queue was full."""
+        return self._dropped
+
+
+class CallbackExecutor:
+    """Run callable subscribers on a bounded pool of threads.
+
+    Callbacks for the same subscriber are run in the order they were submitted, one
+    at a time, while callbacks for different subscribers run concurrently.
+
+    The saturation of the pool is logged at debug level every stats_interval seconds.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DATA_STREAM_CALLBACK_WORKERS,
+        stats_interval: float = DATA_STREAM_CALLBACK_STATS_INTERVAL,
+    ) -> None:
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="data_stream_callback"
+        )
+        self._pending: Dict[uuid.UUID, Deque[Tuple[Callable, Any]]] = {}
+        self._lock = threading.Lock()
+        self._pending_count = 0
+        self._max_pending = 0
+        self._active = 0
+        self._stats_interval = stats_interval
+        self._stats_logged = time.monotonic()
+
+    def submit(self, unique_id: uuid.UUID, callback: Callable, data: Any) -> None:
+        """Queue callback to be run with data."""
+        with self._lock:
+            pending = self._pending.setdefault(unique_id, deque())
+            pending.append((callback, data))
+            self._pending_count += 1
+            self._max_pending = max(self._max_pending, self._pending_count)
+            log_stats = time.monotonic() - self._stats_logged >= self._stats_interval
+            if log_stats:
+                self._stats_logged = time.monotonic()
+            drain_scheduled = len(pending) > 1
+
+        if log_stats:
+            self.log_stats()
+        if drain_scheduled:
+            return
+        self._executor.submit(self._drain, unique_id)
+
+    def _drain(self, unique_id: uuid.UUID) -> None:
+        """Run all pending callbacks for a subscriber."""
+        with self._lock:
+            self._active += 1
+            pending = self._pending[unique_id]
+
+        while True:
+            # The item is left in the deque while running so that submit does not
+            # schedule a second drain for this subscriber
+            callback, data = pending[0]
+            try:
+                callback(data)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception(f"Error in data stream callback {callback}")
+
+            with self._lock:
+                pending.popleft()
+                self._pending_count -= 1
+                if not pending:
+                    del self._pending[unique_id]
+                    self._active -= 1
+                    return
+
+    def log_stats(self) -> None:
+        """Log the saturation of the pool."""
+        LOGGER.debug(
+            f"Data stream callbacks: pending {self.pending}, "
+            f"max pending {self.max_pending}, "
+            f"active {self.active}/{self.max_workers}, "
+            f"saturated {self.saturated}"
+        )
+
+    @property
+    def max_workers(self) -> int:
+        """Return max number of threads in the pool."""
+        return self._max_workers
+
+    @property
+    def pending(self) -> int:
+        """Return number of callbacks that are queued or running."""
+        return self._pending_count
+
+    @property
+    def max_pending(self) -> int:
+        """Return the highest number of callbacks that were queued at once."""
+        return self._max_pending
+
+    @property
+    def active(self) -> int:
+        """Return number of threads currently running callbacks."""
+        return self._active
+
+    @property
+    def saturated(self) -> bool:
+        """Return True if all threads in the pool are busy."""
+        return self._active >= self._max_workers
+
+
 class DataStream:
     """Class that enables a publisher/subscriber mechanism.
 
@@ -23,25 +190,71 @@ class DataStream:
     A data topic can have any value.
     You can subscribe to wildcard topics using '*', eg topic/*/event_name
 
-    Data is published to topics using a thread.
+    Data is published to topics using a number of shards. Each shard has its own
+    bounded queue and consumer thread. Topics are routed to a shard by their prefix,
+    which for camera topics is the camera name_slug, so that a busy camera cannot
+    delay the data of other cameras. Topics without a registered shard are handled
+    by the default shard.
+
+    Wildcard topics are compiled once when subscribed to. The wildcard subscribers
+    matching a concrete topic are resolved the first time data is published to it
+    and cached until the wildcard subscriptions change. The cache holds at most
+    DATA_STREAM_WILDCARD_CACHE_SIZE topics, evicting the least recently used one.
     """
 
     _subscribers: Dict[str, Any] = {}
     _wildcard_subscribers: Dict[str, Any] = {}
-    _data_queue: Queue = Queue(maxsize=100)
+    _wildcard_patterns: Dict[str, Pattern] = {}
+    _wildcard_cache: "OrderedDict[str, List[Dict[uuid.UUID, Any]]]" = OrderedDict()
+    _subscription_lock = threading.Lock()
+    _default_shard = DataStreamShard("default")
+    _shards: Dict[str, DataStreamShard] = {}
+    _ioloop: Optional[IOLoop] = None
+    callback_executor = CallbackExecutor()
 
     def __init__(self, ioloop: IOLoop) -> None:
+        DataStream._ioloop = ioloop
+        self.ioloop = ioloop
+        self.start_consumer(self._default_shard)
+
+    @staticmethod
+    def start_consumer(shard: DataStreamShard) -> None:
+        """Start consumer thread for a shard."""
         data_consumer = RestartableThread(
-            name="data_stream", target=self.consume_data, daemon=True, register=True
+            name=f"data_stream.{shard.name}",
+            target=DataStream.consume_data,
+            args=(shard,),
+            daemon=True,
+            register=True,
         )
         data_consumer.start()
-        self.ioloop = ioloop
+
+    @staticmethod
+    def register_shard(
+        topic_prefix: str, drop_policy: str = DATA_STREAM_DROP_POLICY_BLOCK
+    ) -> DataStreamShard:
+        """Route all topics starting with topic_prefix to a dedicated shard."""
+        shard = DataStream._shards.get(topic_prefix)
+        if shard:
+            shard.drop_policy = drop_policy
+            return shard
+
+        LOGGER.debug(
+            f"Registering data stream shard {topic_prefix} "
+            f"with drop policy {drop_policy}"
+        )
+        shard = DataStreamShard(topic_prefix, drop_policy=drop_policy)
+        DataStream._shards[topic_prefix] = shard
+        DataStream.start_consumer(shard)
+        return shard
 
     @staticmethod
     def publish_data(data_topic: str, data: Any) -> None:
         """Publish data to topic."""
         # LOGGER.debug(f"Publishing to data topic {data_topic}, {data}")
-        DataStream._data_queue.put({"data_topic": data_topic, "data": data})
+        DataStream._shards.get(
+            data_topic.split("/", 1)[0], DataStream._default_shard
+        ).put({"data_topic": data_topic, "data": data})
 
     @staticmethod
     def subscribe_data(
@@ -55,9 +268,15 @@ class DataStream:
         unique_id = uuid.uuid4()
 
         if "*" in data_topic:
-            DataStream._wildcard_subscribers.setdefault(data_topic, {})[
-                unique_id
-            ] = callback
+            with DataStream._subscription_lock:
+                if data_topic not in DataStream._wildcard_subscribers:
+                    DataStream._wildcard_patterns[data_topic] = re.compile(
+                        fnmatch.translate(data_topic)
+                    )
+                    DataStream._wildcard_cache.clear()
+                DataStream._wildcard_subscribers.setdefault(data_topic, {})[
+                    unique_id
+                ] = callback
             return unique_id
 
         DataStream._subscribers.setdefault(data_topic, {})[unique_id] = callback
@@ -68,21 +287,46 @@ class DataStream:
         """Unsubscribe from a topic using the Unique ID returned from subscribe_data."""
         LOGGER.debug(f"Unsubscribing from data topic {data_topic}, {unique_id}")
         if "*" in data_topic:
-            DataStream._wildcard_subscribers[data_topic].pop(unique_id)
+            with DataStream._subscription_lock:
+                DataStream._wildcard_subscribers[data_topic].pop(unique_id)
+                if not DataStream._wildcard_subscribers[data_topic]:
+                    del DataStream._wildcard_subscribers[data_topic]
+                    del DataStream._wildcard_patterns[data_topic]
+                    DataStream._wildcard_cache.clear()
             return
 
         DataStream._subscribers[data_topic].pop(unique_id)
 
+    @staticmethod
+    def get_wildcard_subscribers(
+        data_topic: str,
+    ) -> List[Dict[uuid.UUID, Union[Callable, Queue, tornado_queue]]]:
+        """Return callbacks of all wildcard subscriptions matching a concrete topic."""
+        with DataStream._subscription_lock:
+            subscribers = DataStream._wildcard_cache.get(data_topic)
+            if subscribers is not None:
+                DataStream._wildcard_cache.move_to_end(data_topic)
+                return subscribers
+
+            subscribers = [
+                DataStream._wildcard_subscribers[wildcard_topic]
+                for wildcard_topic, pattern in DataStream._wildcard_patterns.items()
+                if pattern.match(data_topic)
+            ]
+            DataStream._wildcard_cache[data_topic] = subscribers
+            if len(DataStream._wildcard_cache) > DATA_STREAM_WILDCARD_CACHE_SIZE:
+                DataStream._wildcard_cache.popitem(last=False)
+        return subscribers
+
+    @staticmethod
     def run_callbacks(
-        self,
         callbacks: Dict[uuid.UUID, Union[Callable, Queue, tornado_queue]],
         data: Any,
     ) -> None:
         """Run callbacks or put to queues."""
-        for callback in callbacks.values():
+        for unique_id, callback in callbacks.items():
             if callable(callback):
-                thread = threading.Thread(target=callback, args=(data,), daemon=True)
-                thread.start()
+                DataStream.callback_executor.submit(unique_id, callback, data)
                 continue
 
             if isinstance(callback, Queue):
@@ -90,7 +334,9 @@ class DataStream:
                 continue
 
             if isinstance(callback, tornado_queue):
-                self.ioloop.add_callback(helpers.pop_if_full, callback, data)
+                DataStream._ioloop.add_callback(  # type: ignore
+                    helpers.pop_if_full, callback, data
+                )
                 continue
 
             LOGGER.error(
@@ -98,26 +344,23 @@ class DataStream:
                 f"Needs to be of type Callable or Queue, got {type(callback)}"
             )
 
-    def static_subscriptions(self, data_item: Dict[str, Any]) -> None:
+    @staticmethod
+    def static_subscriptions(data_item: Dict[str, Any]) -> None:
         """Run callbacks for static subscriptions."""
-        self.run_callbacks(
+        DataStream.run_callbacks(
             DataStream._subscribers.get(data_item["data_topic"], {}), data_item["data"]
         )
 
-    def wildcard_subscriptions(self, data_item: Dict[str, Any]) -> None:
+    @staticmethod
+    def wildcard_subscriptions(data_item: Dict[str, Any]) -> None:
         """Run callbacks for wildcard subscriptions."""
-        for data_topic, callbacks in DataStream._wildcard_subscribers.items():
-            if fnmatch.fnmatch(data_item["data_topic"], data_topic):
-                # LOGGER.debug(
-                #     f"Got data on topic {data_item['data_topic']} "
-                #     f"matching with subscriber on topic {data_topic}"
-                # )
-
-                self.run_callbacks(callbacks, data_item["data"])
+        for callbacks in DataStream.get_wildcard_subscribers(data_item["data_topic"]):
+            DataStream.run_callbacks(callbacks, data_item["data"])
 
-    def consume_data(self) -> None:
-        """Publish data to topics."""
+    @staticmethod
+    def consume_data(shard: DataStreamShard) -> None:
+        """Publish data from a shard to topics."""
         while True:
-            data_item = self._data_queue.get()
-            self.static_subscriptions(data_item)
-            self.wildcard_subscriptions(data_item)
+            data_item = shard.queue.get()
+            DataStream.static_subscriptions(data_item)
+            DataStream.wildcard_subscriptions(data_item)
@@ -3,43 +3,100 @@ from __future__ import annotations
 
 import importlib
 import logging
+import threading
 import time
 from abc import ABC, abstractmethod
-from queue import Queue
-from threading import Lock
-from typing import TYPE_CHECKING
+from collections import Counter, defaultdict
+from dataclasses import replace
+from queue import Empty
+from typing import TYPE_CHECKING, DefaultDict, Dict, List, Optional, Tuple
 
 import cv2
 from voluptuous import PREVENT_EXTRA
 
 from viseron.config.config_object_detection import ObjectDetectionConfig
-from viseron.const import TOPIC_FRAME_PROCESSED_OBJECT, TOPIC_FRAME_SCAN_OBJECT
+from viseron.const import (
+    DETECTOR_WORKER_TYPE_PROCESS,
+    TOPIC_FRAME_PROCESSED_OBJECT,
+    TOPIC_FRAME_SCAN_OBJECT,
+)
 from viseron.data_stream import DataStream
 from viseron.exceptions import (
     DetectorConfigError,
     DetectorConfigSchemaError,
     DetectorImportError,
     DetectorModuleNotFoundError,
+    DetectorProcessWorkerError,
 )
 from viseron.watchdog.thread_watchdog import RestartableThread
 
+from .detected_object import DetectedObject, DetectionBatch
+from .scheduler import FairScheduler
+from .tiling import non_max_suppression
+from .worker import DetectorWorker, ProcessDetectorWorker, ThreadDetectorWorker
+
 if TYPE_CHECKING:
     from viseron.camera.frame_decoder import FrameToScan
 
 LOGGER = logging.getLogger(__name__)
 
 
+def map_to_frame(
+    objects: List[DetectedObject], crop_region: Tuple[float, float, float, float]
+) -> List[DetectedObject]:
+    """Map objects detected in a cropped frame to coordinates of the whole frame."""
+    if isinstance(objects, DetectionBatch):
+        return objects.map_to_frame(crop_region)
+    x1, y1, x2, y2 = crop_region
+    width = x2 - x1
+    height = y2 - y1
+    return [
+        DetectedObject(
+            obj.label,
+            obj.confidence,
+            x1 + obj.rel_x1 * width,
+            y1 + obj.rel_y1 * height,
+            x1 + obj.rel_x2 * width,
+            y1 + obj.rel_y2 * height,
+        )
+        for obj in objects
+    ]
+
+
 class AbstractObjectDetection(ABC):
     """Abstract Object Detection."""
 
+    @classmethod
+    def preprocessor(cls, config):
+        """Return object that preprocesses frames without loading the model.
+
+        The object provides preprocess and model_res. It is used in
+        Viseron's process when object detection runs in process workers, which load
+        the model themselves. Detectors that support process workers override this.
+        """
+        raise DetectorProcessWorkerError(config.type)
+
     def preprocess(self, frame_to_scan: FrameToScan):  # pylint: disable=no-self-use
         """Preprocessor function that runs before detection."""
         return frame_to_scan
 
+    @property
+    def model_res(self) -> Optional[Tuple[int, int]]:
+        """Return resolution frames are resized to, or None if they are not."""
+        return None
+
     @abstractmethod
     def return_objects(self, frame_to_scan: FrameToScan):
         """Perform object detection."""
 
+    def return_objects_batch(self, frames_to_scan: List[FrameToScan]):
+        """Perform object detection on a batch of frames.
+
+        Returns a list of detected objects for each frame, in the same order as
+        frames_to_scan. Detectors that support batched inference should override this.
+        """
+        return [self.return_objects(frame_to_scan) for frame_to_scan in frames_to_scan]
+
 
 class AbstractDetectorConfig(ABC, ObjectDetectionConfig):
     """Abstract Object Detector Config."""
@@ -50,9 +107,8 @@ class AbstractDetectorConfig(ABC, ObjectDetectionConfig):
 class Detector:
     """Subscribe to frames and run object detection using the configured detector."""
 
-    lock = Lock()
-
     def __init__(self, object_detection_config):
+        self._workers: List[DetectorWorker] = []
         # Config is not validated yet so we need to access the dictionary value
         if not object_detection_config["enable"]:
             return
@@ -61,7 +117,8 @@ class Detector:
             object_detection_config
         )
 
-        config = config_module.Config(config_module.SCHEMA(object_detection_config))
+        validated_config = config_module.SCHEMA(object_detection_config)
+        config = config_module.Config(validated_config)
         if getattr(config.logging, "level", None):
             LOGGER.setLevel(config.logging.level)
         LOGGER.debug(f"Initializing object detector {config.type}")
@@ -71,12 +128,45 @@ class Detector:
             LOGGER.debug("OpenCL activated")
             cv2.ocl.setUseOpenCL(True)
 
-        self.object_detector = detector_module.ObjectDetection(config)
+        if config.worker_type == DETECTOR_WORKER_TYPE_PROCESS:
+            # The model is only loaded in the worker processes
+            self.preprocessor = detector_module.ObjectDetection.preprocessor(config)
+            for index in range(config.workers):
+                self._workers.append(
+                    ProcessDetectorWorker(
+                        str(index),
+                        self.publish_results,
+                        validated_config,
+                    )
+                )
+        else:
+            object_detector = detector_module.ObjectDetection(config)
+            self.preprocessor = object_detector
+            for index in range(config.workers):
+                self._workers.append(
+                    ThreadDetectorWorker(
+                        str(index),
+                        self.publish_results,
+                        object_detector
+                        if index == 0
+                        else detector_module.ObjectDetection(config),
+                    )
+                )
+        LOGGER.debug(f"Running {config.workers} {config.worker_type} worker(s)")
+
+        self._statistics: DefaultDict[str, Counter] = defaultdict(Counter)
+        self._statistics_lock = threading.Lock()
+
+        self._batch_size = config.batch_size
+        self._batch_timeout = config.batch_timeout
+        if self._batch_size > 1:
+            LOGGER.debug(
+                f"Batching up to {self._batch_size} frames, "
+                f"waiting at most {self._batch_timeout}s for a batch to fill up"
+            )
 
         self._topic_scan_object = f"*/{TOPIC_FRAME_SCAN_OBJECT}"
-        self._object_detection_queue: Queue[  # pylint: disable=unsubscriptable-object
-            FrameToScan
-        ] = Queue(maxsize=100)
+        self._object_detection_queue = FairScheduler()
         object_detection_thread = RestartableThread(
             target=self.object_detection,
             name="object_detection",
@@ -89,28 +179,138 @@ class Detector:
 
         LOGGER.debug("Object detector initialized")
 
-    def object_detection(self):
-        """Perform object detection and publish the results."""
+    def stop(self) -> None:
+        """Stop object detector workers."""
+        for worker in self._workers:
+            worker.stop()
+
+    @staticmethod
+    def frame_too_old(frame_to_scan: FrameToScan) -> bool:
+        """Return True if frame is older than max_frame_age."""
+        if (
+            frame_age := time.time() - frame_to_scan.capture_time
+        ) > frame_to_scan.camera_config.object_detection.max_frame_age:
+            LOGGER.debug(
+                f"Frame is {frame_age} seconds old for "
+                f"{frame_to_scan.decoder_name}. Discarding"
+            )
+            return True
+        return False
+
+    def get_batch(self) -> List[FrameToScan]:
+        """Collect frames until batch_size is reached or batch_timeout expires."""
+        batch: List[FrameToScan] = []
+        frame_to_scan: FrameToScan = self._object_detection_queue.get()
+        deadline = time.monotonic() + self._batch_timeout
         while True:
-            frame_to_scan: FrameToScan = self._object_detection_queue.get()
-            if (
-                frame_age := time.time() - frame_to_scan.capture_time
-            ) > frame_to_scan.camera_config.object_detection.max_frame_age:
-                LOGGER.debug(
-                    f"Frame is {frame_age} seconds old for "
-                    f"{frame_to_scan.decoder_name}. Discarding"
+            if not self.frame_too_old(frame_to_scan):
+                batch.append(frame_to_scan)
+            if len(batch) >= self._batch_size:
+                return batch
+
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    frame_to_scan = self._object_detection_queue.get(timeout=timeout)
+                else:
+                    frame_to_scan = self._object_detection_queue.get_nowait()
+            except Empty:
+                return batch
+
+    @staticmethod
+    def expand_tiles(batch: List[FrameToScan]) -> List[FrameToScan]:
+        """Replace frames that are split into tiles with one frame per tile."""
+        expanded: List[FrameToScan] = []
+        for frame_to_scan in batch:
+            if not frame_to_scan.tiles:
+                expanded.append(frame_to_scan)
+                continue
+            expanded += [
+                replace(
+                    frame_to_scan, decoder_name=tile, tiles=[], tile_of=frame_to_scan
                 )
+                for tile in frame_to_scan.tiles
+            ]
+        return expanded
+
+    def publish_results(self, batch: List[FrameToScan], results) -> None:
+        """Publish detected objects to each frames camera.
+
+        Objects detected in the tiles of a frame are merged before they are
+        published.
+        """
+        tiled: Dict[int, Tuple[FrameToScan, List[DetectedObject]]] = {}
+        for frame_to_scan, objects in zip(batch, results):
+            crop_region = frame_to_scan.frame.crop_region(frame_to_scan.decoder_name)
+            if crop_region is not None:
+                objects = map_to_frame(objects, crop_region)
+            if frame_to_scan.tile_of is None:
+                self.publish_objects(frame_to_scan, objects)
                 continue
+            _, tile_objects = tiled.setdefault(
+                id(frame_to_scan.tile_of), (frame_to_scan.tile_of, [])
+            )
+            tile_objects.extend(objects)
 
-            frame_to_scan.frame.objects = self.object_detector.return_objects(
-                frame_to_scan
+        for frame_to_scan, objects in tiled.values():
+            self.publish_objects(frame_to_scan, non_max_suppression(objects))
+
+    def publish_objects(
+        self, frame_to_scan: FrameToScan, objects: List[DetectedObject]
+    ) -> None:
+        """Publish detected objects to the frames camera."""
+        camera = frame_to_scan.camera_config.camera.name_slug
+        detection_time = time.time() - frame_to_scan.capture_time
+        with self._statistics_lock:
+            self._statistics[camera]["frames"] += 1
+            self._statistics[camera]["tiles"] += len(frame_to_scan.tiles) or 1
+            self._statistics[camera]["detection_time"] += detection_time
+        if frame_to_scan.tiles:
+            LOGGER.debug(
+                f"Scanned {len(frame_to_scan.tiles)} tiles for "
+                f"{frame_to_scan.decoder_name} in {detection_time:.3f}s, "
+                f"found {len(objects)} objects"
             )
-            DataStream.publish_data(
-                (
-                    f"{frame_to_scan.camera_config.camera.name_slug}/"
-                    f"{TOPIC_FRAME_PROCESSED_OBJECT}"
-                ),
-                frame_to_scan,
+
+        frame_to_scan.frame.objects = objects
+        DataStream.publish_data(
+            f"{camera}/{TOPIC_FRAME_PROCESSED_OBJECT}",
+            frame_to_scan,
+        )
+
+    @property
+    def statistics(self) -> Dict[str, Dict[str, float]]:
+        """Return number of scanned frames and tiles, and detection time per camera.
+
+        average_detection_time is the average time from a frame is captured until
+        its objects are published, which includes waiting for the detector.
+        """
+        with self._statistics_lock:
+            return {
+                camera: {
+                    "frames": statistics["frames"],
+                    "tiles": statistics["tiles"],
+                    "average_detection_time": round(
+                        statistics["detection_time"] / statistics["frames"], 3
+                    ),
+                }
+                for camera, statistics in self._statistics.items()
+            }
+
+    @property
+    def scheduler_statistics(self):
+        """Return number of served and dropped frames for each camera."""
+        return self._object_detection_queue.statistics()
+
+    def object_detection(self):
+        """Route batches of frames to the least loaded worker."""
+        while True:
+            batch = self.get_batch()
+            if not batch:
+                continue
+
+            min(self._workers, key=lambda worker: worker.pending).submit(
+                self.expand_tiles(batch)
             )
 
 
@@ -1,22 +1,66 @@
 """Darknet object detector."""
 import configparser
 import logging
+from typing import List
 
 import cv2
+import numpy as np
 
 from viseron.camera.frame_decoder import FrameToScan
-from viseron.detector import AbstractObjectDetection, Detector
-from viseron.detector.detected_object import DetectedObject
+from viseron.detector import AbstractObjectDetection
+from viseron.detector.detected_object import DetectionBatch
 
 from .config import Config
 
 LOGGER = logging.getLogger(__name__)
 
 
-class ObjectDetection(AbstractObjectDetection):
+class Preprocessor:
+    """Preprocesses frames for the model without loading it."""
+
+    def __init__(self, config: Config):
+        if config.model_width and config.model_height:
+            self._model_width = config.model_width
+            self._model_height = config.model_height
+        else:
+            model_config = configparser.ConfigParser(strict=False)
+            model_config.read(config.model_config)
+            self._model_width = int(model_config.get("net", "width"))
+            self._model_height = int(model_config.get("net", "height"))
+
+    def preprocess(self, frame_to_scan: FrameToScan):
+        """Preprocess frame before detection."""
+        frame_to_scan.frame.resize(
+            frame_to_scan.decoder_name,
+            self._model_width,
+            self._model_height,
+        )
+        frame_to_scan.frame.save_preprocessed_frame(
+            frame_to_scan.decoder_name,
+            frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name),
+        )
+
+    @property
+    def model_width(self):
+        """Return trained model width."""
+        return self._model_width
+
+    @property
+    def model_height(self):
+        """Return trained model height."""
+        return self._model_height
+
+    @property
+    def model_res(self):
+        """Return trained model resolution."""
+        return self.model_width, self.model_height
+
+
+class ObjectDetection(Preprocessor, AbstractObjectDetection):
     """Performs object detection."""
 
     def __init__(self, config: Config):
+        super().__init__(config)
         self.nms = config.suppression
 
         # Activate OpenCL
@@ -31,15 +75,7 @@ class ObjectDetection(AbstractObjectDetection):
             config.dnn_preferable_target,
         )
 
-        if config.model_width and config.model_height:
-            self._model_width = config.model_width
-            self._model_height = config.model_height
-        else:
-            model_config = configparser.ConfigParser(strict=False)
-            model_config.read(config.model_config)
-            self._model_width = int(model_config.get("net", "width"))
-            self._model_height = int(model_config.get("net", "height"))
-
+        self._output_names = self.net.getUnconnectedOutLayersNames()
         self.model = cv2.dnn_DetectionModel(self.net)
         self.model.setInputParams(
             size=(self.model_width, self.model_height), scale=1 / 255
@@ -60,65 +96,106 @@ class ObjectDetection(AbstractObjectDetection):
         self.net.setPreferableBackend(backend)
         self.net.setPreferableTarget(target)
 
-    def preprocess(self, frame_to_scan: FrameToScan):
-        """Preprocess frame before detection."""
-        frame_to_scan.frame.resize(
-            frame_to_scan.decoder_name,
-            self._model_width,
-            self._model_height,
-        )
-        frame_to_scan.frame.save_preprocessed_frame(
-            frame_to_scan.decoder_name,
-            frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name),
-        )
+    @classmethod
+    def preprocessor(cls, config: Config) -> Preprocessor:
+        """Return object that preprocesses frames without loading the model."""
+        return Preprocessor(config)
 
-    def post_process(self, labels, confidences, boxes):
+    def post_process(self, labels, confidences, boxes) -> DetectionBatch:
         """Post process detections."""
-        detections = []
-        for (label, confidence, box) in zip(labels, confidences, boxes):
-            detections.append(
-                DetectedObject(
-                    self.labels[int(label[0])],
-                    confidence[0],
-                    box[0],
-                    box[1],
-                    box[0] + box[2],
-                    box[1] + box[3],
-                    relative=False,
-                    image_res=self.model_res,
-                )
-            )
-
-        return detections
+        # Boxes are (x, y, width, height)
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        boxes[:, 2:] += boxes[:, :2]
+        return DetectionBatch.from_arrays(
+            self.labels,
+            np.asarray(labels, dtype=np.int32),
+            confidences,
+            boxes,
+            image_res=self.model_res,
+        )
 
     def return_objects(self, frame_to_scan: FrameToScan):
-        """Perform object detection.
+        """Perform object detection."""
+        labels, confidences, boxes = self.model.detect(
+            frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name),
+            frame_to_scan.camera_config.object_detection.min_confidence,
+            self.nms,
+        )
+
+        objects = self.post_process(labels, confidences, boxes)
+        return objects
 
-        Running detection using CUDA at the exact same time as running sp.Popen causes
-        the detection process to hang and return the same results infinitely.
-        Therefore we acquire a lock before inference and sp.Popen to avoid this.
+    def decode_output(self, output, min_confidence):
+        """Decode YOLO output rows of a single frame and run non-maxima suppression.
+
+        Each row contains center x, center y, width, height relative to the model
+        resolution, followed by the objectness score and one score per class.
+        Returns labels, confidences and boxes in the same format as
+        DetectionModel.detect.
         """
-        with Detector.lock:
-            labels, confidences, boxes = self.model.detect(
-                frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name),
-                frame_to_scan.camera_config.object_detection.min_confidence,
+        scores = output[:, 5:]
+        class_ids = np.argmax(scores, axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences >= min_confidence
+        output = output[keep]
+        class_ids = class_ids[keep]
+        confidences = confidences[keep]
+
+        boxes = np.empty((len(output), 4), dtype=np.int32)
+        boxes[:, 0] = (output[:, 0] - output[:, 2] / 2) * self._model_width
+        boxes[:, 1] = (output[:, 1] - output[:, 3] / 2) * self._model_height
+        boxes[:, 2] = output[:, 2] * self._model_width
+        boxes[:, 3] = output[:, 3] * self._model_height
+
+        # Suppression is done per class, same as DetectionModel.detect
+        indices: List[int] = []
+        for class_id in np.unique(class_ids):
+            class_indices = np.flatnonzero(class_ids == class_id)
+            kept = cv2.dnn.NMSBoxes(
+                boxes[class_indices].tolist(),
+                confidences[class_indices].tolist(),
+                min_confidence,
                 self.nms,
             )
+            indices += class_indices[np.array(kept, dtype=np.int64).flatten()].tolist()
 
-        objects = self.post_process(labels, confidences, boxes)
-        return objects
+        return (
+            class_ids[indices].reshape(-1, 1),
+            confidences[indices].reshape(-1, 1),
+            boxes[indices],
+        )
 
-    @property
-    def model_width(self):
-        """Return trained model width."""
-        return self._model_width
+    def return_objects_batch(self, frames_to_scan: List[FrameToScan]):
+        """Perform object detection on a batch of frames in one forward pass."""
+        images = []
+        for frame_to_scan in frames_to_scan:
+            image = frame_to_scan.frame.get_preprocessed_frame(
+                frame_to_scan.decoder_name
+            )
+            images.append(image.get() if isinstance(image, cv2.UMat) else image)
+        blob = cv2.dnn.blobFromImages(
+            images,
+            scalefactor=1 / 255,
+            size=(self.model_width, self.model_height),
+            swapRB=False,
+            crop=False,
+        )
 
-    @property
-    def model_height(self):
-        """Return trained model height."""
-        return self._model_height
+        self.net.setInput(blob)
+        outputs = self.net.forward(self._output_names)
 
-    @property
-    def model_res(self):
-        """Return trained model resolution."""
-        return self.model_width, self.model_height
+        # Region layers return (batch, rows, columns) when batch size is larger
+        # than 1, reshape to make sure each row belongs to a single frame
+        outputs = [
+            output.reshape(len(frames_to_scan), -1, output.shape[-1])
+            for output in outputs
+        ]
+
+        results = []
+        for index, frame_to_scan in enumerate(frames_to_scan):
+            labels, confidences, boxes = self.decode_output(
+                np.concatenate([output[index] for output in outputs]),
+                frame_to_scan.camera_config.object_detection.min_confidence,
+            )
+            results.append(self.post_process(labels, confidences, boxes))
+        return results
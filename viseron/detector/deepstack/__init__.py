@@ -3,10 +3,11 @@ import logging
 
 import cv2
 import deepstack.core as ds
+import numpy as np
 
 from viseron.camera.frame_decoder import FrameToScan
 from viseron.detector import AbstractObjectDetection
-from viseron.detector.detected_object import DetectedObject
+from viseron.detector.detected_object import DetectionBatch
 
 from .config import Config
 
@@ -43,30 +44,40 @@ class ObjectDetection(AbstractObjectDetection):
             )[1].tobytes(),
         )
 
-    def postprocess(self, detections, frame: FrameToScan):
-        """Return deepstack detections as DetectedObject."""
-        objects = []
-        for detection in detections:
-            objects.append(
-                DetectedObject(
-                    detection["label"],
-                    detection["confidence"],
+    @property
+    def model_res(self):
+        """Return resolution frames are resized to, if configured."""
+        if self._config.image_width and self._config.image_height:
+            return self._config.image_width, self._config.image_height
+        return None
+
+    def postprocess(self, detections, frame: FrameToScan) -> DetectionBatch:
+        """Return deepstack detections as a DetectionBatch."""
+        labels, label_ids = np.unique(
+            [detection["label"] for detection in detections], return_inverse=True
+        )
+        return DetectionBatch.from_arrays(
+            labels.tolist(),
+            label_ids,
+            [detection["confidence"] for detection in detections],
+            [
+                (
                     detection["x_min"],
                     detection["y_min"],
                     detection["x_max"],
                     detection["y_max"],
-                    relative=False,
-                    image_res=(
-                        self._config.image_width
-                        if self._config.image_width
-                        else frame.stream_width,
-                        self._config.image_height
-                        if self._config.image_height
-                        else frame.stream_height,
-                    ),
                 )
-            )
-        return objects
+                for detection in detections
+            ],
+            image_res=(
+                self._config.image_width
+                if self._config.image_width
+                else frame.stream_width,
+                self._config.image_height
+                if self._config.image_height
+                else frame.stream_height,
+            ),
+        )
 
     def return_objects(self, frame_to_scan: FrameToScan):
         """Perform object detection."""
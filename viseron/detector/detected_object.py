@@ -1,6 +1,41 @@
 """Represents a detected object."""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
 from viseron import helpers
 
+DETECTION_DTYPE = np.dtype(
+    [
+        ("label", np.int32),
+        ("confidence", np.float64),
+        ("rel_x1", np.float64),
+        ("rel_y1", np.float64),
+        ("rel_x2", np.float64),
+        ("rel_y2", np.float64),
+        ("rel_width", np.float64),
+        ("rel_height", np.float64),
+    ]
+)
+
+
+def round_detections(values: np.ndarray) -> np.ndarray:
+    """Round values to 3 decimals the same way as round.
+
+    np.round scales the values which can round half way cases differently than
+    round, so values close to half way are rounded one by one.
+    """
+    rounded = np.round(values, 3)
+    close_to_half = np.abs(np.abs(values * 1000 % 1) - 0.5) < 1e-6
+    if close_to_half.any():
+        rounded[close_to_half] = [
+            round(value, 3) for value in values[close_to_half].tolist()
+        ]
+    return rounded
+
 
 class DetectedObject:
     """Object that holds a detected object.
@@ -9,6 +44,21 @@ class DetectedObject:
     different image resolutions.
     """
 
+    __slots__ = (
+        "_label",
+        "_confidence",
+        "_rel_x1",
+        "_rel_y1",
+        "_rel_x2",
+        "_rel_y2",
+        "_rel_width",
+        "_rel_height",
+        "_trigger_recorder",
+        "_relevant",
+        "_filter_hit",
+        "_track_id",
+    )
+
     def __init__(
         self, label, confidence, x1, y1, x2, y2, relative=True, image_res=None
     ):
@@ -32,6 +82,28 @@ class DetectedObject:
         self._trigger_recorder = False
         self._relevant = False
         self._filter_hit = None
+        self._track_id = None
+
+    @classmethod
+    def from_detection(cls, label, detection: Tuple) -> DetectedObject:
+        """Return object from a row of a DetectionBatch, which is already rounded."""
+        obj = cls.__new__(cls)
+        obj._label = label
+        (
+            _,
+            obj._confidence,
+            obj._rel_x1,
+            obj._rel_y1,
+            obj._rel_x2,
+            obj._rel_y2,
+            obj._rel_width,
+            obj._rel_height,
+        ) = detection
+        obj._trigger_recorder = False
+        obj._relevant = False
+        obj._filter_hit = None
+        obj._track_id = None
+        return obj
 
     @property
     def label(self):
@@ -85,6 +157,8 @@ class DetectedObject:
         payload["rel_y1"] = self.rel_y1
         payload["rel_x2"] = self.rel_x2
         payload["rel_y2"] = self.rel_y2
+        if self.track_id is not None:
+            payload["track_id"] = self.track_id
         return payload
 
     @property
@@ -117,3 +191,149 @@ class DetectedObject:
     @filter_hit.setter
     def filter_hit(self, value):
         self._filter_hit = value
+
+    @property
+    def track_id(self):
+        """Return id of the track the object belongs to, if tracking is enabled."""
+        return self._track_id
+
+    @track_id.setter
+    def track_id(self, value):
+        self._track_id = value
+
+
+class DetectionBatch(Sequence):
+    """All objects detected in a frame, stored in a structured numpy array.
+
+    Detectors fill the batch in bulk from their output tensors, so no Python object
+    is created per detection. Values are rounded the same way as DetectedObject.
+
+    The batch is a sequence of DetectedObject. Each object is created from the array
+    the first time it is accessed, so filters that work on the arrays only create
+    objects for the detections that pass. The same instances are returned on every
+    access, so flags set on them are kept. The filter that discarded a detection is
+    stored in the batch until its object is created.
+    """
+
+    def __init__(
+        self, labels: Union[Mapping[int, str], List[str]], detections: np.ndarray
+    ):
+        self._labels = labels
+        self.detections = detections
+        self._reset_objects()
+
+    def _reset_objects(self) -> None:
+        """Forget created objects and filter hits."""
+        self._objects: List[Optional[DetectedObject]] = [None] * len(self.detections)
+        self._filter_hits = np.full(len(self.detections), None, dtype=object)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        labels: Union[Mapping[int, str], List[str]],
+        label_ids,
+        confidences,
+        boxes,
+        image_res: Tuple[int, int] = None,
+    ) -> DetectionBatch:
+        """Return batch from arrays of label ids, confidences and boxes.
+
+        Boxes are (x1, y1, x2, y2). They are relative unless image_res is given,
+        in which case they are absolute coordinates in an image of that resolution.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if image_res:
+            boxes = boxes / np.tile(image_res, 2)
+        boxes = round_detections(boxes)
+        detections = np.empty(len(boxes), dtype=DETECTION_DTYPE)
+        detections["label"] = np.asarray(label_ids).reshape(-1)
+        detections["confidence"] = round_detections(
+            np.asarray(confidences, dtype=np.float64).reshape(-1)
+        )
+        detections["rel_x1"] = boxes[:, 0]
+        detections["rel_y1"] = boxes[:, 1]
+        detections["rel_x2"] = boxes[:, 2]
+        detections["rel_y2"] = boxes[:, 3]
+        detections["rel_width"] = round_detections(boxes[:, 2] - boxes[:, 0])
+        detections["rel_height"] = round_detections(boxes[:, 3] - boxes[:, 1])
+        return cls(labels, detections)
+
+    def __getstate__(self):
+        """Return state to pickle."""
+        # Objects are created again when accessed, which keeps pickling cheap
+        return self._labels, self.detections
+
+    def __setstate__(self, state):
+        """Restore pickled state."""
+        self._labels, self.detections = state
+        self._reset_objects()
+
+    def __len__(self) -> int:
+        """Return number of detections."""
+        return len(self.detections)
+
+    def __getitem__(self, index):
+        """Return object at index."""
+        if isinstance(index, slice):
+            return [self._object(i) for i in range(len(self))[index]]
+        return self._object(index)
+
+    def __iter__(self):
+        """Iterate over objects."""
+        return (self._object(index) for index in range(len(self)))
+
+    def _object(self, index) -> DetectedObject:
+        """Return object at index, creating it on first access."""
+        obj = self._objects[index]
+        if obj is None:
+            detection = self.detections[index].tolist()
+            obj = DetectedObject.from_detection(self._labels[detection[0]], detection)
+            obj.filter_hit = self._filter_hits[index]
+            self._objects[index] = obj
+        return obj
+
+    @property
+    def objects(self) -> List[DetectedObject]:
+        """Return detections as DetectedObject."""
+        return [self._object(index) for index in range(len(self))]
+
+    def set_filter_hits(self, filter_hits: np.ndarray) -> None:
+        """Store the filter that discarded each detection, where it is not None."""
+        discarded = np.flatnonzero(filter_hits.astype(bool))
+        self._filter_hits[discarded] = filter_hits[discarded]
+        for index in discarded.tolist():
+            if self._objects[index] is not None:
+                self._objects[index].filter_hit = filter_hits[index]
+
+    @property
+    def label_names(self) -> np.ndarray:
+        """Return label of each detection."""
+        return np.array(
+            [self._labels[label] for label in self.detections["label"].tolist()],
+            dtype=object,
+        )
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """Return (x1, y1, x2, y2) of each detection."""
+        return np.stack(
+            [
+                self.detections["rel_x1"],
+                self.detections["rel_y1"],
+                self.detections["rel_x2"],
+                self.detections["rel_y2"],
+            ],
+            axis=1,
+        )
+
+    def map_to_frame(
+        self, crop_region: Tuple[float, float, float, float]
+    ) -> DetectionBatch:
+        """Map detections in a cropped frame to coordinates of the whole frame."""
+        x1, y1, x2, y2 = crop_region
+        return self.from_arrays(
+            self._labels,
+            self.detections["label"],
+            self.detections["confidence"],
+            self.boxes * [x2 - x1, y2 - y1, x2 - x1, y2 - y1] + [x1, y1, x1, y1],
+        )
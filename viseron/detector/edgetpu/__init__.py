@@ -2,7 +2,7 @@
 import logging
 import re
 from os import PathLike
-from typing import List, Union
+from typing import Tuple, Union
 
 import numpy as np
 import tflite_runtime.interpreter as tflite
@@ -14,7 +14,8 @@ from voluptuous import All, Invalid, Maybe, Optional, Required
 
 from viseron.camera.frame_decoder import FrameToScan
 from viseron.detector import AbstractDetectorConfig, AbstractObjectDetection
-from viseron.detector.detected_object import DetectedObject
+from viseron.detector.detected_object import DetectionBatch
+from viseron.exceptions import DetectorProcessWorkerError
 
 from .defaults import DEVICE, LABEL_PATH, MODEL_HEIGHT, MODEL_PATH, MODEL_WIDTH
 
@@ -57,7 +58,43 @@ SCHEMA = AbstractDetectorConfig.schema.extend(
 )
 
 
-class ObjectDetection(AbstractObjectDetection):
+class Preprocessor:
+    """Preprocesses frames for the model without loading it."""
+
+    def __init__(self, model_width: int, model_height: int):
+        self._model_width = model_width
+        self._model_height = model_height
+
+    def preprocess(self, frame_to_scan: FrameToScan):
+        """Return preprocessed frame before performing object detection."""
+        frame_to_scan.frame.resize(
+            frame_to_scan.decoder_name,
+            self._model_width,
+            self._model_height,
+        )
+        frame = frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name).get()
+        frame_to_scan.frame.save_preprocessed_frame(
+            frame_to_scan.decoder_name,
+            frame.reshape(1, frame.shape[0], frame.shape[1], frame.shape[2]),
+        )
+
+    @property
+    def model_width(self) -> int:
+        """Return trained model width."""
+        return self._model_width
+
+    @property
+    def model_height(self) -> int:
+        """Return trained model height."""
+        return self._model_height
+
+    @property
+    def model_res(self) -> Tuple[int, int]:
+        """Return trained model resolution."""
+        return self.model_width, self.model_height
+
+
+class ObjectDetection(Preprocessor, AbstractObjectDetection):
     """Performs object detection."""
 
     def __init__(self, config):
@@ -81,11 +118,25 @@ class ObjectDetection(AbstractObjectDetection):
         self.tensor_output_details = self.interpreter.get_output_details()
 
         if config.model_width and config.model_height:
-            self._model_width = config.model_width
-            self._model_height = config.model_height
+            super().__init__(config.model_width, config.model_height)
         else:
-            self._model_width = self.tensor_input_details[0]["shape"][1]
-            self._model_height = self.tensor_input_details[0]["shape"][2]
+            super().__init__(
+                self.tensor_input_details[0]["shape"][1],
+                self.tensor_input_details[0]["shape"][2],
+            )
+
+    @classmethod
+    def preprocessor(cls, config) -> Preprocessor:
+        """Return object that preprocesses frames without loading the model.
+
+        The model size is read from the model when it is not configured, which
+        requires loading it, so it has to be configured for process workers.
+        """
+        if not (config.model_width and config.model_height):
+            raise DetectorProcessWorkerError(
+                config.type, "model_width and model_height have to be configured"
+            )
+        return Preprocessor(config.model_width, config.model_height)
 
     @staticmethod
     def read_labels(file_path):
@@ -98,19 +149,6 @@ class ObjectDetection(AbstractObjectDetection):
             labels[int(pair[0])] = pair[1].strip()
         return labels
 
-    def preprocess(self, frame_to_scan: FrameToScan):
-        """Return preprocessed frame before performing object detection."""
-        frame_to_scan.frame.resize(
-            frame_to_scan.decoder_name,
-            self._model_width,
-            self._model_height,
-        )
-        frame = frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name).get()
-        frame_to_scan.frame.save_preprocessed_frame(
-            frame_to_scan.decoder_name,
-            frame.reshape(1, frame.shape[0], frame.shape[1], frame.shape[2]),
-        )
-
     def output_tensor(self, i):
         """Return output tensor view."""
         tensor = self.interpreter.tensor(
@@ -118,30 +156,23 @@ class ObjectDetection(AbstractObjectDetection):
         )()
         return np.squeeze(tensor)
 
-    def post_process(self, confidence):
+    def post_process(self, confidence) -> DetectionBatch:
         """Post process detections."""
-        processed_objects = []
         boxes = self.output_tensor(0)
         labels = self.output_tensor(1)
         scores = self.output_tensor(2)
         count = int(self.output_tensor(3))
 
-        for i in range(count):
-            if float(scores[i]) > confidence:
-                processed_objects.append(
-                    DetectedObject(
-                        self.labels[int(labels[i])],
-                        float(scores[i]),
-                        boxes[i][1],
-                        boxes[i][0],
-                        boxes[i][3],
-                        boxes[i][2],
-                    )
-                )
-
-        return processed_objects
-
-    def return_objects(self, frame_to_scan: FrameToScan) -> List[DetectedObject]:
+        keep = scores[:count] > confidence
+        return DetectionBatch.from_arrays(
+            self.labels,
+            labels[:count][keep].astype(np.int32),
+            scores[:count][keep],
+            # Boxes are (y1, x1, y2, x2)
+            boxes[:count][keep][:, [1, 0, 3, 2]],
+        )
+
+    def return_objects(self, frame_to_scan: FrameToScan) -> DetectionBatch:
         """Perform object detection."""
         tensor = frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name)
 
@@ -153,16 +184,6 @@ class ObjectDetection(AbstractObjectDetection):
         )
         return objects
 
-    @property
-    def model_width(self) -> int:
-        """Return trained model width."""
-        return self._model_width
-
-    @property
-    def model_height(self) -> int:
-        """Return trained model height."""
-        return self._model_height
-
 
 class Config(AbstractDetectorConfig):
     """EdgeTPU object detection config."""
@@ -0,0 +1,90 @@
+"""Fair share scheduling of frames from all cameras to the object detector."""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from queue import Queue
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from viseron.camera.frame_decoder import FrameToScan
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FairScheduler(Queue):
+    """Queue which serves cameras in weighted round robin order.
+
+    Each camera has a single slot which holds its latest frame, so a newer frame
+    replaces an older one that has not been served yet. Frames older than the
+    cameras max_frame_age are evicted when a new frame is put, instead of taking up
+    room until they are dequeued.
+
+    Cameras with waiting frames are picked using smooth weighted round robin, where
+    a camera with weight 2 is served twice as often as one with weight 1 when both
+    have frames waiting.
+
+    It is a drop-in replacement for Queue, so DataStream can put frames to it as
+    with any other subscriber queue.
+    """
+
+    def __init__(self):
+        super().__init__(maxsize=0)
+
+    # pylint: disable=attribute-defined-outside-init
+    def _init(self, maxsize):
+        self._slots: Dict[str, FrameToScan] = {}
+        self._weights: Dict[str, int] = {}
+        self._current_weights: Counter = Counter()
+        self._served: Counter = Counter()
+        self._dropped: Counter = Counter()
+
+    def _qsize(self):
+        return len(self._slots)
+
+    @staticmethod
+    def _expired(frame_to_scan: FrameToScan, now: float) -> bool:
+        """Return True if frame is older than max_frame_age."""
+        return (
+            now - frame_to_scan.capture_time
+            > frame_to_scan.camera_config.object_detection.max_frame_age
+        )
+
+    def _put(self, item: FrameToScan):
+        camera = item.camera_config.camera.name_slug
+        self._weights[camera] = item.camera_config.object_detection.scheduler_weight
+
+        now = time.time()
+        for slot_camera, frame_to_scan in list(self._slots.items()):
+            if self._expired(frame_to_scan, now):
+                del self._slots[slot_camera]
+                self._dropped[slot_camera] += 1
+
+        if self._expired(item, now):
+            self._dropped[camera] += 1
+            return
+        if camera in self._slots:
+            self._dropped[camera] += 1
+        self._slots[camera] = item
+
+    def _get(self) -> FrameToScan:
+        total_weight = 0
+        for camera in self._slots:
+            self._current_weights[camera] += self._weights[camera]
+            total_weight += self._weights[camera]
+        camera = max(self._slots, key=lambda camera: self._current_weights[camera])
+        self._current_weights[camera] -= total_weight
+        self._served[camera] += 1
+        return self._slots.pop(camera)
+
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """Return number of served and dropped frames for each camera."""
+        with self.mutex:
+            return {
+                camera: {
+                    "served": self._served[camera],
+                    "dropped": self._dropped[camera],
+                }
+                for camera in self._weights
+            }
@@ -0,0 +1,60 @@
+"""Split frames into overlapping tiles and merge objects detected in them."""
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from .detected_object import DetectedObject
+
+# Objects overlapping more than this are considered the same object
+TILE_NMS_THRESHOLD = 0.7
+
+
+def calculate_tiles(
+    columns: int, rows: int, overlap: float
+) -> List[Tuple[float, float, float, float]]:
+    """Return relative regions of a grid of tiles covering the whole frame.
+
+    Neighbouring tiles share overlap of their width or height, so that objects cut
+    by the border of one tile are seen whole in the next one.
+    """
+
+    def spans(count: int) -> List[Tuple[float, float]]:
+        size = 1 / (count - (count - 1) * overlap)
+        step = size * (1 - overlap)
+        return [(index * step, min(index * step + size, 1.0)) for index in range(count)]
+
+    return [(x1, y1, x2, y2) for y1, y2 in spans(rows) for x1, x2 in spans(columns)]
+
+
+def _overlap(obj: DetectedObject, other: DetectedObject) -> float:
+    """Return intersection of two objects over the area of the smallest one."""
+    width = min(obj.rel_x2, other.rel_x2) - max(obj.rel_x1, other.rel_x1)
+    height = min(obj.rel_y2, other.rel_y2) - max(obj.rel_y1, other.rel_y1)
+    if width <= 0 or height <= 0:
+        return 0.0
+    smallest_area = min(
+        obj.rel_width * obj.rel_height, other.rel_width * other.rel_height
+    )
+    if smallest_area <= 0:
+        return 0.0
+    return width * height / smallest_area
+
+
+def non_max_suppression(
+    objects: List[DetectedObject], threshold: float = TILE_NMS_THRESHOLD
+) -> List[DetectedObject]:
+    """Remove duplicates of objects that were detected in more than one tile.
+
+    An object cut by a tile border is only partially detected in that tile, so the
+    overlap is measured as the intersection over the area of the smallest object
+    instead of intersection over union. The object with the highest confidence is
+    kept.
+    """
+    kept: List[DetectedObject] = []
+    for obj in sorted(objects, key=lambda obj: obj.confidence, reverse=True):
+        if all(
+            obj.label != kept_obj.label or _overlap(obj, kept_obj) < threshold
+            for kept_obj in kept
+        ):
+            kept.append(obj)
+    return kept
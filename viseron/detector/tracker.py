@@ -0,0 +1,169 @@
+"""Track detected objects between object detection runs."""
+from __future__ import annotations
+
+import itertools
+from typing import List, Tuple
+
+import numpy as np
+
+from .detected_object import DetectedObject
+
+
+def iou(box: np.ndarray, other: np.ndarray) -> float:
+    """Return intersection over union of two (x1, y1, x2, y2) boxes."""
+    width = min(box[2], other[2]) - max(box[0], other[0])
+    height = min(box[3], other[3]) - max(box[1], other[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (
+        (box[2] - box[0]) * (box[3] - box[1])
+        + (other[2] - other[0]) * (other[3] - other[1])
+        - intersection
+    )
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    """A tracked object.
+
+    The box is predicted using a constant velocity alpha-beta filter, which is the
+    steady state form of a Kalman filter, so a track can be matched with a detection
+    that moved since the last detection run.
+    """
+
+    ALPHA = 0.7
+    BETA = 0.3
+
+    def __init__(self, track_id: int, obj: DetectedObject, timestamp: float):
+        self.track_id = track_id
+        self.label = obj.label
+        self.confidence = obj.confidence
+        self.box = np.array(
+            [obj.rel_x1, obj.rel_y1, obj.rel_x2, obj.rel_y2], dtype=np.float64
+        )
+        self.velocity = np.zeros(4)
+        self.timestamp = timestamp
+        self.misses = 0
+
+    def predict(self, timestamp: float) -> np.ndarray:
+        """Return predicted box at timestamp."""
+        return np.clip(self.box + self.velocity * (timestamp - self.timestamp), 0, 1)
+
+    def update(self, obj: DetectedObject, timestamp: float) -> None:
+        """Correct the track using a matched detection."""
+        elapsed = timestamp - self.timestamp
+        predicted = self.predict(timestamp)
+        residual = (
+            np.array([obj.rel_x1, obj.rel_y1, obj.rel_x2, obj.rel_y2]) - predicted
+        )
+        self.box = predicted + self.ALPHA * residual
+        if elapsed > 0:
+            self.velocity = self.velocity + self.BETA * residual / elapsed
+        self.confidence = obj.confidence
+        self.timestamp = timestamp
+        self.misses = 0
+
+
+class ObjectTracker:
+    """Assign persistent track ids to detected objects.
+
+    Each detection is matched to the track of the same label whose predicted box
+    overlaps it the most, if the intersection over union is at least iou_threshold.
+    Detections that do not match a track start a new one.
+
+    A track that is not matched is still reported at its predicted position, until
+    it has been missed by max_misses detection runs in a row. This keeps objects,
+    zones and the recorder stable even if the detector misses an object in a frame,
+    which allows a longer object detection interval.
+    """
+
+    def __init__(self, iou_threshold: float, max_misses: int):
+        self._iou_threshold = iou_threshold
+        self._max_misses = max_misses
+        self._tracks: List[Track] = []
+        self._track_ids = itertools.count(1)
+
+    def _match(
+        self, objects: List[DetectedObject], timestamp: float
+    ) -> List[Tuple[Track, DetectedObject]]:
+        """Greedily match detections with tracks, highest overlap first."""
+        candidates = []
+        for track in self._tracks:
+            predicted = track.predict(timestamp)
+            for index, obj in enumerate(objects):
+                if obj.label != track.label:
+                    continue
+                overlap = iou(
+                    predicted, (obj.rel_x1, obj.rel_y1, obj.rel_x2, obj.rel_y2)
+                )
+                if overlap >= self._iou_threshold:
+                    candidates.append((overlap, track, index))
+
+        matches = []
+        matched_tracks = set()
+        matched_objects = set()
+        for _, track, index in sorted(
+            candidates, key=lambda candidate: candidate[0], reverse=True
+        ):
+            if track.track_id in matched_tracks or index in matched_objects:
+                continue
+            matched_tracks.add(track.track_id)
+            matched_objects.add(index)
+            matches.append((track, objects[index]))
+        return matches
+
+    def _create_tracks(
+        self, objects: List[DetectedObject], timestamp: float
+    ) -> List[Track]:
+        """Start a new track for each object and return the created tracks."""
+        created_tracks = []
+        for obj in objects:
+            track = Track(next(self._track_ids), obj, timestamp)
+            obj.track_id = track.track_id
+            created_tracks.append(track)
+        self._tracks.extend(created_tracks)
+        return created_tracks
+
+    def update(
+        self, objects: List[DetectedObject], timestamp: float
+    ) -> List[DetectedObject]:
+        """Update tracks with the objects from a detection run.
+
+        Returns the detected objects with track ids assigned, followed by the objects
+        that were missed in this run at their predicted position.
+        """
+        matches = self._match(objects, timestamp)
+        matched_tracks = {track.track_id for track, _ in matches}
+        for track, obj in matches:
+            track.update(obj, timestamp)
+            obj.track_id = track.track_id
+
+        matched_objects = {id(obj) for _, obj in matches}
+        created_tracks = self._create_tracks(
+            [obj for obj in objects if id(obj) not in matched_objects], timestamp
+        )
+        updated_tracks = matched_tracks | {track.track_id for track in created_tracks}
+
+        tracked_objects = list(objects)
+        for track in list(self._tracks):
+            if track.track_id in updated_tracks:
+                continue
+            track.misses += 1
+            if track.misses > self._max_misses:
+                self._tracks.remove(track)
+                continue
+            tracked_objects.append(self.predicted_object(track, timestamp))
+        return tracked_objects
+
+    @staticmethod
+    def predicted_object(track: Track, timestamp: float) -> DetectedObject:
+        """Return object at the predicted position of track."""
+        obj = DetectedObject(track.label, track.confidence, *track.predict(timestamp))
+        obj.track_id = track.track_id
+        return obj
+
+    @property
+    def tracks(self) -> List[Track]:
+        """Return active tracks."""
+        return self._tracks
@@ -0,0 +1,424 @@
+"""Object detector workers."""
+from __future__ import annotations
+
+import itertools
+import logging
+import logging.handlers
+import multiprocessing as mp
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import replace
+from multiprocessing import shared_memory
+from queue import Empty, Full, Queue
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from viseron.watchdog.thread_watchdog import RestartableThread
+
+if TYPE_CHECKING:
+    from viseron.camera.frame_decoder import FrameToScan
+    from viseron.detector import AbstractObjectDetection
+
+LOGGER = logging.getLogger(__name__)
+
+WORKER_QUEUE_SIZE = 2
+
+
+def run_detection(
+    object_detector: AbstractObjectDetection, batch: List[FrameToScan]
+) -> List[List[Any]]:
+    """Run object detection on a batch of frames."""
+    if len(batch) == 1:
+        return [object_detector.return_objects(batch[0])]
+    return object_detector.return_objects_batch(batch)
+
+
+class DetectorWorker(ABC):
+    """Base class for object detector workers.
+
+    Each worker owns its own ObjectDetection instance and input queue. The number of
+    batches that are queued or being processed is tracked so that the Detector can
+    route new batches to the least loaded worker.
+    """
+
+    def __init__(self, name: str, publish_callback: Callable):
+        self.name = name
+        self._publish_callback = publish_callback
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def submit(self, batch: List[FrameToScan]) -> None:
+        """Queue batch for detection."""
+        with self._pending_lock:
+            self._pending += 1
+        self.put(batch)
+
+    def done(self, batch: List[FrameToScan], results: List[List[Any]]) -> None:
+        """Publish results of a processed batch."""
+        with self._pending_lock:
+            self._pending -= 1
+        self._publish_callback(batch, results)
+
+    @abstractmethod
+    def put(self, batch: List[FrameToScan]) -> None:
+        """Put batch in the workers input queue."""
+
+    def stop(self) -> None:
+        """Stop the worker."""
+
+    @property
+    def pending(self) -> int:
+        """Return number of batches queued or being processed."""
+        return self._pending
+
+
+class ThreadDetectorWorker(DetectorWorker):
+    """Run object detection in a thread.
+
+    Suitable for backends that release the GIL during inference, like OpenCV DNN.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        publish_callback: Callable,
+        object_detector: AbstractObjectDetection,
+    ):
+        super().__init__(name, publish_callback)
+        self._object_detector = object_detector
+        self._queue: Queue = Queue(maxsize=WORKER_QUEUE_SIZE)
+        worker_thread = RestartableThread(
+            name=f"object_detection.{name}",
+            target=self.run,
+            daemon=True,
+            register=True,
+        )
+        worker_thread.start()
+
+    def put(self, batch: List[FrameToScan]) -> None:
+        """Put batch in the workers input queue."""
+        self._queue.put(batch)
+
+    def run(self) -> None:
+        """Perform object detection on queued batches."""
+        while True:
+            batch = self._queue.get()
+            try:
+                results = run_detection(self._object_detector, batch)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception(f"Error in object detection worker {self.name}")
+                results = [[] for _ in batch]
+            self.done(batch, results)
+
+
+class WorkerFrame:
+    """Stand-in for Frame which is used in process workers.
+
+    Only the preprocessed frame is available since the rest of the Frame can not be
+    shared with the worker process.
+    """
+
+    def __init__(self, preprocessed_frame):
+        self._preprocessed_frame = preprocessed_frame
+
+    def get_preprocessed_frame(self, _decoder_name: str):
+        """Return stored frame from a preprocessor."""
+        return self._preprocessed_frame
+
+
+def to_worker_frame_to_scan(frame_to_scan: FrameToScan) -> FrameToScan:
+    """Return a picklable copy of frame_to_scan without the frame.
+
+    The preprocessed frame is transferred separately through shared memory.
+    """
+    return replace(
+        frame_to_scan,
+        frame=None,
+        tile_of=None,
+        camera_config=SimpleNamespace(
+            object_detection=SimpleNamespace(
+                min_confidence=(
+                    frame_to_scan.camera_config.object_detection.min_confidence
+                )
+            )
+        ),
+    )
+
+
+class SharedTensorSlots:
+    """Shared memory slots that preprocessed frames are copied into.
+
+    One slot holds all preprocessed frames of a batch. A slot is reused when the
+    worker process has returned the results of the batch. Slots grow when a batch
+    does not fit, in which case a new shared memory block with a new name replaces
+    the old one.
+    """
+
+    def __init__(self, slots: int):
+        self._blocks: List[Optional[shared_memory.SharedMemory]] = [None] * slots
+        self._free: Queue = Queue()
+        for index in range(slots):
+            self._free.put(index)
+
+    def write(self, tensors: List[Any]) -> Tuple[int, str, List[Tuple]]:
+        """Copy tensors to a free slot.
+
+        Returns the slot index, name of the shared memory block and the layout of each
+        tensor within the block.
+        """
+        arrays = []
+        for tensor in tensors:
+            if isinstance(tensor, cv2.UMat):
+                tensor = tensor.get()
+            if isinstance(tensor, bytes):
+                arrays.append((np.frombuffer(tensor, dtype=np.uint8), True))
+                continue
+            arrays.append((np.ascontiguousarray(tensor), False))
+        size = sum(array.nbytes for array, _ in arrays)
+
+        index = self._free.get()
+        block = self._blocks[index]
+        if block is None or block.size < size:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            self._blocks[index] = block
+
+        layouts = []
+        offset = 0
+        for array, is_bytes in arrays:
+            tensor = np.ndarray(
+                array.shape, dtype=array.dtype, buffer=block.buf, offset=offset
+            )
+            tensor[...] = array
+            layouts.append((offset, array.shape, array.dtype.str, is_bytes))
+            offset += array.nbytes
+        return index, block.name, layouts
+
+    def release(self, index: int) -> None:
+        """Mark slot as free."""
+        self._free.put(index)
+
+    def close(self) -> None:
+        """Close and remove all shared memory blocks."""
+        for block in self._blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+
+def read_tensors(block: shared_memory.SharedMemory, layouts: List[Tuple]) -> List[Any]:
+    """Return views of the tensors stored in a shared memory block."""
+    tensors: List[Any] = []
+    for offset, shape, dtype, is_bytes in layouts:
+        tensor = np.ndarray(
+            shape, dtype=np.dtype(dtype), buffer=block.buf, offset=offset
+        )
+        tensors.append(tensor.tobytes() if is_bytes else tensor)
+    return tensors
+
+
+def setup_process_logging(log_queue, log_level: int) -> None:
+    """Send log records of the worker process to Viseron's process."""
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(log_level)
+
+
+def process_worker_main(
+    object_detection_config: Dict[str, Any],
+    input_queue,
+    result_connection,
+    log_queue,
+    log_level: int,
+):
+    """Load the object detector and perform detection on batches from input_queue."""
+    setup_process_logging(log_queue, log_level)
+    # pylint: disable=import-outside-toplevel
+    from viseron.detector import import_object_detection
+
+    config_module, detector_module = import_object_detection(object_detection_config)
+    object_detector = detector_module.ObjectDetection(
+        config_module.Config(object_detection_config)
+    )
+    blocks: Dict[int, shared_memory.SharedMemory] = {}
+    while True:
+        batch_id, slot, block_name, layouts, batch = input_queue.get()
+        if slot not in blocks or blocks[slot].name != block_name:
+            if slot in blocks:
+                blocks[slot].close()
+            blocks[slot] = shared_memory.SharedMemory(name=block_name)
+
+        tensors = read_tensors(blocks[slot], layouts)
+        batch = [
+            replace(frame_to_scan, frame=WorkerFrame(tensor))
+            for frame_to_scan, tensor in zip(batch, tensors)
+        ]
+        try:
+            results = run_detection(object_detector, batch)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Error in object detection process worker")
+            results = [[] for _ in batch]
+        # Views into shared memory must be released before the block can be closed
+        del batch, tensors
+        result_connection.send((batch_id, results))
+
+
+class ProcessDetectorWorker(DetectorWorker):
+    """Run object detection in a separate process.
+
+    Suitable for backends that hold the GIL during inference. Frames are preprocessed
+    in Viseron's process and the preprocessed frames are handed over to the worker
+    through shared memory. Detected objects are returned over a pipe, and log records
+    over a queue.
+
+    The results thread restarts the worker process if it dies, and releases the
+    batches that were sent to it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        publish_callback: Callable,
+        object_detection_config: Dict[str, Any],
+    ):
+        super().__init__(name, publish_callback)
+        self._object_detection_config = object_detection_config
+        self._context = mp.get_context("spawn")
+        self._input_queue = None
+        self._result_reader = None
+        self._log_queue = None
+        # Queued batches, one being processed and one waiting to be published
+        self._slots = SharedTensorSlots(WORKER_QUEUE_SIZE + 2)
+        self._batch_ids = itertools.count()
+        self._in_flight: Dict[int, Tuple[int, List[FrameToScan]]] = {}
+        self._in_flight_lock = threading.Lock()
+        self._process = None
+        self._stopped = threading.Event()
+        self.start_process()
+
+        result_thread = RestartableThread(
+            name=f"object_detection.{name}.results",
+            target=self.results,
+            daemon=True,
+            register=True,
+        )
+        result_thread.start()
+        log_thread = RestartableThread(
+            name=f"object_detection.{name}.logs",
+            target=self.logs,
+            daemon=True,
+            register=True,
+        )
+        log_thread.start()
+
+    def start_process(self) -> None:
+        """Start worker process."""
+        # A process that died while using a queue or pipe may still hold its lock or
+        # have left a partial message, so they are created again for each process
+        self._input_queue = self._context.Queue(maxsize=WORKER_QUEUE_SIZE)
+        self._result_reader, result_writer = self._context.Pipe(duplex=False)
+        self._log_queue = self._context.Queue()
+        self._process = self._context.Process(
+            name=f"viseron.object_detection.{self.name}",
+            target=process_worker_main,
+            args=(
+                self._object_detection_config,
+                self._input_queue,
+                result_writer,
+                self._log_queue,
+                LOGGER.getEffectiveLevel(),
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        # Only the worker process holds the write end, so that EOF is seen if it dies
+        result_writer.close()
+
+    def stop(self) -> None:
+        """Stop the worker process."""
+        self._stopped.set()
+        self._process.terminate()  # type: ignore
+        self._process.join()  # type: ignore
+        self._slots.close()
+
+    def restart_process(self) -> None:
+        """Restart the dead worker process and release the batches sent to it."""
+        if self._stopped.is_set():
+            return
+        LOGGER.error(f"Object detection worker {self.name} died, restarting")
+        with self._in_flight_lock:
+            # Batches sent to the dead process will never be returned
+            with self._pending_lock:
+                self._pending -= len(self._in_flight)
+            for slot, _ in self._in_flight.values():
+                self._slots.release(slot)
+            self._in_flight.clear()
+            self._result_reader.close()  # type: ignore
+            self.start_process()
+
+    def put(self, batch: List[FrameToScan]) -> None:
+        """Send batch to the worker process."""
+        # Not holding the lock since this waits for the results thread to free a slot
+        slot, block_name, layouts = self._slots.write(
+            [
+                frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name)
+                for frame_to_scan in batch
+            ]
+        )
+        batch_id = next(self._batch_ids)
+        with self._in_flight_lock:
+            self._in_flight[batch_id] = (slot, batch)
+            input_queue = self._input_queue
+        item = (
+            batch_id,
+            slot,
+            block_name,
+            layouts,
+            [to_worker_frame_to_scan(frame_to_scan) for frame_to_scan in batch],
+        )
+        while True:
+            try:
+                input_queue.put(item, timeout=1)  # type: ignore
+                return
+            except Full:
+                with self._in_flight_lock:
+                    # Released by the results thread since the process died
+                    if batch_id not in self._in_flight:
+                        return
+
+    def results(self) -> None:
+        """Publish results returned from the worker process."""
+        while True:
+            if not self._result_reader.poll(1):  # type: ignore
+                if not self._process.is_alive():  # type: ignore
+                    self.restart_process()
+                continue
+            try:
+                batch_id, results = self._result_reader.recv()  # type: ignore
+            except EOFError:
+                self._process.join()  # type: ignore
+                self.restart_process()
+                continue
+            with self._in_flight_lock:
+                in_flight = self._in_flight.pop(batch_id, None)
+            if in_flight is None:
+                continue
+            slot, batch = in_flight
+            self._slots.release(slot)
+            self.done(batch, results)
+
+    def logs(self) -> None:
+        """Log records sent from the worker process using Viseron's loggers."""
+        while True:
+            try:
+                record = self._log_queue.get(timeout=1)  # type: ignore
+            except Empty:
+                continue
+            logging.getLogger(record.name).handle(record)
@@ -106,6 +106,23 @@ class DetectorImportError(ViseronError):
         )
 
 
+class DetectorProcessWorkerError(ViseronError):
+    """Raised when a detector does not support process workers."""
+
+    def __init__(self, detector: str, reason: str = None) -> None:
+        """Initialize error."""
+        super().__init__(self)
+        self.detector = detector
+        self.reason = reason
+
+    def __str__(self) -> str:
+        """Return string representation."""
+        return (
+            f"Object detector {self.detector} does not support process workers. "
+            f"{self.reason or 'ObjectDetection.preprocessor has to be implemented'}"
+        )
+
+
 class DetectorConfigError(ViseronError):
     """Raised when a detectors config cannot be imported properly."""
 
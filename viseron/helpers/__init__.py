@@ -56,6 +56,41 @@ def calculate_absolute_coords(
     )
 
 
+def calculate_crop_region(
+    bounding_box: Tuple[float, float, float, float],
+    padding: float,
+    frame_res: Tuple[int, int],
+    aspect_ratio: float,
+) -> Tuple[float, float, float, float]:
+    """Return relative region to crop from a frame to cover bounding_box.
+
+    The box is padded on each side and expanded to aspect_ratio (width / height),
+    then moved inside the frame. The region is clipped to the frame if it does not
+    fit.
+    """
+    x1 = (bounding_box[0] - padding) * frame_res[0]
+    y1 = (bounding_box[1] - padding) * frame_res[1]
+    x2 = (bounding_box[2] + padding) * frame_res[0]
+    y2 = (bounding_box[3] + padding) * frame_res[1]
+    width = max(x2 - x1, 1)
+    height = max(y2 - y1, 1)
+    if width / height < aspect_ratio:
+        width = height * aspect_ratio
+    else:
+        height = width / aspect_ratio
+    width = min(width, frame_res[0])
+    height = min(height, frame_res[1])
+
+    x1 = min(max((x1 + x2 - width) / 2, 0), frame_res[0] - width)
+    y1 = min(max((y1 + y2 - height) / 2, 0), frame_res[1] - height)
+    return (
+        x1 / frame_res[0],
+        y1 / frame_res[1],
+        (x1 + width) / frame_res[0],
+        (y1 + height) / frame_res[1],
+    )
+
+
 def scale_bounding_box(
     image_size: Tuple[int, int, int, int],
     bounding_box: Tuple[int, int, int, int],
@@ -222,15 +257,21 @@ def draw_contours(frame, contours, resolution, threshold) -> None:
     cv2.drawContours(frame, filtered_contours, -1, (130, 0, 75), thickness=1)
 
 
-def draw_mask(text, frame, mask_points, color=(255, 255, 255)) -> None:
-    """Draw mask on supplied frame."""
+def draw_mask(text, frame, mask_points, color=(255, 255, 255), fill=None) -> None:
+    """Draw mask on supplied frame.
+
+    fill is an optional precomputed bitmap of the pixels within the mask.
+    """
     mask_overlay = frame.copy()
     # Draw polygon filled with black color
-    cv2.fillPoly(
-        mask_overlay,
-        pts=mask_points,
-        color=(0),
-    )
+    if fill is not None:
+        mask_overlay[fill] = 0
+    else:
+        cv2.fillPoly(
+            mask_overlay,
+            pts=mask_points,
+            color=(0),
+        )
     # Apply overlay on frame with 70% opacity
     cv2.addWeighted(
         mask_overlay,
@@ -268,9 +309,9 @@ def draw_motion_mask(frame, mask_points) -> None:
     draw_mask("Motion mask", frame, mask_points, color=(0, 140, 255))
 
 
-def draw_object_mask(frame, mask_points) -> None:
+def draw_object_mask(frame, mask_points, fill=None) -> None:
     """Draw object mask."""
-    draw_mask("Object mask", frame, mask_points, color=(255, 255, 255))
+    draw_mask("Object mask", frame, mask_points, color=(255, 255, 255), fill=fill)
 
 
 def pop_if_full(queue: Queue, item: Any, logger=LOGGER, name="unknown", warn=False):
@@ -408,3 +449,42 @@ def object_in_polygon(resolution, obj: DetectedObject, coordinates):
     )
     middle = ((x2 - x1) / 2) + x1
     return cv2.pointPolygonTest(coordinates, (middle, y2), False) >= 0
+
+
+def calculate_anchor_points(
+    resolution: Tuple[int, int], rel_boxes: np.ndarray
+) -> np.ndarray:
+    """Return the points object_in_polygon tests for an array of relative boxes.
+
+    The point is the bottom center of each box, in absolute coordinates.
+    """
+    absolute = np.floor(rel_boxes * np.array(resolution * 2, dtype=np.float64))
+    return np.stack(
+        [(absolute[:, 2] - absolute[:, 0]) / 2 + absolute[:, 0], absolute[:, 3]],
+        axis=1,
+    )
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Return which points are inside or on the border of polygon.
+
+    Gives the same result as cv2.pointPolygonTest(polygon, point, False) >= 0 for
+    each point, but tests all points at once.
+    """
+    x = points[:, 0]
+    y = points[:, 1]
+    crossings = np.zeros(len(points), dtype=np.int64)
+    on_border = np.zeros(len(points), dtype=bool)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    for (x0, y0), (x1, y1) in zip(np.roll(polygon, 1, axis=0), polygon):
+        skip = ((y0 <= y) & (y1 <= y)) | ((y0 > y) & (y1 > y)) | ((x0 < x) & (x1 < x))
+        on_horizontal_edge = (y == y0) & (
+            ((x0 <= x) & (x <= x1)) | ((x1 <= x) & (x <= x0))
+        )
+        on_border |= skip & (y == y1) & ((x == x1) | on_horizontal_edge)
+        dist = (y - y0) * (x1 - x0) - (x - x0) * (y1 - y0)
+        if y1 < y0:
+            dist = -dist
+        on_border |= ~skip & (dist == 0)
+        crossings += ~skip & (dist > 0)
+    return on_border | (crossings % 2 == 1)
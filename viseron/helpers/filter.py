@@ -1,7 +1,115 @@
 """Used to filter out unwanted objects."""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
 from viseron.config.config_object_detection import LabelConfig
-from viseron.detector.detected_object import DetectedObject
-from viseron.helpers import object_in_polygon
+from viseron.detector.detected_object import DetectedObject, DetectionBatch
+from viseron.helpers import (
+    calculate_anchor_points,
+    object_in_polygon,
+    points_in_polygon,
+)
+from viseron.helpers.raster import PolygonRaster
+
+
+class ObjectBatch:
+    """All detected objects of a frame as arrays.
+
+    Used to evaluate the filters of every label, the object detection mask and the
+    zones once for all objects, instead of object by object. The objects position
+    within the mask and each zone is calculated once and shared between all filters.
+    Polygons found in polygon_raster are looked up in its bitmap. The arrays of a
+    DetectionBatch are used as is.
+    """
+
+    def __init__(
+        self,
+        objects: List[DetectedObject],
+        camera_resolution,
+        masks,
+        polygon_raster: Optional[PolygonRaster] = None,
+    ):
+        self.objects = objects
+        self._polygon_raster = polygon_raster
+        if isinstance(objects, DetectionBatch):
+            self.labels = objects.label_names
+            self.confidence = objects.detections["confidence"]
+            self.rel_width = objects.detections["rel_width"]
+            self.rel_height = objects.detections["rel_height"]
+            boxes = objects.boxes
+        else:
+            self.labels = np.array([obj.label for obj in objects], dtype=object)
+            self.confidence = np.array(
+                [obj.confidence for obj in objects], dtype=np.float64
+            )
+            self.rel_width = np.array(
+                [obj.rel_width for obj in objects], dtype=np.float64
+            )
+            self.rel_height = np.array(
+                [obj.rel_height for obj in objects], dtype=np.float64
+            )
+            boxes = np.array(
+                [[obj.rel_x1, obj.rel_y1, obj.rel_x2, obj.rel_y2] for obj in objects],
+                dtype=np.float64,
+            ).reshape(-1, 4)
+        self._anchor_points = calculate_anchor_points(camera_resolution, boxes)
+        self._in_polygon: Dict[int, np.ndarray] = {}
+        self.in_mask = np.zeros(len(objects), dtype=bool)
+        for mask in masks:
+            self.in_mask |= self.in_polygon(mask)
+
+    def __len__(self):
+        """Return number of objects."""
+        return len(self.objects)
+
+    def select(self, selected: np.ndarray) -> List[DetectedObject]:
+        """Return the objects where selected is True.
+
+        Objects of a DetectionBatch are only created for the selected detections.
+        """
+        return [self.objects[index] for index in np.flatnonzero(selected).tolist()]
+
+    def set_filter_hits(self, filter_hit: np.ndarray) -> None:
+        """Set filter_hit of the objects that were discarded by a filter."""
+        if isinstance(self.objects, DetectionBatch):
+            self.objects.set_filter_hits(filter_hit)
+            return
+        for obj, obj_filter_hit in zip(self.objects, filter_hit):
+            if obj_filter_hit is not None:
+                obj.filter_hit = obj_filter_hit
+
+    def in_polygon(self, polygon) -> np.ndarray:
+        """Return which objects are within polygon, like object_in_polygon."""
+        in_polygon = self._in_polygon.get(id(polygon))
+        if in_polygon is None:
+            if self._polygon_raster and polygon in self._polygon_raster:
+                in_polygon = self._polygon_raster.lookup(self._anchor_points, polygon)
+            else:
+                in_polygon = points_in_polygon(self._anchor_points, polygon)
+            self._in_polygon[id(polygon)] = in_polygon
+        return in_polygon
+
+
+def filter_objects(
+    object_filters: Dict[str, "Filter"], batch: ObjectBatch
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate the filter of each objects label for all objects in batch.
+
+    Returns which objects passed their filter, and the filter_hit of each object
+    that did not. Objects without a filter for their label do not pass, and have no
+    filter_hit.
+    """
+    passed = np.zeros(len(batch), dtype=bool)
+    filter_hit = np.full(len(batch), None, dtype=object)
+    for label, object_filter in object_filters.items():
+        is_label = batch.labels == label
+        if not is_label.any():
+            continue
+        label_passed, label_filter_hit = object_filter.filter_batch(batch)
+        passed |= is_label & label_passed
+        filter_hit[is_label] = label_filter_hit[is_label]
+    return passed, filter_hit
 
 
 class Filter:
@@ -49,6 +157,29 @@ class Filter:
                 return False
         return True
 
+    def filter_batch(self, batch: ObjectBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluate all filters for all objects in batch.
+
+        Returns which objects passed, and the filter_hit of each object, which is
+        the first filter the object did not pass, in the same order as
+        filter_object.
+        """
+        confidence = batch.confidence > self._confidence
+        width = (self._width_max > batch.rel_width) & (
+            batch.rel_width > self._width_min
+        )
+        height = (self._height_max > batch.rel_height) & (
+            batch.rel_height > self._height_min
+        )
+        mask = ~batch.in_mask
+
+        filter_hit = np.full(len(batch), None, dtype=object)
+        filter_hit[~mask] = "mask"
+        filter_hit[~height] = "height"
+        filter_hit[~width] = "width"
+        filter_hit[~confidence] = "confidence"
+        return confidence & width & height & mask, filter_hit
+
     def filter_object(self, obj: DetectedObject) -> bool:
         """Return if filters are met."""
         return (
@@ -0,0 +1,106 @@
+"""Rasterized zones and masks, used to look up which polygons a point is within."""
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from viseron.helpers import points_in_polygon
+
+# Thickness of the band around the edges of a polygon which is tested exactly
+EDGE_BAND_THICKNESS = 5
+
+
+class PolygonRaster:
+    """Bitmap of which polygons each point of a frame is within.
+
+    Objects are located by the bottom center of their bounding box, which lies on
+    whole pixels vertically and on half pixels horizontally. Each polygon is
+    rasterized once on that grid, so a lookup gives the same result as
+    cv2.pointPolygonTest.
+
+    Each polygon is a bit in a plane of uint8, so eight polygons share the same
+    bitmap. Points outside of the frame are tested against the polygon directly.
+    """
+
+    def __init__(self, resolution: Tuple[int, int], polygons: List[np.ndarray]):
+        self._width, self._height = resolution
+        # Polygons are looked up by id, so they must be kept alive
+        self._polygons = polygons
+        self._overlays: Dict[Tuple[int, ...], np.ndarray] = {}
+        self._indices = {id(polygon): index for index, polygon in enumerate(polygons)}
+        self._planes = np.zeros(
+            (-(-len(polygons) // 8), self._height + 1, self._width * 2 + 1),
+            dtype=np.uint8,
+        )
+        for index, polygon in enumerate(polygons):
+            self._rasterize(index, polygon)
+
+    def _rasterize(self, index: int, polygon: np.ndarray) -> None:
+        """Set the bit of polygon for all points within it.
+
+        The polygon is filled using cv2.fillPoly, which differs from
+        cv2.pointPolygonTest only close to the edges. Points within a band around
+        the edges are therefore tested exactly using points_in_polygon.
+        """
+        polygon = np.asarray(polygon).reshape(-1, 2)
+        # Columns are half pixels
+        scaled_polygon = (polygon * [2, 1]).astype(np.int32)
+        inside = np.zeros(self._planes.shape[1:], dtype=np.uint8)
+        cv2.fillPoly(inside, [scaled_polygon], 1)
+        band = np.zeros_like(inside)
+        cv2.polylines(band, [scaled_polygon], True, 1, thickness=EDGE_BAND_THICKNESS)
+        rows, columns = np.nonzero(band)
+        inside[rows, columns] = points_in_polygon(
+            np.stack([columns / 2, rows], axis=1).astype(np.float64), polygon
+        )
+        self._planes[index // 8] |= inside.astype(bool) * np.uint8(1 << index % 8)
+
+    def __contains__(self, polygon) -> bool:
+        """Return if polygon is rasterized."""
+        return id(polygon) in self._indices
+
+    def lookup(self, points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+        """Return which points are within polygon."""
+        index = self._indices[id(polygon)]
+        columns = points[:, 0] * 2
+        rows = points[:, 1]
+        on_grid = (
+            (columns >= 0)
+            & (columns <= self._width * 2)
+            & (rows >= 0)
+            & (rows <= self._height)
+            & (columns == np.floor(columns))
+            & (rows == np.floor(rows))
+        )
+        inside = np.zeros(len(points), dtype=bool)
+        inside[on_grid] = (
+            self._planes[
+                index // 8,
+                rows[on_grid].astype(np.intp),
+                columns[on_grid].astype(np.intp),
+            ]
+            & (1 << index % 8)
+        ).astype(bool)
+        if not on_grid.all():
+            inside[~on_grid] = points_in_polygon(points[~on_grid], polygon)
+        return inside
+
+    def overlay(self, polygons: List[np.ndarray]) -> np.ndarray:
+        """Return a (height, width) bitmap of the pixels within any of polygons.
+
+        Used to draw overlays without filling the polygons on every frame.
+        """
+        key = tuple(id(polygon) for polygon in polygons)
+        overlay = self._overlays.get(key)
+        if overlay is not None:
+            return overlay
+
+        overlay = np.zeros((self._height, self._width), dtype=bool)
+        for polygon in polygons:
+            index = self._indices[id(polygon)]
+            overlay |= (
+                self._planes[index // 8, : self._height, : self._width * 2 : 2]
+                & (1 << index % 8)
+            ).astype(bool)
+        self._overlays[key] = overlay
+        return overlay
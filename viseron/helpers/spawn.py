@@ -0,0 +1,84 @@
+"""Start subprocesses without duplicating Viseron's process.
+
+sp.Popen forks the whole process before executing the command. Forking while an
+object detector is running inference using CUDA causes the inference to hang, which
+used to be avoided by holding a global lock during both inference and sp.Popen.
+
+CPython uses posix_spawn instead of fork when the executable is given as a path and
+close_fds is False. On Linux posix_spawn uses vfork semantics, where the child does
+not get a copy of the parents memory or CUDA context, so no lock is needed.
+File descriptors created by Python are non-inheritable by default, so close_fds=False
+does not leak them to the subprocess.
+
+sp.Popen's pass_fds disables posix_spawn, so file descriptors that should be passed
+to the subprocess are instead made inheritable for the duration of the spawn. This is
+done under a lock which every spawn takes, so no other subprocess inherits them.
+"""
+import os
+import shutil
+import subprocess as sp
+import threading
+from typing import Dict, Iterable, List
+
+_SPAWN_LOCK = threading.Lock()
+_WHICH_CACHE: Dict[str, str] = {}
+
+
+def which(executable: str) -> str:
+    """Return full path to executable, or the executable itself if not found.
+
+    Only found executables are cached, so an executable that is installed later is
+    still found.
+    """
+    if "/" in executable:
+        return executable
+    if path := _WHICH_CACHE.get(executable):
+        return path
+    if path := shutil.which(executable):
+        _WHICH_CACHE[executable] = path
+        return path
+    return executable
+
+
+def resolve_command(command: List[str]) -> List[str]:
+    """Return command with the executable resolved to a full path."""
+    return [which(command[0])] + list(command[1:])
+
+
+def popen(command: List[str], inherit_fds: Iterable[int] = (), **kwargs) -> sp.Popen:
+    """Start a subprocess using posix_spawn. Arguments are the same as sp.Popen.
+
+    inherit_fds are file descriptors that are passed to the subprocess with the same
+    numbers.
+    """
+    kwargs.setdefault("close_fds", False)
+    with _SPAWN_LOCK:
+        for fd in inherit_fds:
+            os.set_inheritable(fd, True)
+        try:
+            return sp.Popen(resolve_command(command), **kwargs)  # type: ignore
+        finally:
+            for fd in inherit_fds:
+                os.set_inheritable(fd, False)
+
+
+def run(
+    command: List[str], input=None, timeout=None, check=False, **kwargs
+) -> sp.CompletedProcess:
+    """Run a subprocess using posix_spawn. Arguments are the same as sp.run."""
+    # pylint: disable=redefined-builtin
+    if input is not None:
+        kwargs["stdin"] = sp.PIPE
+    with popen(command, **kwargs) as process:
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except sp.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        retcode = process.poll()
+        if check and retcode:
+            raise sp.CalledProcessError(
+                retcode, process.args, output=stdout, stderr=stderr
+            )
+    return sp.CompletedProcess(process.args, retcode, stdout, stderr)
@@ -5,7 +5,7 @@ import importlib
 import logging
 from abc import ABC, abstractmethod
 from queue import Queue
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -58,6 +58,25 @@ class Contours:
         """Return the size of the biggest contour."""
         return self._max_area
 
+    def rel_bounding_box(
+        self, min_area: float = 0.0
+    ) -> Optional[Tuple[float, float, float, float]]:
+        """Return relative box around all contours larger than min_area.
+
+        Returns None if there are no such contours.
+        """
+        points = [
+            rel_contour.reshape(-1, 2)
+            for rel_contour, area in zip(self._rel_contours, self._contour_areas)
+            if area >= min_area
+        ]
+        if not points:
+            return None
+        points = np.concatenate(points)
+        x1, y1 = points.min(axis=0)
+        x2, y2 = points.max(axis=0)
+        return float(x1), float(y1), float(x2), float(y2)
+
 
 class AbstractMotionDetection(ABC):
     """Abstract Motion Detection."""
@@ -108,14 +127,14 @@ class MotionDetection:
                     np.multiply(rel_mask, self._resolution).astype("int32")
                 )
 
-            mask = np.zeros(
-                (config.motion_detection.width, config.motion_detection.height, 3),
+            # Masked areas are 0 and the rest 255, so the mask can be applied to
+            # the grayscale frame using bitwise_and
+            self._mask = np.full(
+                (config.motion_detection.height, config.motion_detection.width),
+                255,
                 np.uint8,
             )
-            mask[:] = 255
-
-            cv2.fillPoly(mask, pts=scaled_mask, color=(0, 0, 0))
-            self._mask = np.where(mask[:, :, 0] == [0])
+            cv2.fillPoly(self._mask, pts=scaled_mask, color=0)
 
         self._topic_scan_motion = f"{config.camera.name_slug}/{TOPIC_FRAME_SCAN_MOTION}"
         self.topic_processed_motion = (
@@ -137,6 +156,9 @@ class MotionDetection:
         )
         motion_detection_thread.start()
 
+        camera.stream.add_scaled_output(
+            config.motion_detection.width, config.motion_detection.height
+        )
         FrameDecoder(
             self._logger,
             self._config,
@@ -147,6 +169,15 @@ class MotionDetection:
             TOPIC_FRAME_DECODE_MOTION,
             TOPIC_FRAME_SCAN_MOTION,
             preprocess_callback=self._motion_detector.preprocess,
+            topic_processed=TOPIC_FRAME_PROCESSED_MOTION,
+            adaptive_interval=(
+                (
+                    config.motion_detection.min_interval,
+                    config.motion_detection.max_interval,
+                )
+                if config.motion_detection.adaptive_interval
+                else None
+            ),
         )
 
         DataStream.subscribe_data(self._topic_scan_motion, self._motion_detection_queue)
@@ -22,27 +22,21 @@ class MotionDetection(AbstractMotionDetection):
         )
 
     def preprocess(self, frame_to_scan: FrameToScan):
-        """Resize the frame to the desired width and height."""
-        frame_to_scan.frame.resize(
-            frame_to_scan.decoder_name,
-            self._config.width,
-            self._config.height,
-        )
+        """Resize the luma plane of the frame to the desired width and height."""
         frame_to_scan.frame.save_preprocessed_frame(
             frame_to_scan.decoder_name,
-            frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name),
+            frame_to_scan.frame.resize_luma(self._config.width, self._config.height),
         )
 
     def detect(self, frame_to_scan: FrameToScan) -> Contours:
         """Perform motion detection and return Contours."""
-        gray = cv2.cvtColor(
+        gray = cv2.GaussianBlur(
             frame_to_scan.frame.get_preprocessed_frame(frame_to_scan.decoder_name),
-            cv2.COLOR_RGB2GRAY,
+            (21, 21),
+            0,
         )
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        gray = gray.get()
-        if self._mask:
-            gray[self._mask] = [0]
+        if self._mask is not None:
+            cv2.bitwise_and(gray, self._mask, dst=gray)
 
         # if the average frame is None, initialize it
         if self._avg is None:
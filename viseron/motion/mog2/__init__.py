@@ -25,15 +25,10 @@ class MotionDetection(AbstractMotionDetection):
         )
 
     def preprocess(self, frame_to_scan: FrameToScan):
-        """Resize the frame to the desired width and height."""
-        frame_to_scan.frame.resize(
-            frame_to_scan.decoder_name,
-            self._config.width,
-            self._config.height,
-        )
+        """Resize the luma plane of the frame to the desired width and height."""
         frame_to_scan.frame.save_preprocessed_frame(
             frame_to_scan.decoder_name,
-            frame_to_scan.frame.get_resized_frame(frame_to_scan.decoder_name),
+            frame_to_scan.frame.resize_luma(self._config.width, self._config.height),
         )
 
     def detect(self, frame_to_scan: FrameToScan) -> Contours:
@@ -45,11 +40,10 @@ class MotionDetection(AbstractMotionDetection):
         fgmask = cv2.erode(fgmask, None, iterations=1)
         fgmask = cv2.dilate(fgmask, None, iterations=4)
 
-        frame = fgmask.get()
-        if self._mask:
-            frame[self._mask] = [0]
+        if self._mask is not None:
+            cv2.bitwise_and(fgmask, self._mask, dst=fgmask)
 
         return Contours(
-            cv2.findContours(frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0],
+            cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0],
             self._resolution,
         )
@@ -18,7 +18,9 @@ from viseron.const import (
     TOPIC_FRAME_SCAN_POSTPROC,
 )
 from viseron.data_stream import DataStream
-from viseron.helpers.filter import Filter
+from viseron.detector.tracker import ObjectTracker
+from viseron.helpers.filter import Filter, ObjectBatch, filter_objects
+from viseron.helpers.raster import PolygonRaster
 from viseron.motion import MotionDetection
 from viseron.mqtt.binary_sensor import MQTTBinarySensor
 from viseron.mqtt.camera import MQTTCamera
@@ -30,6 +32,7 @@ from viseron.watchdog.thread_watchdog import RestartableThread
 from viseron.zones import Zone
 
 if TYPE_CHECKING:
+    from viseron.camera.frame_decoder import FrameToScan
     from viseron.detector.detected_object import DetectedObject
 
 LOGGER = logging.getLogger(__name__)
@@ -64,7 +67,9 @@ class MQTTInterface:
                 f"{config.camera.name_slug}/status", self.status_state_callback
             )
 
-    def publish_image(self, object_frame, motion_frame, zones, resolution):
+    def publish_image(
+        self, object_frame, motion_frame, zones, resolution, polygon_raster=None
+    ):
         """Publish image to MQTT."""
         if viseron.mqtt.MQTT.client:
             # Draw on the object frame if it is supplied
@@ -79,6 +84,9 @@ class MQTTInterface:
                 helpers.draw_object_mask(
                     frame.decoded_frame_mat_rgb,
                     self.config.object_detection.mask,
+                    fill=polygon_raster.overlay(self.config.object_detection.mask)
+                    if polygon_raster
+                    else None,
                 )
 
             if motion_frame and frame.motion_contours:
@@ -157,6 +165,12 @@ class FFMPEGNVR:
             self._object_filters[object_filter.label] = Filter(
                 config, self.camera.resolution, object_filter
             )
+        self._object_tracker = None
+        if config.object_detection.tracker:
+            self._object_tracker = ObjectTracker(
+                config.object_detection.tracker_iou_threshold,
+                config.object_detection.tracker_max_misses,
+            )
 
         self.zones: List[Zone] = []
         for zone in config.camera.zones:
@@ -167,6 +181,11 @@ class FFMPEGNVR:
                     config,
                 )
             )
+        self._polygon_raster = PolygonRaster(
+            self.camera.resolution,
+            list(config.object_detection.mask)
+            + [zone.coordinates for zone in self.zones],
+        )
 
         self._motion_frames = 0
         self._motion_detected = False
@@ -374,40 +393,50 @@ class FFMPEGNVR:
 
             self.recorder.stop_recording()
 
-    def get_processed_object_frame(self) -> Union[None, Frame]:
-        """Return a frame along with detections from the object detector."""
+    def get_processed_object(self) -> Union[None, FrameToScan]:
+        """Return a scanned frame along with detections from the object detector."""
         try:
-            return self._object_return_queue.get_nowait().frame
+            return self._object_return_queue.get_nowait()
         except Empty:
             return None
 
-    def filter_fov(self, frame):
+    def filter_fov(self, frame, batch: ObjectBatch = None):
         """Filter field of view."""
+        if batch is None:
+            batch = self.object_batch(frame)
         objects_in_fov = []
         labels_in_fov = []
-        for obj in frame.objects:
-            if self._object_filters.get(obj.label) and self._object_filters[
-                obj.label
-            ].filter_object(obj):
-                obj.relevant = True
-                objects_in_fov.append(obj)
-                labels_in_fov.append(obj.label)
-
-                if self._object_filters[obj.label].trigger_recorder:
-                    obj.trigger_recorder = True
-
-                if self._object_filters[obj.label].post_processor:
-                    DataStream.publish_data(
-                        (
-                            f"{self._post_processor_topic}/"
-                            f"{self._object_filters[obj.label].post_processor}"
-                        ),
-                        PostProcessorFrame(self.config, frame, obj),
-                    )
+        passed, filter_hit = filter_objects(self._object_filters, batch)
+        batch.set_filter_hits(filter_hit)
+        for obj in batch.select(passed):
+            obj.relevant = True
+            objects_in_fov.append(obj)
+            labels_in_fov.append(obj.label)
+
+            if self._object_filters[obj.label].trigger_recorder:
+                obj.trigger_recorder = True
+
+            if self._object_filters[obj.label].post_processor:
+                DataStream.publish_data(
+                    (
+                        f"{self._post_processor_topic}/"
+                        f"{self._object_filters[obj.label].post_processor}"
+                    ),
+                    PostProcessorFrame(self.config, frame, obj),
+                )
 
         self.objects_in_fov = objects_in_fov
         self.labels_in_fov = labels_in_fov
 
+    def object_batch(self, frame) -> ObjectBatch:
+        """Return the objects of frame as arrays, to filter them all at once."""
+        return ObjectBatch(
+            frame.objects,
+            self.camera.resolution,
+            self.config.object_detection.mask,
+            self._polygon_raster,
+        )
+
     @property
     def objects_in_fov(self):
         """Return all objects in field of view."""
@@ -439,10 +468,12 @@ class FFMPEGNVR:
             self._mqtt.devices,
         )
 
-    def filter_zones(self, frame):
+    def filter_zones(self, frame, batch: ObjectBatch = None):
         """Filter all zones."""
+        if batch is None:
+            batch = self.object_batch(frame)
         for zone in self.zones:
-            zone.filter_zone(frame)
+            zone.filter_zone(frame, batch)
 
     def get_processed_motion_frame(self) -> Union[None, Frame]:
         """Return a frame along with motion contours from the motion detector."""
@@ -547,6 +578,17 @@ class FFMPEGNVR:
             self._logger.debug("Not recording, pausing object detector")
             self.camera.stream.decoders[self._object_decoder].scan.clear()
 
+    def update_idle_mode(self):
+        """Let the stream decode only keyframes while only motion detection runs."""
+        self.camera.stream.set_idle(
+            not self.recorder.is_recording
+            and not self.motion_detected
+            and not (
+                self.config.object_detection.enable
+                and self.camera.stream.decoders[self._object_decoder].scan.is_set()
+            )
+        )
+
     def update_status_sensor(self):
         """Update MQTT status sensor."""
         if not viseron.mqtt.MQTT.client:
@@ -566,6 +608,13 @@ class FFMPEGNVR:
         attributes = {}
         attributes["last_recording_start"] = self.recorder.last_recording_start
         attributes["last_recording_end"] = self.recorder.last_recording_end
+        for decoder_name, attribute in (
+            (self._object_decoder, "object_detection_interval"),
+            (self._motion_decoder, "motion_detection_interval"),
+        ):
+            decoder = self.camera.stream.decoders.get(decoder_name)
+            if decoder:
+                attributes[attribute] = round(decoder.interval, 2)
 
         if (
             status != self._mqtt.status_state
@@ -595,12 +644,20 @@ class FFMPEGNVR:
             self.camera.frame_ready.wait()
 
             # Filter returned objects
-            processed_object_frame = self.get_processed_object_frame()
+            processed_object = self.get_processed_object()
+            processed_object_frame = (
+                processed_object.frame if processed_object else None
+            )
             if processed_object_frame:
+                if self._object_tracker:
+                    processed_object_frame.objects = self._object_tracker.update(
+                        processed_object_frame.objects, processed_object.capture_time
+                    )
+                object_batch = self.object_batch(processed_object_frame)
                 # Filter objects in the FoV
-                self.filter_fov(processed_object_frame)
+                self.filter_fov(processed_object_frame, object_batch)
                 # Filter objects in each zone
-                self.filter_zones(processed_object_frame)
+                self.filter_zones(processed_object_frame, object_batch)
 
                 if self.config.object_detection.log_all_objects:
                     self._object_logger.debug(
@@ -620,6 +677,7 @@ class FFMPEGNVR:
 
             self.process_object_event()
             self.process_motion_event()
+            self.update_idle_mode()
 
             if (
                 processed_object_frame or processed_motion_frame
@@ -629,6 +687,7 @@ class FFMPEGNVR:
                     processed_motion_frame,
                     self.zones,
                     self.camera.resolution,
+                    self._polygon_raster,
                 )
 
             # If we are recording and no object is detected
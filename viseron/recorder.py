@@ -39,7 +39,7 @@ class FFMPEGRecorder:
         )
         self.create_directory(segments_folder)
         self._segmenter = Segments(self._logger, config, segments_folder)
-        self._segment_cleanup = SegmentCleanup(config)
+        self._segment_cleanup = SegmentCleanup(config, self._segmenter.index)
 
         self._mqtt_devices = {}
         if viseron.mqtt.MQTT.client and self.config.recorder.thumbnail.send_to_mqtt:
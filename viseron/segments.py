@@ -1,12 +1,202 @@
 """Concatenate FFmpeg segments to a single video file."""
+import bisect
+import csv
 import datetime
 import os
 import shutil
 import subprocess as sp
+import threading
 import time
+from typing import Dict, List, Optional, Set, Tuple
 
 from viseron.const import CAMERA_SEGMENT_DURATION
-from viseron.detector import Detector
+from viseron.helpers import spawn
+
+
+def segment_list_path(config) -> str:
+    """Return path to the segment list written by FFmpeg.
+
+    The list is stored outside the cameras segment folder so that it is not mistaken
+    for a segment.
+    """
+    return os.path.join(
+        config.recorder.segments_folder, f".{config.camera.name}_segments.csv"
+    )
+
+
+class SegmentIndex:
+    """Catalogue of segments sorted by start time.
+
+    Start times are kept in a sorted list so that lookups and range queries are done
+    using binary search. The index is shared between the recorder, which
+    concatenates segments, and the segment cleanup.
+
+    FFmpeg rewrites the segment list each time a segment is closed, keeping the last
+    CAMERA_SEGMENT_LIST_SIZE entries, so the duration and size of a segment is known
+    without running ffprobe. The list is read again whenever its inode, modification
+    time or size changes. Segments that are not in the list, eg segments written
+    before Viseron was restarted or the segment currently being written, are
+    indexed with an unknown duration until set_duration is called.
+    """
+
+    def __init__(self, logger, segments_folder, segment_list):
+        self._logger = logger
+        self._segments_folder = segments_folder
+        self._segment_list = segment_list
+        self._segment_list_stat: Optional[Tuple[int, int, int]] = None
+        self._segments: Dict[str, dict] = {}
+        self._start_times: List[float] = []
+        self._names: List[str] = []
+        self._invalid: Set[str] = set()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def start_time(segment) -> float:
+        """Return start time of segment, which is encoded in the file name."""
+        return datetime.datetime.strptime(
+            segment.split(".")[0], "%Y%m%d%H%M%S"
+        ).timestamp()
+
+    def _insert(self, segment, start_time) -> None:
+        """Insert segment in the sorted lists."""
+        index = bisect.bisect_right(self._start_times, start_time)
+        self._start_times.insert(index, start_time)
+        self._names.insert(index, segment)
+
+    def _remove(self, segment) -> None:
+        """Remove segment from the index."""
+        information = self._segments.pop(segment)
+        index = bisect.bisect_left(self._start_times, information["start_time"])
+        while self._names[index] != segment:
+            index += 1
+        del self._start_times[index]
+        del self._names[index]
+
+    def add(self, segment, duration=None) -> Optional[dict]:
+        """Add segment to the index, or update its duration if already indexed."""
+        if segment in self._invalid:
+            return None
+
+        with self._lock:
+            if information := self._segments.get(segment):
+                if duration is not None:
+                    self.set_duration(segment, duration)
+                return information
+
+            try:
+                start_time = self.start_time(segment)
+            except ValueError as error:
+                self._invalid.add(segment)
+                self._logger.error(
+                    f"Could not extract timestamp from segment {segment}: {error}"
+                )
+                return None
+
+            information = {
+                "start_time": start_time,
+                "end_time": None,
+                "duration": None,
+                "size": None,
+            }
+            self._segments[segment] = information
+            self._insert(segment, start_time)
+            if duration is not None:
+                self.set_duration(segment, duration)
+            return information
+
+    def set_duration(self, segment, duration) -> None:
+        """Set duration of an indexed segment."""
+        with self._lock:
+            information = self._segments[segment]
+            information["duration"] = duration
+            information["end_time"] = information["start_time"] + duration
+            try:
+                information["size"] = os.path.getsize(
+                    os.path.join(self._segments_folder, segment)
+                )
+            except OSError:
+                pass
+
+    def remove(self, segment) -> None:
+        """Remove segment from the index."""
+        with self._lock:
+            if segment in self._segments:
+                self._remove(segment)
+
+    def sync(self, segments) -> None:
+        """Make the index match the segments found on disk."""
+        with self._lock:
+            segments = set(segments)
+            for segment in set(self._segments) - segments:
+                self._remove(segment)
+            for segment in segments - set(self._segments):
+                self.add(segment)
+            self._invalid &= segments
+
+    def refresh(self) -> None:
+        """Read entries from the segment list if it has changed."""
+        try:
+            stat = os.stat(self._segment_list)
+            # A list replaced by a restarted FFmpeg is detected by its inode and
+            # modification time even if it has grown past the old size
+            segment_list_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if segment_list_stat == self._segment_list_stat:
+                return
+            with open(self._segment_list, "r", encoding="utf-8") as segment_list:
+                data = segment_list.read()
+        except FileNotFoundError:
+            return
+        self._segment_list_stat = segment_list_stat
+
+        # The last line is either empty or still being written
+        lines = data.split("\n")[:-1]
+        for row in csv.reader(lines):
+            if len(row) < 3:
+                continue
+            try:
+                duration = float(row[2]) - float(row[1])
+            except ValueError:
+                continue
+            segment = os.path.basename(row[0])
+            if os.path.exists(os.path.join(self._segments_folder, segment)):
+                self.add(segment, duration)
+
+    def get(self, segment) -> Optional[dict]:
+        """Return information for segment if it is indexed."""
+        return self._segments.get(segment)
+
+    def find_segment(self, timestamp) -> Optional[str]:
+        """Return the segment which includes timestamp."""
+        with self._lock:
+            index = bisect.bisect_right(self._start_times, timestamp) - 1
+            if index < 0:
+                return None
+            end_time = self._segments[self._names[index]]["end_time"]
+            if end_time is None or end_time < timestamp:
+                return None
+            return self._names[index]
+
+    def segments_between(self, start, end) -> List[str]:
+        """Return segments that might overlap start and end, sorted by start time.
+
+        The segment starting last before start is included since it can extend past
+        start. Its end time is unknown if its duration is not yet set.
+        """
+        with self._lock:
+            low = max(bisect.bisect_right(self._start_times, start) - 1, 0)
+            high = bisect.bisect_right(self._start_times, end)
+            return self._names[low:high]
+
+    def segments_before(self, timestamp) -> List[str]:
+        """Return segments that started before timestamp, sorted by start time."""
+        with self._lock:
+            return self._names[: bisect.bisect_left(self._start_times, timestamp)]
+
+    @property
+    def segments(self) -> List[str]:
+        """Return all segments sorted by start time."""
+        with self._lock:
+            return list(self._names)
 
 
 class Segments:
@@ -21,6 +211,12 @@ class Segments:
         self._logger = logger
         self._config = config
         self._segments_folder = segments_folder
+        self._index = SegmentIndex(logger, segments_folder, segment_list_path(config))
+
+    @property
+    def index(self) -> SegmentIndex:
+        """Return segment index."""
+        return self._index
 
     def segment_duration(self, segment_file):
         """Return the duration of a specified segment."""
@@ -38,10 +234,9 @@ class Segments:
 
         tries = 0
         while True:
-            with Detector.lock:
-                with sp.Popen(ffprobe_cmd, stdout=sp.PIPE, stderr=sp.PIPE) as pipe:
-                    (output, stderr) = pipe.communicate()
-                    p_status = pipe.wait()
+            with spawn.popen(ffprobe_cmd, stdout=sp.PIPE, stderr=sp.PIPE) as pipe:
+                (output, stderr) = pipe.communicate()
+                p_status = pipe.wait()
 
             if p_status == 0:
                 try:
@@ -66,54 +261,44 @@ class Segments:
         )
         return None
 
-    @staticmethod
-    def find_segment(segments, timestamp):
+    def find_segment(self, timestamp):
         """Find a segment which includes the given timestamp."""
-        return next(
-            (
-                key
-                for key, value in segments.items()
-                if value["start_time"] <= timestamp <= value["end_time"]
-            ),
-            None,
-        )
+        return self._index.find_segment(timestamp)
+
+    def get_segment_information(self, event_start=None, event_end=None):
+        """Get information for available segments between event_start and event_end.
+
+        Segments are looked up in the segment index. Only segments with an unknown
+        duration are probed using ffprobe.
+        """
+        self._index.sync(os.listdir(self._segments_folder))
+        self._index.refresh()
+        if event_start is None or event_end is None:
+            segments = self._index.segments
+        else:
+            segments = self._index.segments_between(event_start, event_end)
 
-    def get_segment_information(self):
-        """Get information for all available segments."""
-        segment_files = os.listdir(self._segments_folder)
         segment_information: dict = {}
-        for segment in segment_files:
-            duration = self.segment_duration(
-                os.path.join(self._segments_folder, segment)
-            )
-            if not duration:
+        for segment in segments:
+            if not (information := self._index.get(segment)):
                 continue
+            if information["duration"] is None:
+                duration = self.segment_duration(
+                    os.path.join(self._segments_folder, segment)
+                )
+                if not duration:
+                    continue
+                self._index.set_duration(segment, duration)
 
-            start_time = datetime.datetime.strptime(
-                segment.split(".")[0], "%Y%m%d%H%M%S"
-            ).timestamp()
-
-            information = {"start_time": start_time, "end_time": start_time + duration}
+            if event_start is not None and information["end_time"] < event_start:
+                continue
             segment_information[segment] = information
         self._logger.debug(f"Segment information: {segment_information}")
         return segment_information
 
-    def get_concat_segments(self, segments, start_segment, end_segment):
-        """Return all segments between start_segment and end_segment."""
-        segment_list = list(segments.keys())
-        segment_list.sort()
-        try:
-            return segment_list[
-                len(segment_list)
-                - segment_list[::-1].index(start_segment)
-                - 1 : segment_list.index(end_segment)
-                + 1
-            ]
-        except ValueError:
-            pass
-
-        self._logger.error("Matching segments could not be found")
-        return None
+    def get_concat_segments(self, event_start, event_end):
+        """Return all segments between event_start and event_end."""
+        return list(self.get_segment_information(event_start, event_end).keys())
 
     def generate_segment_script(
         self, segments_to_concat, segment_information, event_start, event_end
@@ -179,43 +364,36 @@ class Segments:
         self._logger.debug(f"Concatenation command: {ffmpeg_cmd}")
         self._logger.debug(f"Segment script: \n{segment_script}")
 
-        with Detector.lock:
-            pipe = sp.run(
-                ffmpeg_cmd, input=segment_script, encoding="ascii", check=True
-            )
-        if pipe.returncode != 0:
-            self._logger.error(f"Error concatenating segments: {pipe.stderr}")
+        spawn.run(
+            ffmpeg_cmd,
+            input=segment_script,
+            encoding="ascii",
+            stderr=sp.PIPE,
+            check=True,
+        )
 
     def concat_segments(self, event_start, event_end, file_name):
         """Concatenate segments between event_start and event_end."""
         self._logger.debug("Concatenating segments")
-        segment_information = self.get_segment_information()
+        segment_information = self.get_segment_information(event_start, event_end)
         if not segment_information:
             self._logger.error("No segments were found")
             return
 
-        start_segment = self.find_segment(segment_information, event_start)
-        if not start_segment:
+        segments_to_concat = list(segment_information.keys())
+        start_segment = segments_to_concat[0]
+        end_segment = segments_to_concat[-1]
+        if segment_information[start_segment]["start_time"] > event_start:
             self._logger.warning(
                 "Could not find matching start segment. Using earliest possible"
             )
-            start_segment = min(segment_information.keys())
-
-        end_segment = self.find_segment(segment_information, event_end)
-        if not end_segment:
+        if segment_information[end_segment]["end_time"] < event_end:
             self._logger.warning(
                 "Could not find matching end segment. Using latest possible"
             )
-            end_segment = max(segment_information.keys())
 
         self._logger.debug(f"Start event: {event_start}, segment: {start_segment}")
         self._logger.debug(f"End event: {event_end}, segment: {end_segment}")
-        segments_to_concat = self.get_concat_segments(
-            segment_information, start_segment, end_segment
-        )
-
-        if not segments_to_concat:
-            return
 
         temp_file = os.path.join("/tmp", file_name)
 
@@ -228,7 +406,9 @@ class Segments:
             )
             shutil.move(temp_file, file_name)
         except sp.CalledProcessError as error:
-            self._logger.error("Failed to concatenate segments: %s", error)
+            self._logger.error(
+                "Failed to concatenate segments: %s: %s", error, error.stderr
+            )
             return
 
         self._logger.debug("Segments concatenated")
@@ -8,7 +8,7 @@ import viseron.mqtt
 from viseron import helpers
 from viseron.const import TOPIC_FRAME_SCAN_POSTPROC
 from viseron.data_stream import DataStream
-from viseron.helpers.filter import Filter
+from viseron.helpers.filter import Filter, ObjectBatch, filter_objects
 from viseron.mqtt.binary_sensor import MQTTBinarySensor
 from viseron.post_processors import PostProcessorFrame
 
@@ -64,34 +64,40 @@ class Zone:
             f"{config.camera.name_slug}/{TOPIC_FRAME_SCAN_POSTPROC}",
         )
 
-    def filter_zone(self, frame: Frame):
-        """Filter out objects to see if they are within the zone."""
+    def filter_zone(self, frame: Frame, batch: ObjectBatch = None):
+        """Filter out objects to see if they are within the zone.
+
+        batch holds the objects of frame as arrays. It is shared between all zones
+        and the field of view, so each object is only located once.
+        """
+        if batch is None:
+            batch = ObjectBatch(
+                frame.objects,
+                self._camera_resolution,
+                self._config.object_detection.mask,
+            )
         objects_in_zone = []
         labels_in_zone = []
-        for obj in frame.objects:
-            if self._object_filters.get(obj.label) and self._object_filters[
-                obj.label
-            ].filter_object(obj):
-                if helpers.object_in_polygon(
-                    self._camera_resolution, obj, self.coordinates
-                ):
-                    obj.relevant = True
-                    objects_in_zone.append(obj)
-
-                    if obj.label not in labels_in_zone:
-                        labels_in_zone.append(obj.label)
-
-                    if self._object_filters[obj.label].trigger_recorder:
-                        obj.trigger_recorder = True
-
-                    if self._object_filters[obj.label].post_processor:
-                        DataStream.publish_data(
-                            (
-                                f"{self._post_processor_topic}/"
-                                f"{self._object_filters[obj.label].post_processor}"
-                            ),
-                            PostProcessorFrame(self._config, frame, obj, self),
-                        )
+        passed, filter_hit = filter_objects(self._object_filters, batch)
+        batch.set_filter_hits(filter_hit)
+        for obj in batch.select(passed & batch.in_polygon(self.coordinates)):
+            obj.relevant = True
+            objects_in_zone.append(obj)
+
+            if obj.label not in labels_in_zone:
+                labels_in_zone.append(obj.label)
+
+            if self._object_filters[obj.label].trigger_recorder:
+                obj.trigger_recorder = True
+
+            if self._object_filters[obj.label].post_processor:
+                DataStream.publish_data(
+                    (
+                        f"{self._post_processor_topic}/"
+                        f"{self._object_filters[obj.label].post_processor}"
+                    ),
+                    PostProcessorFrame(self._config, frame, obj, self),
+                )
 
         self.objects_in_zone = objects_in_zone
         self.labels_in_zone = labels_in_zone